@@ -0,0 +1,43 @@
+"""Measure the memory held by the statements parsed from a large script
+made of the programs in ./programs, once the tokens are gone.
+
+Usage: PYTHONPATH=src python benchmarks/bench_ast_memory.py [--copies N]
+"""
+import argparse
+import gc
+import pathlib
+import tracemalloc
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.optimizer import count_nodes
+from pycraft.parser import BufferParser
+from pycraft.scanner import BufferScanner
+
+PROGRAMS = pathlib.Path(__file__).parent / "programs"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+
+    source = "".join(
+        path.read_text(encoding="utf-8") for path in sorted(PROGRAMS.glob("*.lox"))
+    ) * args.copies
+    print(f"source: {len(source) / 1e6:.1f} MB")
+
+    gc.collect()
+    tracemalloc.start()
+    tokens = BufferScanner(source, ErrorHandler()).scan_buffer()
+    statements = BufferParser(tokens, ErrorHandler()).parse()
+    del tokens
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = count_nodes(statements)
+    print(f"{nodes} nodes, {held / 1e6:.1f} MB, {held / nodes:.0f} bytes per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Time every execution engine on the programs in ./programs.
+
+Usage: PYTHONPATH=src python benchmarks/bench_engines.py [--repeat N] [ENGINE ...]
+"""
+import argparse
+import contextlib
+import io
+import pathlib
+import time
+
+from pycraft.lox import ENGINES, Lox
+
+PROGRAMS = pathlib.Path(__file__).parent / "programs"
+
+
+def run_once(engine: str, source: str) -> float:
+    lox = Lox(engine=engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        lox.run(source)
+        elapsed = time.perf_counter() - start
+    if lox.had_error() or lox.had_runtime_error():
+        raise SystemExit(f"{engine} failed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("engines", nargs="*", default=sorted(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'program':<16}" + "".join(f"{engine:>12}" for engine in args.engines))
+    for path in sorted(PROGRAMS.glob("*.lox")):
+        source = path.read_text(encoding="utf-8")
+        timings = [
+            min(run_once(engine, source) for _ in range(args.repeat))
+            for engine in args.engines
+        ]
+        print(f"{path.stem:<16}" + "".join(f"{t:>11.3f}s" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
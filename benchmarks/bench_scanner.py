@@ -0,0 +1,46 @@
+"""Time the scanners on a large script made of the programs in ./programs.
+
+The MappedScanner is timed over the script's UTF-8 bytes, as it scans
+memory-mapped files.
+
+Usage: PYTHONPATH=src python benchmarks/bench_scanner.py [--copies N] [--repeat N]
+"""
+import argparse
+import gc
+import pathlib
+import time
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.scanner import MappedScanner, RegexScanner, Scanner
+
+PROGRAMS = pathlib.Path(__file__).parent / "programs"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = "".join(
+        path.read_text(encoding="utf-8") for path in sorted(PROGRAMS.glob("*.lox"))
+    ) * args.copies
+    print(f"source: {len(source) / 1e6:.1f} MB")
+    scanned = {
+        Scanner: source,
+        RegexScanner: source,
+        MappedScanner: memoryview(source.encode()),
+    }
+    for scanner_class, source in scanned.items():
+        elapsed = float("inf")
+        for _ in range(args.repeat):
+            tokens = None
+            gc.collect()
+            start = time.perf_counter()
+            tokens = scanner_class(source, ErrorHandler()).scan_tokens()
+            elapsed = min(elapsed, time.perf_counter() - start)
+        print(f"{scanner_class.__name__:<16}{elapsed:>8.3f}s {len(tokens):>10} tokens")
+
+
+if __name__ == "__main__":
+    main()
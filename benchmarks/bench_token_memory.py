@@ -0,0 +1,64 @@
+"""Measure the memory held by the tokens of a large script, as a list of
+Token objects (RegexScanner) and as a TokenBuffer (BufferScanner), and
+by the statements parsed from each.
+
+Usage: PYTHONPATH=src python benchmarks/bench_token_memory.py [--copies N]
+"""
+import argparse
+import gc
+import pathlib
+import tracemalloc
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.parser import BufferParser, Parser
+from pycraft.scanner import BufferScanner, RegexScanner
+
+PROGRAMS = pathlib.Path(__file__).parent / "programs"
+
+
+def measure(build):
+    """Return what ``build()`` returns with the bytes it still holds and
+    the peak allocated while building it."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+
+    source = "".join(
+        path.read_text(encoding="utf-8") for path in sorted(PROGRAMS.glob("*.lox"))
+    ) * args.copies
+    print(f"source: {len(source) / 1e6:.1f} MB")
+
+    def scan_list():
+        return RegexScanner(source, ErrorHandler()).scan_tokens()
+
+    def scan_buffer():
+        return BufferScanner(source, ErrorHandler()).scan_buffer()
+
+    print(f"{'':<24}{'held':>10}{'peak':>10}")
+    for name, scan, parser_class in (
+        ("list of Token", scan_list, Parser),
+        ("TokenBuffer", scan_buffer, BufferParser),
+    ):
+        tokens, current, peak = measure(scan)
+        print(f"{name + ' tokens':<24}{current / 1e6:>8.1f}MB{peak / 1e6:>8.1f}MB")
+        del tokens
+
+        def scan_and_parse():
+            return parser_class(scan(), ErrorHandler()).parse()
+
+        statements, current, peak = measure(scan_and_parse)
+        print(f"{name + ' + parse':<24}{current / 1e6:>8.1f}MB{peak / 1e6:>8.1f}MB")
+        del statements
+
+
+if __name__ == "__main__":
+    main()
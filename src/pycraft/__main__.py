@@ -1,20 +1,157 @@
 import argparse
+import sys
 
-from .lox import Lox
+from . import batch, cache
+from .lox import ENGINES, Lox
+from .memo import DEFAULT_MEMO_SIZE
+from .optimizer import LEVELS
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "file",
+        "files",
+        nargs="*",
+        help="program read from script file; with --batch, any number of "
+        "scripts or globs", metavar="SCRIPT",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default="tree",
+        help="execution engine (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=sorted(LEVELS),
+        default=0,
+        help="optimization level (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pass-stats",
+        action="store_true",
+        help="print the node count after each optimizer pass to stderr",
+    )
+    parser.add_argument(
+        "--lazy-functions",
+        action="store_true",
+        help="parse function bodies when first called; syntax errors in "
+        "bodies never called go unreported",
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--stream",
+        action="store_true",
+        help="run each top-level declaration of SCRIPT as soon as it is read",
+    )
+    source.add_argument(
+        "--mmap",
+        action="store_true",
+        help="scan SCRIPT in place from a memory-mapped file",
+    )
+    source.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"reuse SCRIPT's parsed program from {cache.CACHE_DIRECTORY}/, saving it there first",
+    )
+    parser.add_argument(
+        "--max-call-depth",
+        type=int,
+        help="deepest Lox call allowed by the stack and vm engines",
+    )
+    parser.add_argument(
+        "--memoize",
         nargs="?",
-        help="program read from script file", metavar="SCRIPT",
+        type=int,
+        const=DEFAULT_MEMO_SIZE,
+        metavar="SIZE",
+        help="cache the results of functions found pure, at most SIZE per "
+        f"function (default: {DEFAULT_MEMO_SIZE}); tree and stack engines only",
+    )
+    parser.add_argument(
+        "--memo-stats",
+        action="store_true",
+        help="with --memoize, print the cache hits and misses of each function to stderr",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="run every SCRIPT, each in a fresh interpreter, across a pool of "
+        "processes, printing their output and exit codes and a timing summary",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="with --batch, only scan, parse and resolve the scripts",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="with --batch, number of worker processes (default: one per CPU)",
     )
     args = parser.parse_args()
+    if args.max_call_depth is not None and args.engine not in ("stack", "vm"):
+        parser.error("--max-call-depth needs the stack or vm engine")
+    if args.cache and args.lazy_functions:
+        # a skipped body holds on to its parser, it can't be saved
+        parser.error("--cache saves whole parsed programs, without --lazy-functions")
+    if args.memoize is not None:
+        if args.engine not in ("tree", "stack"):
+            parser.error("--memoize needs the tree or stack engine")
+        if args.memoize < 1:
+            parser.error("--memoize SIZE must be at least 1")
+    elif args.memo_stats:
+        parser.error("--memo-stats needs --memoize")
+    if args.batch:
+        if args.stream or args.mmap or args.cache or args.pass_stats or args.memo_stats:
+            parser.error("--batch runs scripts as plain files, without --stream, "
+                         "--mmap, --cache, --pass-stats or --memo-stats")
+        if args.jobs is not None and args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        paths = batch.expand(args.files)
+        if not paths:
+            parser.error("--batch needs at least one SCRIPT")
+        results = batch.run_batch(
+            paths,
+            jobs=args.jobs,
+            check=args.check,
+            engine=args.engine,
+            optimization_level=args.optimization_level,
+            max_call_depth=args.max_call_depth,
+            lazy_functions=args.lazy_functions,
+            memo_size=args.memoize,
+        )
+        sys.exit(batch.report(results, sys.stdout, sys.stderr))
+    if args.check or args.jobs is not None:
+        parser.error("--check and --jobs need --batch")
+    if len(args.files) > 1:
+        parser.error("more than one SCRIPT needs --batch")
 
-    lox = Lox()
-    if args.file:
-        lox.run_file(args.file)
-    else:
-        lox.run_prompt()
+    lox = Lox(
+        engine=args.engine,
+        optimization_level=args.optimization_level,
+        max_call_depth=args.max_call_depth,
+        lazy_functions=args.lazy_functions,
+        memo_size=args.memoize,
+    )
+    try:
+        if args.files:
+            lox.run_file(
+                args.files[0], stream=args.stream, mapped=args.mmap, cached=args.cache
+            )
+        else:
+            lox.run_prompt()
+    finally:
+        if args.pass_stats:
+            for name, count in lox.optimizer.node_counts:
+                print(f"{name:<12}{count:>8} nodes", file=sys.stderr)
+        if args.memo_stats:
+            for memo in lox.memo_stats():
+                print(
+                    f"{memo.name:<12}{memo.hits:>8} hits{memo.misses:>8} misses",
+                    file=sys.stderr,
+                )
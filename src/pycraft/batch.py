@@ -0,0 +1,144 @@
+"""Running or checking many scripts at once.
+
+Each script runs in a fresh ``Lox``, as it would with ``python -m pycraft
+SCRIPT``, but in one of a pool of worker processes, so a batch pays for
+starting Python once per worker rather than once per script. What a
+script prints is captured and handed back with its exit code: 0, 65
+and 70 as from ``Lox.run_file``, or 66 for a script that can't be read.
+Results come back in the order the scripts were given, whatever order
+they finish in.
+"""
+from __future__ import annotations
+
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator
+
+from .exception import LoxRuntimeError
+from .lox import Lox
+
+# exit code of a script that can't be read (EX_NOINPUT of sysexits.h)
+NO_INPUT = 66
+# exit code of a script that crashed pycraft itself, as an uncaught
+# Python exception would give
+CRASHED = 1
+
+
+class ScriptResult:
+    """How one script of a batch went."""
+
+    __slots__ = "path", "exit_code", "output", "seconds"
+
+    def __init__(self, path: str, exit_code: int, output: str, seconds: float):
+        self.path = path
+        self.exit_code = exit_code
+        self.output = output
+        self.seconds = seconds
+
+    def __repr__(self) -> str:
+        return f"ScriptResult({self.path!r}, {self.exit_code})"
+
+
+def expand(patterns: Iterable[str]) -> list[str]:
+    """The script paths named by ``patterns``, with globs expanded.
+
+    Globs are matched here rather than by the shell so that batches too
+    large for a command line can still be given; ``**`` matches any
+    depth. Paths are kept in the order given, without duplicates.
+    """
+    paths = {}
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.update(dict.fromkeys(sorted(glob.glob(pattern, recursive=True))))
+        else:
+            paths[pattern] = None
+    return list(paths)
+
+
+def run_script(path: str, check: bool = False, **options) -> ScriptResult:
+    """Run, or with ``check`` only scan, parse and resolve, the script at
+    ``path`` with a ``Lox`` made from ``options``."""
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        lox = Lox(**options)
+        try:
+            if check:
+                lox.check_file(path)
+            else:
+                lox.run_file(path)
+            exit_code = 0
+        except SystemExit as exc:
+            exit_code = exc.code
+        except LoxRuntimeError:
+            # a syntax error stopping the parser, already reported
+            exit_code = 65
+        except UnicodeDecodeError as exc:
+            print(f"Script is not UTF-8: {exc}")
+            exit_code = 65
+        except OSError as exc:
+            print(f"Can't read script: {exc}")
+            exit_code = NO_INPUT
+        except Exception as exc:
+            print(f"pycraft crashed: {exc!r}")
+            exit_code = CRASHED
+    return ScriptResult(path, exit_code, output.getvalue(), time.perf_counter() - start)
+
+
+def run_batch(
+    paths: list[str], jobs: int | None = None, check: bool = False, **options
+) -> Iterator[ScriptResult]:
+    """Run the scripts at ``paths`` across ``jobs`` processes, one per
+    CPU by default, yielding their results in order.
+
+    With a single job the scripts run in this process instead.
+    """
+    run = partial(run_script, check=check, **options)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) <= 1:
+        yield from map(run, paths)
+        return
+    # hand scripts out a few at a time, they are mostly short
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(run, paths, chunksize=chunksize)
+
+
+def report(results: Iterable[ScriptResult], out, summary_out) -> int:
+    """Print each result and its captured output to ``out`` and a timing
+    summary to ``summary_out``; the exit code of the whole batch.
+
+    The batch exits with 0 if every script did, and 1 otherwise.
+    """
+    start = time.perf_counter()
+    count = 0
+    script_seconds = 0.0
+    failures: dict[int, int] = {}
+    slowest: ScriptResult | None = None
+    for result in results:
+        count += 1
+        script_seconds += result.seconds
+        if result.exit_code:
+            failures[result.exit_code] = failures.get(result.exit_code, 0) + 1
+        if slowest is None or result.seconds > slowest.seconds:
+            slowest = result
+        status = "ok" if result.exit_code == 0 else f"exit {result.exit_code}"
+        print(f"== {result.path}: {status} ({result.seconds:.3f}s)", file=out)
+        out.write(result.output)
+
+    failed = sum(failures.values())
+    print(f"{count} scripts, {count - failed} ok, {failed} failed", file=summary_out)
+    for exit_code, scripts in sorted(failures.items()):
+        print(f"  exit {exit_code}: {scripts}", file=summary_out)
+    print(
+        f"{time.perf_counter() - start:.3f}s elapsed, {script_seconds:.3f}s in scripts",
+        file=summary_out,
+    )
+    if slowest is not None:
+        print(f"slowest: {slowest.path} ({slowest.seconds:.3f}s)", file=summary_out)
+    return 1 if failed else 0
@@ -0,0 +1,119 @@
+"""On-disk cache of parsed programs, the Lox counterpart of __pycache__.
+
+Running a script scans, parses, resolves and optimizes it before the
+first statement runs. The result of all that is kept next to the script,
+in ``__loxcache__/<script>.loxc``, as a pickled ``Program``: the
+optimized statements and the resolutions the resolver handed to the
+interpreter. A later run of the same source replays the resolutions
+into its engine and goes straight to interpreting.
+
+A cache file starts with ``MAGIC`` and a key hashing the source, the
+optimization level and the pycraft code itself, so editing the script or
+pycraft, or asking for another level, misses the cache instead of
+running a stale program. Like a .pyc file, a .loxc file is trusted: it is
+unpickled as is.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import pickle
+import sys
+
+from .expr import Expr
+from .stmt import Stmt
+
+CACHE_DIRECTORY = "__loxcache__"
+SUFFIX = ".loxc"
+MAGIC = b"LOXC\x01"
+
+_code_version: bytes | None = None
+
+
+def code_version() -> bytes:
+    """Fingerprint of the running pycraft: its modules' names, sizes and
+    modification times, and the Python version."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256(repr(sys.version_info[:2]).encode())
+        package = pathlib.Path(__file__).parent
+        for module in sorted(package.rglob("*.py")):
+            status = module.stat()
+            digest.update(f"{module.relative_to(package)}:{status.st_size}:{status.st_mtime_ns};".encode())
+        _code_version = digest.digest()
+    return _code_version
+
+
+def cache_key(source: bytes, optimization_level: int) -> bytes:
+    digest = hashlib.sha256(code_version())
+    digest.update(bytes([optimization_level]))
+    digest.update(source)
+    return digest.digest()
+
+
+def cache_path(path) -> pathlib.Path:
+    """Where the cached program of the script at ``path`` goes."""
+    path = pathlib.Path(path)
+    return path.parent / CACHE_DIRECTORY / (path.name + SUFFIX)
+
+
+class Program:
+    """A resolved and optimized program, as kept in the cache."""
+
+    __slots__ = "statements", "resolutions"
+
+    def __init__(self, statements: list[Stmt], resolutions: list[tuple[Expr, int, int]]):
+        self.statements = statements
+        self.resolutions = resolutions
+
+    def resolve(self, interpreter) -> None:
+        """Hand the recorded resolutions to ``interpreter``."""
+        for expr, depth, slot in self.resolutions:
+            interpreter.resolve(expr, depth, slot)
+
+
+class ResolutionRecorder:
+    """Stands in for the interpreter in front of the Resolver, recording
+    the resolutions it passes on."""
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.resolutions: list[tuple[Expr, int, int]] = []
+
+    def resolve(self, expr: Expr, depth: int, slot: int) -> None:
+        self.resolutions.append((expr, depth, slot))
+        self.interpreter.resolve(expr, depth, slot)
+
+
+def load(path, key: bytes) -> Program | None:
+    """The cached program of the script at ``path``, if its key is ``key``."""
+    try:
+        with open(cache_path(path), "rb") as f:
+            if f.read(len(MAGIC) + len(key)) != MAGIC + key:
+                return None
+            program = pickle.load(f)
+    except Exception:
+        # a missing, truncated or otherwise unreadable file is a miss
+        return None
+    return program if isinstance(program, Program) else None
+
+
+def store(path, key: bytes, program: Program) -> None:
+    """Cache ``program`` for the script at ``path``, if it can be."""
+    try:
+        data = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        # too deeply nested to pickle, run it uncached
+        return
+    target = cache_path(path)
+    try:
+        target.parent.mkdir(exist_ok=True)
+        # write aside and rename, so readers never see half a file
+        partial = target.with_name(f"{target.name}.{os.getpid()}")
+        with open(partial, "wb") as f:
+            f.write(MAGIC + key + data)
+        os.replace(partial, target)
+    except OSError:
+        # like Python without a writable __pycache__, just don't cache
+        pass
@@ -0,0 +1,480 @@
+"""Engine that compiles the AST into a tree of pre-bound Python closures.
+
+Every node is visited exactly once, up front. What comes out is a nest
+of small Python functions taking the current Environment, each calling
+its children directly, so running a program no longer pays for the
+accept/visit double dispatch nor for re-examining operator token types.
+"""
+from __future__ import annotations
+
+from operator import ge, gt, le, lt, mul, sub, truediv
+from typing import Callable, Iterable
+
+from . import natives, runtime, stmt, symbols
+from .completion import BREAK, Completion, TailCall
+from .environment import Environment
+from .error_handler import ErrorHandler
+from .exception import LoxRuntimeError
+from .expr import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from .lox_callable import LoxCallable
+from .natives import NativeError, NativeFunction
+from .stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
+from .tokenclass import Token, TokenType
+
+# compiled expressions return their value, compiled statements
+# return their completion
+Compiled = Callable[[Environment], object]
+
+
+class CompiledFunction(LoxCallable):
+
+    __slots__ = "name", "_arity", "body", "closure"
+
+    def __init__(self, name: str, arity: int, body: list[Compiled], closure: Environment):
+        self.name = name
+        self._arity = arity
+        self.body = body
+        self.closure = closure
+
+    def __call__(self, interpreter, arguments: list):
+        function = self
+        while True:
+            environment = Environment(function.closure, arguments)
+            for statement in function.body:
+                completion = statement(environment)
+                if completion is not None:
+                    break
+            else:
+                return None
+            if type(completion) is not TailCall:
+                return completion.value
+            # run the tail call here rather than one level deeper
+            function = completion.function
+            arguments = completion.arguments
+
+    def arity(self) -> int:
+        return self._arity
+
+    def to_string(self) -> str:
+        return "<fn " + self.name + ">"
+
+
+def _not_initialized(name: Token) -> LoxRuntimeError:
+    return LoxRuntimeError(name, f"{name.lexeme} is not initialized.")
+
+
+class ClosureCompiler(ExprVisitor[Compiled], StmtVisitor[Compiled]):
+
+    def __init__(self, interpreter: "ClosureInterpreter"):
+        self.interpreter = interpreter
+        self._locals = interpreter._locals
+        # number of local scopes around the node being compiled,
+        # declarations at depth zero are globals
+        self._scope_depth = 0
+
+    def compile(self, statements: Iterable[Stmt]) -> list[Compiled]:
+        return [statement.accept(self) for statement in statements]
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block) -> Compiled:
+        self._scope_depth += 1
+        statements = self.compile(stmt.statements)
+        self._scope_depth -= 1
+
+        def block(env):
+            inner = Environment(env)
+            for statement in statements:
+                completion = statement(inner)
+                if completion is not None:
+                    return completion
+            return None
+        return block
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> Compiled:
+        expression = stmt.expression.accept(self)
+
+        # the value must not be mistaken for a completion
+        def expression_statement(env):
+            expression(env)
+        return expression_statement
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> Compiled:
+        name = stmt.name.lexeme
+        arity = len(stmt.params)
+        define = self._definer(stmt.name)
+
+        self._scope_depth += 1
+        body = self.compile(stmt.body)
+        self._scope_depth -= 1
+
+        def function(env):
+            define(env, CompiledFunction(name, arity, body, env))
+        return function
+
+    def visit_if_stmt(self, stmt: stmt.If) -> Compiled:
+        condition = stmt.condition.accept(self)
+        then_branch = stmt.then_branch.accept(self)
+        if stmt.else_branch is None:
+            def if_then(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    return then_branch(env)
+                return None
+            return if_then
+
+        else_branch = stmt.else_branch.accept(self)
+
+        def if_then_else(env):
+            value = condition(env)
+            if value is not None and value is not False:
+                return then_branch(env)
+            return else_branch(env)
+        return if_then_else
+
+    def visit_print_stmt(self, stmt: Print) -> Compiled:
+        expression = stmt.expression.accept(self)
+        stringify = runtime.stringify
+
+        def print_(env):
+            print(stringify(expression(env)))
+        return print_
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> Compiled:
+        if stmt.value is None:
+            completion = Completion(None)
+            return lambda env: completion
+
+        if stmt.tail_call is not None:
+            return self._tail_call(stmt.tail_call)
+
+        value = stmt.value.accept(self)
+
+        def return_(env):
+            return Completion(value(env))
+        return return_
+
+    def _tail_call(self, expr: Call) -> Compiled:
+        callee = expr.callee.accept(self)
+        arguments = [argument.accept(self) for argument in expr.arguments]
+        paren = expr.paren
+        interpreter = self.interpreter
+
+        def tail_call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+            if type(function) is CompiledFunction and len(values) == function._arity:
+                return TailCall(function, values)
+            if not isinstance(function, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+            if len(values) != function.arity():
+                raise LoxRuntimeError(
+                    paren, f"Expected {function.arity()} arguments but got {len(values)}."
+                )
+            try:
+                return Completion(function(interpreter, values))
+            except NativeError as error:
+                raise LoxRuntimeError(paren, str(error)) from None
+        return tail_call
+
+    def visit_var_stmt(self, stmt: Var) -> Compiled:
+        define = self._definer(stmt.name)
+        if stmt.initializer is None:
+            def var_nil(env):
+                define(env, None)
+            return var_nil
+
+        initializer = stmt.initializer.accept(self)
+
+        def var(env):
+            define(env, initializer(env))
+        return var
+
+    def visit_while_stmt(self, stmt: stmt.While) -> Compiled:
+        condition = stmt.condition.accept(self)
+        body = stmt.body.accept(self)
+
+        def while_(env):
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return None
+                completion = body(env)
+                if completion is not None:
+                    if completion is BREAK:
+                        return None
+                    return completion
+        return while_
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> Compiled:
+        return lambda env: BREAK
+
+    # expressions
+
+    def visit_literal_expr(self, expr: Literal) -> Compiled:
+        value = expr.value
+        return lambda env: value
+
+    def visit_grouping_expr(self, expr: Grouping) -> Compiled:
+        return expr.expression.accept(self)
+
+    def visit_variable_expr(self, expr: VariableExpr) -> Compiled:
+        name = expr.name
+        location = self._locals.get(expr)
+        if location is None:
+            values = self.interpreter._globals.values
+            symbol = name.symbol
+            get = self.interpreter._globals.get
+
+            def global_variable(env):
+                value = values.get(symbol)
+                if value is None:
+                    # let the environment pick the right error
+                    return get(name)
+                return value
+            return global_variable
+
+        depth, slot = location
+        if depth == 0:
+            def local(env):
+                value = env.slots[slot]
+                if value is None:
+                    raise _not_initialized(name)
+                return value
+            return local
+        if depth == 1:
+            def enclosing(env):
+                value = env.enclosing.slots[slot]
+                if value is None:
+                    raise _not_initialized(name)
+                return value
+            return enclosing
+
+        def ancestor(env):
+            return env.get_at(depth, slot, name)
+        return ancestor
+
+    def visit_assign_expr(self, expr: Assign) -> Compiled:
+        value = expr.value.accept(self)
+        name = expr.name
+        location = self._locals.get(expr)
+        if location is None:
+            assign = self.interpreter._globals.assign
+
+            def assign_global(env):
+                result = value(env)
+                assign(name, result)
+                return result
+            return assign_global
+
+        depth, slot = location
+        if depth == 0:
+            def assign_local(env):
+                result = value(env)
+                env.slots[slot] = result
+                return result
+            return assign_local
+
+        def assign_ancestor(env):
+            result = value(env)
+            env.assign_at(depth, slot, result)
+            return result
+        return assign_ancestor
+
+    def visit_logical_expr(self, expr: Logical) -> Compiled:
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if expr.operator.type == TokenType.OR:
+            def or_(env):
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+            return or_
+
+        def and_(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+        return and_
+
+    def visit_unary_expr(self, expr: Unary) -> Compiled:
+        right = expr.right.accept(self)
+        operator = expr.operator
+        if operator.type == TokenType.MINUS:
+            def negate(env):
+                value = right(env)
+                if type(value) is not float:
+                    raise LoxRuntimeError(operator, "Operand must be a number.")
+                return -value
+            return negate
+
+        def not_(env):
+            value = right(env)
+            return value is None or value is False
+        return not_
+
+    def visit_binary_expr(self, expr: Binary) -> Compiled:
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        operator = expr.operator
+        match operator.type:
+            case TokenType.PLUS:
+                return self._plus(expr, left, right)
+            case TokenType.EQUAL_EQUAL:
+                is_equal = runtime.is_equal
+                return lambda env: is_equal(left(env), right(env))
+            case TokenType.BANG_EQUAL:
+                is_equal = runtime.is_equal
+                return lambda env: not is_equal(left(env), right(env))
+
+        # the remaining operators all want two numbers
+        operation = _NUMERIC_OPERATIONS[operator.type]
+        if isinstance(expr.right, Literal) and type(expr.right.value) is float:
+            constant = expr.right.value
+
+            def numeric_constant(env):
+                a = left(env)
+                if type(a) is not float:
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+                return operation(a, constant)
+            return numeric_constant
+
+        def numeric(env):
+            a = left(env)
+            b = right(env)
+            if type(a) is not float or type(b) is not float:
+                raise LoxRuntimeError(operator, "Operands must be numbers.")
+            return operation(a, b)
+        return numeric
+
+    def _plus(self, expr: Binary, left: Compiled, right: Compiled) -> Compiled:
+        operator = expr.operator
+        add = runtime.add
+        if isinstance(expr.right, Literal) and type(expr.right.value) is float:
+            constant = expr.right.value
+
+            def plus_constant(env):
+                a = left(env)
+                if type(a) is float:
+                    return a + constant
+                return add(operator, a, constant)
+            return plus_constant
+
+        def plus(env):
+            a = left(env)
+            b = right(env)
+            if type(a) is float and type(b) is float:
+                return a + b
+            return add(operator, a, b)
+        return plus
+
+    def visit_call_expr(self, expr: Call) -> Compiled:
+        callee = expr.callee.accept(self)
+        arguments = [argument.accept(self) for argument in expr.arguments]
+        paren = expr.paren
+        interpreter = self.interpreter
+
+        def call_values(function, values):
+            if not isinstance(function, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+            if len(values) != function.arity():
+                raise LoxRuntimeError(
+                    paren, f"Expected {function.arity()} arguments but got {len(values)}."
+                )
+            try:
+                return function(interpreter, values)
+            except NativeError as error:
+                raise LoxRuntimeError(paren, str(error)) from None
+
+        # natives of fixed arity are called straight, as fn(a) or
+        # fn(a, b), without building an argument list
+        if len(arguments) == 1:
+            [argument] = arguments
+
+            def call_1(env):
+                function = callee(env)
+                a = argument(env)
+                if type(function) is NativeFunction and function.arity_ == 1:
+                    try:
+                        return function.fn(a)
+                    except NativeError as error:
+                        raise LoxRuntimeError(paren, str(error)) from None
+                return call_values(function, [a])
+            return call_1
+
+        if len(arguments) == 2:
+            first, second = arguments
+
+            def call_2(env):
+                function = callee(env)
+                a = first(env)
+                b = second(env)
+                if type(function) is NativeFunction and function.arity_ == 2:
+                    try:
+                        return function.fn(a, b)
+                    except NativeError as error:
+                        raise LoxRuntimeError(paren, str(error)) from None
+                return call_values(function, [a, b])
+            return call_2
+
+        def call(env):
+            function = callee(env)
+            return call_values(function, [argument(env) for argument in arguments])
+        return call
+
+    def _definer(self, name: Token) -> Callable[[Environment, object], None]:
+        if self._scope_depth == 0:
+            define = self.interpreter._globals.define
+            symbol = name.symbol
+            return lambda env, value: define(symbol, value)
+        return lambda env, value: env.slots.append(value)
+
+
+# C implemented, so calling them doesn't push a Python frame
+_NUMERIC_OPERATIONS = {
+    TokenType.MINUS: sub,
+    TokenType.STAR: mul,
+    TokenType.SLASH: truediv,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge,
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+}
+
+
+class ClosureInterpreter:
+    """Runs programs by compiling them with the ClosureCompiler first."""
+
+    def __init__(self, error_handler: ErrorHandler):
+        self.error_handler = error_handler
+        self._globals = Environment()
+        self._locals: dict[Expr, tuple[int, int]] = {}
+
+        natives.install_standard_library(self)
+
+    def define_global(self, name: str, value) -> None:
+        self._globals.define(symbols.intern(name), value)
+
+    def resolve(self, expr: Expr, depth: int, slot: int):
+        self._locals[expr] = (depth, slot)
+
+    def interpret(self, statements: Iterable[Stmt]):
+        program = ClosureCompiler(self).compile(statements)
+        try:
+            for statement in program:
+                statement(self._globals)
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error=error)
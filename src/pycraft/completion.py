@@ -0,0 +1,33 @@
+"""How the execution of a statement ended.
+
+Statements return None when they complete normally, ``BREAK`` after a
+break, or a Completion holding the returned value after a return (a TailCall
+for a return whose value is a call).
+Enclosing statements pass anything that isn't None up to the loop or
+function that handles it, which is much cheaper than raising and
+unwinding a Python exception.
+"""
+
+
+class Completion:
+
+    __slots__ = ("value",)
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+class TailCall(Completion):
+    """Returned by ``return f(...)`` instead of calling ``f``: the
+    function being left makes the call itself, in its own frame."""
+
+    __slots__ = "function", "arguments"
+
+    def __init__(self, function, arguments: list):
+        super().__init__(None)
+        self.function = function
+        self.arguments = arguments
+
+
+# compared by identity, a break carries no value
+BREAK = Completion()
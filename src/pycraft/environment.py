@@ -1,20 +1,37 @@
+from itertools import count
+
 from .tokenclass import Token
 from .exception import LoxRuntimeError
 
+# versions are unique across environments, so a cache filled from one
+# interpreter's globals can never look valid for another's
+_versions = count(1)
+
 
 class Environment:
 
-    def __init__(self, enclosing: "Environment"=None):
+    # one environment is created per block and per call, keep them small
+    __slots__ = "enclosing", "values", "slots", "version"
+
+    def __init__(self, enclosing: "Environment"=None, slots: list = None):
         self.enclosing = enclosing
-        self.values = {}
+        # globals are late bound, so they are still looked up by name,
+        # that is by the symbol id of the name
+        self.values: dict[int, object] = {}
+        # locals live in an array indexed by the slot the resolver
+        # computed for them, in declaration order
+        self.slots = [] if slots is None else slots
+        # changes whenever a name is defined or assigned, inline caches
+        # of global reads are only valid for the version they saw
+        self.version = 0
 
-    def define(self, name, value):
-        self.values[name] = value
+    def define(self, symbol: int, value):
+        self.values[symbol] = value
+        self.version = next(_versions)
 
     def get(self, name: Token):
-        # TODO: iteratively walk the chain instead for much faster
-        if name.lexeme in self.values:
-            value = self.values[name.lexeme]
+        if name.symbol in self.values:
+            value = self.values[name.symbol]
             if value is None:
                 raise LoxRuntimeError(
                     name,
@@ -31,9 +48,9 @@ class Environment:
         )
 
     def assign(self, name: Token, value):
-        # TODO: iteratively walk the chain instead for much faster
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
+        if name.symbol in self.values:
+            self.values[name.symbol] = value
+            self.version = next(_versions)
             return
         if self.enclosing is not None:
             self.enclosing.assign(name, value)
@@ -42,3 +59,21 @@ class Environment:
             name,
             "Undefined variable '" + name.lexeme + "'.",
         )  # new variable is not allowed
+
+    def ancestor(self, distance: int) -> "Environment":
+        environment = self
+        for _ in range(distance):
+            environment = environment.enclosing
+        return environment
+
+    def get_at(self, distance: int, slot: int, name: Token):
+        value = self.ancestor(distance).slots[slot]
+        if value is None:
+            raise LoxRuntimeError(
+                name,
+                f"{name.lexeme} is not initialized.",
+            )
+        return value
+
+    def assign_at(self, distance: int, slot: int, value):
+        self.ancestor(distance).slots[slot] = value
@@ -4,11 +4,53 @@ from .tokenclass import Token
 
 R = TypeVar('R')
 
+
+
+class _EmptyCache:
+
+    def __reduce__(self):
+        # pickled by name, so cached programs unpickle to the one sentinel
+        return "EMPTY_CACHE"
+
+
+# what an inline cache holds before it has seen anything, no Lox value
+# is ever identical to it
+EMPTY_CACHE = _EmptyCache()
+
+
+def rebuild_node(node_class, *values):
+    """Unpickle a node pickled by its ``__reduce__``."""
+    node = node_class.__new__(node_class)
+    for slot, value in zip(node_class.__slots__, values):
+        setattr(node, slot, value)
+    return node
+
+
 class Expr:
 
+    # nodes are many and long lived, keep them free of a per-instance
+    # __dict__; every subclass lists its fields as slots
+    __slots__ = ()
+
+    def __reduce__(self):
+        # pickle the field values alone, without their names, to keep
+        # cached programs small
+        node_class = type(self)
+        return rebuild_node, (node_class, *[getattr(self, slot) for slot in node_class.__slots__])
+
     def accept(self, visitor: "ExprVisitor"):
         return NotImplemented()
 
+    def children(self) -> list["Expr"]:
+        """The operands of the node, in evaluation order. Passes walk
+        them with a stack of their own rather than by recursion, since
+        a long chain of operators nests as deep as it is long."""
+        return []
+
+    def set_children(self, children: list["Expr"]) -> None:
+        """Replace the operands with ``children``, as ordered by
+        ``children()``."""
+
 
 class ExprVisitor(Generic[R]):
 
@@ -24,6 +66,8 @@ class ExprVisitor(Generic[R]):
 
 class Literal(Expr):
 
+    __slots__ = "value",
+
     def __init__(self, value):
         self.value = value
 
@@ -33,37 +77,66 @@ class Literal(Expr):
 
 class Logical(Expr):
 
+    __slots__ = "left", "operator", "right", "handler"
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         self.operator = operator
         self.right = right
+        # implementation of the operator, picked on first evaluation
+        self.handler = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_logical_expr(self)
 
+    def children(self) -> list[Expr]:
+        return [self.left, self.right]
+
+    def set_children(self, children: list[Expr]) -> None:
+        self.left, self.right = children
+
 
 class Grouping(Expr):
 
+    __slots__ = "expression",
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_grouping_expr(self)
 
+    def children(self) -> list[Expr]:
+        return [self.expression]
+
+    def set_children(self, children: list[Expr]) -> None:
+        self.expression, = children
 
 
 class Unary(Expr):
 
+    __slots__ = "operator", "right", "handler"
+
     def __init__(self, operator: Token, right: Expr):
         self.operator = operator
         self.right = right
+        # implementation of the operator, picked on first evaluation
+        self.handler = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_unary_expr(self)
 
+    def children(self) -> list[Expr]:
+        return [self.right]
+
+    def set_children(self, children: list[Expr]) -> None:
+        self.right, = children
+
 
 class Assign(Expr):
 
+    __slots__ = "name", "value"
+
     def __init__(self, name: Token, value: Expr):
         self.name = name
         self.value = value
@@ -71,22 +144,44 @@ class Assign(Expr):
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_assign_expr(self)
 
+    def children(self) -> list[Expr]:
+        return [self.value]
+
+    def set_children(self, children: list[Expr]) -> None:
+        self.value, = children
+
 
 class Binary(Expr):
 
+    __slots__ = "left", "operator", "right", "handler"
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         self.operator = operator
         self.right = right
+        # implementation of the operator, picked on first evaluation
+        self.handler = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_binary_expr(self)
 
+    def children(self) -> list[Expr]:
+        return [self.left, self.right]
+
+    def set_children(self, children: list[Expr]) -> None:
+        self.left, self.right = children
+
 
 class VariableExpr(Expr):
 
+    __slots__ = "name", "cache_version", "cache_value"
+
     def __init__(self, name) -> None:
         self.name = name
+        # inline cache of a global read: the value and the version
+        # of the globals it was read from
+        self.cache_version = -1
+        self.cache_value = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_variable_expr(self)
@@ -94,6 +189,8 @@ class VariableExpr(Expr):
 
 class Call(Expr):
 
+    __slots__ = "callee", "paren", "arguments", "cache_callee", "cache_arity"
+
     def __init__(
         self,
         callee: "Expr",
@@ -103,6 +200,17 @@ class Call(Expr):
         self.callee = callee
         self.paren = paren
         self.arguments = arguments
+        # inline cache of the last callee seen here and its arity,
+        # calling the same function again skips the checks
+        self.cache_callee = EMPTY_CACHE
+        self.cache_arity = 0
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_call_expr(self)
+
+    def children(self) -> list[Expr]:
+        return [self.callee, *self.arguments]
+
+    def set_children(self, children: list[Expr]) -> None:
+        self.callee = children[0]
+        self.arguments = children[1:]
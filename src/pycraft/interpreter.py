@@ -1,9 +1,9 @@
 from typing import Iterable
-import time
-from . import stmt
+from . import natives, operators, runtime, stmt, symbols
+from .completion import BREAK, Completion, TailCall
 from .environment import Environment
 from .error_handler import ErrorHandler
-from .exception import BreakException, LoxRuntimeError, ReturnException
+from .exception import LoxRuntimeError
 from .expr import (
     Assign,
     Binary,
@@ -18,119 +18,141 @@ from .expr import (
 )
 from .lox_callable import LoxCallable
 from .lox_function import LoxFunction
+from .memo import Memoizer, MemoizedFunction
+from .natives import NativeError, NativeFunction
 from .stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
-from .tokenclass import TokenType
+from .tokenclass import Token
 
 
 class Interpreter(ExprVisitor, StmtVisitor[None]):
 
-    def __init__(self, error_handler: ErrorHandler):
+    def __init__(self, error_handler: ErrorHandler, memo_size: int | None = None):
         self.error_handler = error_handler
         # holds a fixed reference to the outermost global environment.
         self._globals = Environment()
         # The environment field in the interpreter changes as we enter and exit local scopes
         self._environment = self._globals
+        # (depth, slot) of every local variable expression, filled by the Resolver
+        self._locals: dict[Expr, tuple[int, int]] = {}
+        # memoizes the functions found pure, when asked to
+        self.memoizer = None if memo_size is None else Memoizer(memo_size)
 
-        self._globals.define("clock", type("clock", (LoxCallable,), {
-        'arity': lambda self: 0,  # Example implementation of arity
-        '__call__': lambda self, interpreter, arguments: time.time()
-    })())
+        natives.install_standard_library(self)
+
+    def define_global(self, name: str, value) -> None:
+        self._globals.define(symbols.intern(name), value)
 
     def interpret(self, statements: Iterable[Stmt]):
+        statements = self._analyse(statements)
         try:
             for stmt in statements:
                 self._execute(stmt)
         except LoxRuntimeError as error:
             self.error_handler.runtime_error(error=error)
 
+    def _analyse(self, statements: Iterable[Stmt]) -> Iterable[Stmt]:
+        if self.memoizer is None:
+            return statements
+        statements = list(statements)
+        self.memoizer.analyse(statements, self._globals.values)
+        return statements
+
+    def _function(self, declaration: stmt.Function) -> LoxFunction:
+        if self.memoizer is None:
+            return LoxFunction(declaration, self._environment)
+        return self.memoizer.make_function(declaration, self._environment)
+
     def visit_literal_expr(self, expr: Literal):
         return expr.value
 
     def visit_logical_expr(self, expr: Logical):
-        left = self.evaluate(expr.left)
-
-        if expr.operator.type == TokenType.OR:
-            if self._is_truthy(left):
-                return left
-        else:
-            if not self._is_truthy(left):
-                return left
-
-        return self.evaluate(expr.right)
+        handler = expr.handler
+        if handler is None:
+            handler = expr.handler = operators.LOGICAL[expr.operator.type]
+        return handler(self.evaluate, expr)
 
     def visit_grouping_expr(self, expr: Grouping):
         return self.evaluate(expr.expression)
 
     def visit_unary_expr(self, expr: Unary):
         right = self.evaluate(expr.right)
-
-        match expr.operator.type:
-            case TokenType.MINUS:
-                self._check_number_operand(expr.operator, right)
-                return -right
-            case TokenType.BANG:
-                return not self._is_truthy(right)
-        return None
+        handler = expr.handler
+        if handler is None:
+            handler = expr.handler = operators.UNARY[expr.operator.type]
+        return handler(expr.operator, right)
 
     def visit_variable_expr(self, expr: VariableExpr):
-        return self._environment.get(expr.name)
+        return self._look_up_variable(expr.name, expr)
+
+    def _look_up_variable(self, name: Token, expr: Expr):
+        location = self._locals.get(expr)
+        if location is None:
+            return self._look_up_global(name, expr)
+        return self._environment.get_at(location[0], location[1], name)
+
+    def _look_up_global(self, name: Token, expr: VariableExpr):
+        globals_ = self._globals
+        if expr.cache_version == globals_.version:
+            return expr.cache_value
+        # get() raises for undefined and uninitialized variables, so
+        # only values that can be read are ever cached
+        value = globals_.get(name)
+        expr.cache_value = value
+        expr.cache_version = globals_.version
+        return value
 
     def visit_binary_expr(self, expr: Binary):
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
-
-        match expr.operator.type:
-            case TokenType.MINUS:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) - float(right)
-            case TokenType.SLASH:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) / float(right)
-            case TokenType.STAR:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) * float(right)
-            case TokenType.PLUS:
-                if isinstance(left, float) and isinstance(right, float):
-                    return left + right
-                if isinstance(left, str) and isinstance(right, str):
-                    return left + right
-                if isinstance(left, str) or isinstance(right, str):
-                    return self._stringify(left) + self._stringify(right)
-                raise RuntimeError(
-                    expr.operator,
-                    "Operands must be two numbers or two strings.",
-                )
-            case TokenType.GREATER:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) > float(right)
-            case TokenType.GREATER_EQUAL:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) >= float(right)
-            case TokenType.LESS:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) < float(right)
-            case TokenType.LESS_EQUAL:
-                self._check_number_operands(expr.operator, left, right)
-                return float(left) <= float(right)
-            case TokenType.BANG_EQUAL: return not self._is_equal(left, right)
-            case TokenType.EQUAL_EQUAL: return self._is_equal(left, right)
+        handler = expr.handler
+        if handler is None:
+            handler = expr.handler = operators.BINARY[expr.operator.type]
+        return handler(expr.operator, left, right)
 
     def visit_call_expr(self, expr: Call):
         callee = self.evaluate(expr.callee)
+        if type(callee) is NativeFunction and callee.arity_ == len(expr.arguments):
+            # called straight, without an arity() call or argument list
+            evaluate = self.evaluate
+            try:
+                return callee.fn(*[evaluate(argument) for argument in expr.arguments])
+            except NativeError as error:
+                raise LoxRuntimeError(expr.paren, str(error)) from None
+
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
+        self._check_call(expr, callee, arguments)
+        return self._call(expr, callee, arguments)
+
+    def _call(self, expr: Call, callee: LoxCallable, arguments: list):
+        try:
+            return callee(self, arguments)
+        except NativeError as error:
+            # raised by a native called through the generic protocol
+            raise LoxRuntimeError(expr.paren, str(error)) from None
+
+    def _evaluate_call(self, expr: Call) -> tuple[LoxCallable, list]:
+        callee = self.evaluate(expr.callee)
 
         arguments = []
         for argument in expr.arguments:
             arguments.append(self.evaluate(argument))
-        if not isinstance(callee, LoxCallable):
-            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        self._check_call(expr, callee, arguments)
+        return callee, arguments
+
+    def _check_call(self, expr: Call, callee, arguments: list) -> None:
+        if callee is not expr.cache_callee:
+            if not isinstance(callee, LoxCallable):
+                raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+            expr.cache_callee = callee
+            expr.cache_arity = callee.arity()
 
-        function: LoxCallable = callee
-        if len(arguments) != function.arity():
+        if len(arguments) != expr.cache_arity:
             raise LoxRuntimeError(
-                expr.paren, f"Expected {function.arity()} arguments but got {len(arguments)}."
+                expr.paren, f"Expected {expr.cache_arity} arguments but got {len(arguments)}."
             )
 
-        return function(self, arguments)
+    def resolve(self, expr: Expr, depth: int, slot: int):
+        self._locals[expr] = (depth, slot)
 
     def evaluate(self, expr: Expr):
         """Helper method to send the expr back
@@ -138,21 +160,27 @@ class Interpreter(ExprVisitor, StmtVisitor[None]):
         into interpreter's visitor implementation."""
         return expr.accept(self)
 
-    def _execute(self, stmt: Stmt):
-        stmt.accept(self)
+    def _execute(self, stmt: Stmt) -> Completion | None:
+        return stmt.accept(self)
 
-    def visit_block_stmt(self, stmt: "Block") -> None:
-        self.execute_block(stmt.statements, Environment(self._environment))
-        return None
+    def visit_block_stmt(self, stmt: "Block") -> Completion | None:
+        return self.execute_block(stmt.statements, Environment(self._environment))
 
-    def execute_block(self, statements: Iterable[Stmt], environment: Environment):
+    def execute_block(
+        self, statements: Iterable[Stmt], environment: Environment
+    ) -> Completion | None:
         # to keep the interpreter simple, we inelegantly change
         # and restore environment for each block
         previous: Environment = self._environment
         try:
             self._environment = environment
             for statement in statements:
-                self._execute(statement)
+                completion = self._execute(statement)
+                if completion is not None:
+                    # a break or return, stop here and hand it
+                    # to the enclosing loop or function
+                    return completion
+            return None
         finally:
             self._environment = previous
 
@@ -161,15 +189,14 @@ class Interpreter(ExprVisitor, StmtVisitor[None]):
         return None
 
     def visit_function_stmt(self, stmt: stmt.Function) -> None:
-        function = LoxFunction(stmt)
-        self._environment.define(stmt.name.lexeme, function)
+        self._define(stmt.name, self._function(stmt))
         return None
 
-    def visit_if_stmt(self, stmt: "stmt.If") -> None:
+    def visit_if_stmt(self, stmt: "stmt.If") -> Completion | None:
         if self._is_truthy(self.evaluate(stmt.condition)):
-            self._execute(stmt.then_branch)
-        elif stmt.else_branch is not None:
-            self._execute(stmt.then_branch)
+            return self._execute(stmt.then_branch)
+        if stmt.else_branch is not None:
+            return self._execute(stmt.else_branch)
         return None
 
     def visit_print_stmt(self, stmt: Print) -> None:
@@ -177,14 +204,19 @@ class Interpreter(ExprVisitor, StmtVisitor[None]):
         print(self._stringify(value))
         return None
 
-    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+    def visit_return_stmt(self, stmt: stmt.Return) -> Completion:
+        if stmt.tail_call is not None:
+            function, arguments = self._evaluate_call(stmt.tail_call)
+            if type(function) is LoxFunction or type(function) is MemoizedFunction:
+                return TailCall(function, arguments)
+            return Completion(self._call(stmt.tail_call, function, arguments))
+
         value = None
         if stmt.value is not None:
             value = self.evaluate(stmt.value)
-        # use an exception to unwind the interpreter past the visit methods
-        # of all of the containing statements back to the code
-        # that began executing the body
-        raise ReturnException(value=value)
+        # every containing statement passes the completion up
+        # to the LoxFunction that began executing the body
+        return Completion(value)
 
     def visit_var_stmt(self, stmt: Var) -> None:
         # sets a variable to nil if it isn’t explicitly initialized
@@ -192,65 +224,40 @@ class Interpreter(ExprVisitor, StmtVisitor[None]):
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
 
-        self._environment.define(stmt.name.lexeme, value)
+        self._define(stmt.name, value)
         return None
 
-    def visit_while_stmt(self, stmt: stmt.While) -> None:
+    def _define(self, name: Token, value):
+        # top-level declarations are globals, everything else
+        # takes the next slot of the current local scope
+        if self._environment is self._globals:
+            self._globals.define(name.symbol, value)
+        else:
+            self._environment.slots.append(value)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> Completion | None:
         while self._is_truthy(self.evaluate(stmt.condition)):
-            try:
-                self.evaluate(stmt.body)
-            except BreakException:
-                break
-        return
+            completion = self._execute(stmt.body)
+            if completion is not None:
+                if completion is BREAK:
+                    break
+                return completion
+        return None
 
-    def visit_break_stmt(self, stmt: stmt.Break) -> None:
-        raise BreakException()
+    def visit_break_stmt(self, stmt: stmt.Break) -> Completion:
+        return BREAK
 
     def visit_assign_expr(self, expr: Assign):
         value = self.evaluate(expr.value)
-        self._environment.assign(expr.name, value)
+        location = self._locals.get(expr)
+        if location is None:
+            self._globals.assign(expr.name, value)
+        else:
+            self._environment.assign_at(location[0], location[1], value)
         return value
 
-    def _is_truthy(self, obj) -> bool:
-        """Lox follows Ruby's simple rule: false and nil are falsey,
-
-        and everything else is truthy.
-        """
-        if obj is None:
-            return False
-        if isinstance(obj, bool):
-            return obj
-        return True
-
-    def _is_equal(self, a, b) -> bool:
-        if a is None and b is None:
-            return True
-        if a is None:
-            return False
-        return a == b
-
-    def _stringify(self, obj) -> str:
-        if obj is None:
-            return "nil"
-        if isinstance(obj, float):
-            text = str(obj)
-            if text.endswith(".0"):
-                text = text[:-2]
-            return text
-        if isinstance(obj, LoxFunction):
-            return obj.to_string()
-        return str(obj)
-
-    def _check_number_operand(self, operator, operand):
-        if isinstance(operand, float):
-            return
-        raise LoxRuntimeError(
-            operator, "Operand must be a number.",
-        )
-
-    def _check_number_operands(self, operator, left, right):
-        if isinstance(left, float) and isinstance(right, float):
-            return
-        raise LoxRuntimeError(
-            operator, "Operands must be numbers.",
-        )
+    _is_truthy = staticmethod(runtime.is_truthy)
+    _is_equal = staticmethod(runtime.is_equal)
+    _stringify = staticmethod(runtime.stringify)
+    _check_number_operand = staticmethod(runtime.check_number_operand)
+    _check_number_operands = staticmethod(runtime.check_number_operands)
@@ -0,0 +1,372 @@
+"""Tree-walking engine that keeps its stack on the heap.
+
+The Interpreter maps every Lox call and every nested expression onto
+Python recursion, so deep Lox recursion ends in a RecursionError long
+before Lox itself would run out of room. This engine walks the same
+resolved tree, but as a loop over an explicit stack of tasks: each task
+is an ``(op, node)`` pair, and evaluating an expression pushes the tasks
+for its operands followed by the one combining their values, which are
+kept on a separate value stack.
+
+Calls push a RETURN_POINT task holding the caller's environment and
+loops push a LOOP_END task, so return and break simply pop tasks until
+they reach the matching one. The number of active Lox calls is bounded
+by ``max_call_depth``; going deeper is reported as a "Stack overflow."
+runtime error.
+
+The passes run before it, the Resolver, the optimizer and the purity
+analysis, walk expressions with explicit stacks too, so a long chain of
+``+`` runs whatever its length. The parser still recurses into brackets
+and prefix operators, and reports nesting deeper than the Python stack
+goes as a syntax error.
+
+A call to a memoized function that misses its cache pushes a MEMO_STORE
+task under the RETURN_POINT, which stores the value the call leaves on
+the value stack; a tail call that misses adds another one, so the
+result is stored under the arguments of every call of the chain.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from . import operators, runtime, stmt
+from .completion import Completion
+from .environment import Environment
+from .error_handler import ErrorHandler
+from .exception import LoxRuntimeError
+from .expr import (
+    Assign,
+    Binary,
+    Call,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from .interpreter import Interpreter
+from .lox_function import LoxFunction
+from .memo import MISSING, MemoizedFunction
+from .stmt import Block, Print, Stmt, StmtExpression, Var
+from .tokenclass import TokenType
+
+DEFAULT_MAX_CALL_DEPTH = 100_000
+
+# tasks
+EXEC = 0
+EVAL = 1
+POP = 2
+PRINT = 3
+DEFINE = 4
+IF = 5
+LOOP_TEST = 6
+LOOP_CHECK = 7
+LOOP_END = 8
+RESTORE = 9
+RETURN_POINT = 10
+RETURN = 11
+TAIL_CALL = 12
+ASSIGN = 13
+UNARY = 14
+BINARY = 15
+LOGICAL = 16
+CALL = 17
+MEMO_STORE = 18
+
+
+class IterativeInterpreter(Interpreter):
+    """Runs resolved programs without recursing in Python."""
+
+    def __init__(
+        self,
+        error_handler: ErrorHandler,
+        max_call_depth: int = DEFAULT_MAX_CALL_DEPTH,
+        memo_size: int | None = None,
+    ):
+        super().__init__(error_handler, memo_size=memo_size)
+        self.max_call_depth = max_call_depth
+        self._tasks: list[tuple] = []
+        self._values: list = []
+        self._depth = 0
+
+    def interpret(self, statements: Iterable[Stmt]):
+        statements = self._analyse(statements)
+        try:
+            for statement in statements:
+                self._execute(statement)
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error=error)
+            self._tasks.clear()
+            self._values.clear()
+            self._depth = 0
+            self._environment = self._globals
+
+    def evaluate(self, expr):
+        floor = len(self._tasks)
+        self._tasks.append((EVAL, expr))
+        self._run(floor)
+        return self._values.pop()
+
+    def _execute(self, stmt: Stmt) -> None:
+        floor = len(self._tasks)
+        self._tasks.append((EXEC, stmt))
+        self._run(floor)
+
+    def execute_block(self, statements: Iterable[Stmt], environment: Environment):
+        # only reached when a native calls back into a LoxFunction,
+        # run its body as a call of its own
+        floor = len(self._tasks)
+        self._enter(list(statements), environment)
+        self._run(floor)
+        return Completion(self._values.pop())
+
+    def _enter(self, body: list[Stmt], environment: Environment) -> None:
+        self._depth += 1
+        tasks = self._tasks
+        tasks.append((RETURN_POINT, self._environment))
+        self._environment = environment
+        tasks.extend([(EXEC, statement) for statement in reversed(body)])
+
+    def _unwind(self, floor: int, op: int, boundary: int | None = None) -> tuple | None:
+        """Pop tasks down to and including the first ``op`` task, or the
+        first ``boundary`` task if that comes first."""
+        tasks = self._tasks
+        while len(tasks) > floor:
+            task = tasks.pop()
+            if task[0] == op or task[0] == boundary:
+                return task
+        return None
+
+    def _return(self, floor: int, value) -> None:
+        marker = self._unwind(floor, RETURN_POINT)
+        if marker is not None:
+            self._environment = marker[1]
+            self._depth -= 1
+        self._values.append(value)
+
+    def _look_up(self, callee: MemoizedFunction, arguments: list):
+        """The cached result of the call, or ``MISSING`` after pushing
+        the task storing it once the call returns."""
+        cache = callee.cache
+        key, value = cache.look_up(arguments)
+        if value is MISSING and key is not None:
+            self._tasks.append((MEMO_STORE, (cache, key)))
+        return value
+
+    def _call_arguments(self, expr: Call) -> tuple:
+        values = self._values
+        count = len(expr.arguments)
+        arguments = values[len(values) - count:]
+        del values[len(values) - count:]
+        callee = values.pop()
+        self._check_call(expr, callee, arguments)
+        return callee, arguments
+
+    def _run(self, floor: int) -> None:
+        tasks = self._tasks
+        values = self._values
+
+        while len(tasks) > floor:
+            op, node = tasks.pop()
+
+            if op == EVAL:
+                kind = type(node)
+                if kind is VariableExpr:
+                    values.append(self._look_up_variable(node.name, node))
+                elif kind is Literal:
+                    values.append(node.value)
+                elif kind is Binary:
+                    tasks.append((BINARY, node))
+                    tasks.append((EVAL, node.right))
+                    tasks.append((EVAL, node.left))
+                elif kind is Call:
+                    tasks.append((CALL, node))
+                    for argument in reversed(node.arguments):
+                        tasks.append((EVAL, argument))
+                    tasks.append((EVAL, node.callee))
+                elif kind is Grouping:
+                    tasks.append((EVAL, node.expression))
+                elif kind is Assign:
+                    tasks.append((ASSIGN, node))
+                    tasks.append((EVAL, node.value))
+                elif kind is Logical:
+                    tasks.append((LOGICAL, node))
+                    tasks.append((EVAL, node.left))
+                elif kind is Unary:
+                    tasks.append((UNARY, node))
+                    tasks.append((EVAL, node.right))
+                else:
+                    raise RuntimeError(f"Unknown expression {node!r}.")
+
+            elif op == BINARY:
+                right = values.pop()
+                handler = node.handler
+                if handler is None:
+                    handler = node.handler = operators.BINARY[node.operator.type]
+                values[-1] = handler(node.operator, values[-1], right)
+
+            elif op == EXEC:
+                kind = type(node)
+                if kind is StmtExpression:
+                    tasks.append((POP, None))
+                    tasks.append((EVAL, node.expression))
+                elif kind is stmt.If:
+                    tasks.append((IF, node))
+                    tasks.append((EVAL, node.condition))
+                elif kind is stmt.Return:
+                    if node.tail_call is not None:
+                        call = node.tail_call
+                        tasks.append((TAIL_CALL, call))
+                        for argument in reversed(call.arguments):
+                            tasks.append((EVAL, argument))
+                        tasks.append((EVAL, call.callee))
+                    elif node.value is not None:
+                        tasks.append((RETURN, None))
+                        tasks.append((EVAL, node.value))
+                    else:
+                        self._return(floor, None)
+                elif kind is Block:
+                    tasks.append((RESTORE, self._environment))
+                    self._environment = Environment(self._environment)
+                    tasks.extend([(EXEC, statement) for statement in reversed(node.statements)])
+                elif kind is Var:
+                    if node.initializer is None:
+                        self._define(node.name, None)
+                    else:
+                        tasks.append((DEFINE, node))
+                        tasks.append((EVAL, node.initializer))
+                elif kind is stmt.While:
+                    tasks.append((LOOP_END, self._environment))
+                    tasks.append((LOOP_TEST, node))
+                elif kind is Print:
+                    tasks.append((PRINT, None))
+                    tasks.append((EVAL, node.expression))
+                elif kind is stmt.Function:
+                    self._define(node.name, self._function(node))
+                elif kind is stmt.Break:
+                    # never past the call the break is in
+                    marker = self._unwind(floor, LOOP_END, RETURN_POINT)
+                    if marker is None:
+                        pass
+                    elif marker[0] == LOOP_END:
+                        self._environment = marker[1]
+                    else:
+                        # a stray break ends the call like a bare
+                        # return, as in the Interpreter
+                        self._environment = marker[1]
+                        self._depth -= 1
+                        values.append(None)
+                else:
+                    raise RuntimeError(f"Unknown statement {node!r}.")
+
+            elif op == CALL:
+                callee, arguments = self._call_arguments(node)
+                kind = type(callee)
+                if kind is MemoizedFunction:
+                    value = self._look_up(callee, arguments)
+                    if value is not MISSING:
+                        values.append(value)
+                        continue
+                if kind is LoxFunction or kind is MemoizedFunction:
+                    if self._depth >= self.max_call_depth:
+                        raise LoxRuntimeError(node.paren, "Stack overflow.")
+                    self._enter(
+                        callee.declaration.body, Environment(callee.closure, arguments)
+                    )
+                else:
+                    values.append(self._call(node, callee, arguments))
+
+            elif op == POP:
+                values.pop()
+
+            elif op == IF:
+                value = values.pop()
+                if value is not None and value is not False:
+                    tasks.append((EXEC, node.then_branch))
+                elif node.else_branch is not None:
+                    tasks.append((EXEC, node.else_branch))
+
+            elif op == LOOP_TEST:
+                tasks.append((LOOP_CHECK, node))
+                tasks.append((EVAL, node.condition))
+
+            elif op == LOOP_CHECK:
+                value = values.pop()
+                if value is not None and value is not False:
+                    tasks.append((LOOP_TEST, node))
+                    tasks.append((EXEC, node.body))
+
+            elif op == LOOP_END:
+                # the loop ended by its condition
+                pass
+
+            elif op == RESTORE:
+                self._environment = node
+
+            elif op == RETURN_POINT:
+                # the body ran to its end without returning
+                self._environment = node
+                self._depth -= 1
+                values.append(None)
+
+            elif op == RETURN:
+                self._return(floor, values.pop())
+
+            elif op == TAIL_CALL:
+                callee, arguments = self._call_arguments(node)
+                kind = type(callee)
+                if kind is LoxFunction or kind is MemoizedFunction:
+                    # replace the current call rather than nesting
+                    marker = self._unwind(floor, RETURN_POINT)
+                    if kind is MemoizedFunction:
+                        value = self._look_up(callee, arguments)
+                        if value is not MISSING:
+                            # the result of the call being replaced
+                            if marker is not None:
+                                tasks.append(marker)
+                            self._return(floor, value)
+                            continue
+                    if marker is not None:
+                        tasks.append(marker)
+                    self._environment = Environment(callee.closure, arguments)
+                    tasks.extend(
+                        [(EXEC, statement) for statement in reversed(callee.declaration.body)]
+                    )
+                else:
+                    self._return(floor, self._call(node, callee, arguments))
+
+            elif op == ASSIGN:
+                value = values[-1]
+                location = self._locals.get(node)
+                if location is None:
+                    self._globals.assign(node.name, value)
+                else:
+                    self._environment.assign_at(location[0], location[1], value)
+
+            elif op == MEMO_STORE:
+                cache, key = node
+                cache.store(key, values[-1])
+
+            elif op == DEFINE:
+                self._define(node.name, values.pop())
+
+            elif op == PRINT:
+                print(runtime.stringify(values.pop()))
+
+            elif op == UNARY:
+                handler = node.handler
+                if handler is None:
+                    handler = node.handler = operators.UNARY[node.operator.type]
+                values[-1] = handler(node.operator, values[-1])
+
+            elif op == LOGICAL:
+                value = values[-1]
+                truthy = value is not None and value is not False
+                if truthy == (node.operator.type == TokenType.OR):
+                    # short-circuited, the left operand is the result
+                    continue
+                values.pop()
+                tasks.append((EVAL, node.right))
+
+            else:
+                raise RuntimeError(f"Unknown task {op}.")
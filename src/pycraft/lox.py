@@ -1,74 +1,241 @@
+import mmap
+import os
 import sys
 
+from . import cache
+from .closure_compiler import ClosureInterpreter
 from .error_handler import ErrorHandler
+from .errors import ParseError
 from .exception import LoxRuntimeError
 from .interpreter import Interpreter
-from .parser import Parser
-from .scanner import Scanner
-from .stmt import StmtExpression
+from .iterative import IterativeInterpreter
+from .memo import MemoCache
+from .natives import NativeModule
+from .optimizer import Optimizer
+from .parser import BufferParser, Parser
+from .resolver import Resolver
+from .scanner import BufferScanner, MappedScanner, StreamingScanner
+from .stmt import Print, StmtExpression
+from .transpiler import PythonInterpreter
+from .vm import VM
 
+# execution engines selectable with Lox(engine=...) and --engine
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "python": PythonInterpreter,
+    "stack": IterativeInterpreter,
+    "vm": VM,
+}
 
 
 class Lox:
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        engine: str = "tree",
+        optimization_level: int = 0,
+        max_call_depth: int | None = None,
+        lazy_functions: bool = False,
+        memo_size: int | None = None,
+    ) -> None:
         self.error_handler = ErrorHandler()
-        self._interpreter = Interpreter(error_handler=self.error_handler)
+        # parse function bodies on their first call; syntax errors in
+        # a body are then only reported if it gets called
+        self.lazy_functions = lazy_functions
+        options = {}
+        if max_call_depth is not None:
+            # only the engines keeping their own call stack take a limit
+            if engine not in ("stack", "vm"):
+                raise ValueError("max_call_depth needs the stack or vm engine")
+            options["max_call_depth"] = max_call_depth
+        if memo_size is not None:
+            # only the engines calling LoxFunctions memoize them
+            if engine not in ("tree", "stack"):
+                raise ValueError("memo_size needs the tree or stack engine")
+            options["memo_size"] = memo_size
+        self._interpreter = ENGINES[engine](error_handler=self.error_handler, **options)
+        # the node counts of the last run are kept on the optimizer
+        self.optimizer = Optimizer(level=optimization_level)
 
-    def run_file(self, path):
-        with open(path, "rt", encoding="utf-8") as f:
-            src = f.read()
+    def memo_stats(self) -> list[MemoCache]:
+        """The caches of the functions memoized so far."""
+        memoizer = getattr(self._interpreter, "memoizer", None)
+        return [] if memoizer is None else memoizer.stats()
+
+    def install(self, module: NativeModule) -> None:
+        """Define the natives of ``module`` as globals."""
+        module.install(self._interpreter)
+
+    def run_file(
+        self, path, stream: bool = False, mapped: bool = False, cached: bool = False
+    ):
+        if cached:
+            self.run_cached(path)
+        elif mapped:
+            self.run_mapped(path)
+        else:
+            with open(path, "rt", encoding="utf-8") as f:
+                if stream:
+                    self.run_stream(f)
+                else:
+                    self.run(source=f.read())
 
-        self.run(source=src)
         if self.had_error():
             sys.exit(65)
         if self.had_runtime_error():
             sys.exit(70)
 
+    def check_file(self, path):
+        """Report the syntax and resolution errors of the script at
+        ``path`` without running it, exiting like ``run_file``."""
+        with open(path, "rt", encoding="utf-8") as f:
+            self.check(source=f.read())
+
+        if self.had_error():
+            sys.exit(65)
+
+    def check(self, source):
+        scanner = BufferScanner(source=source, error_handler=self.error_handler)
+        parser = BufferParser(tokens=scanner.scan_buffer(), error_handler=self.error_handler)
+        statements = parser.parse()
+        if not self.error_handler.had_error():
+            self._resolve(statements)
+
     def run_prompt(self):
         try:
             while True:
                 src = input(">>>")
-                scanner = Scanner(source=src, error_handler=self.error_handler)
-                tokens = scanner.scan_tokens()
+                scanner = BufferScanner(source=src, error_handler=self.error_handler)
+                tokens = scanner.scan_buffer()
 
                 # print([t.lexeme or t.type for t in tokens])
-                parser = Parser(tokens=tokens, error_handler=self.error_handler)
+                parser = BufferParser(tokens=tokens, error_handler=self.error_handler)
                 statements = []
+                errors_before = len(self.error_handler.errors)
                 try:
                     statements = parser.parse()
                 except LoxRuntimeError as exc:
                     sys.tracebacklimit = 0
                     self.error_handler.runtime_error(error=exc)
+                if len(self.error_handler.errors) == errors_before:
+                    self._resolve(statements)
+                if len(self.error_handler.errors) != errors_before:
+                    # don't run a line that failed to parse or resolve
+                    continue
+                statements = self.optimizer.optimize(statements)
                 for stmt in statements:
+                    # echo the value of bare expressions back to the user
                     if isinstance(stmt, StmtExpression):
-                        try:
-                            res = self._interpreter.evaluate(stmt.expression)
-                        except LoxRuntimeError as exc:
-                            sys.tracebacklimit = 0
-                            self.error_handler.runtime_error(error=exc)
-                        else:
-                            print(self._interpreter._stringify(res))
-                    else:
-                        try:
-                            self._interpreter._execute(stmt)
-                        except LoxRuntimeError as exc:
-                            sys.tracebacklimit = 0
-                            self.error_handler.runtime_error(error=exc)
+                        stmt = Print(stmt.expression)
+                    self._interpreter.interpret([stmt])
 
         except EOFError:
             pass
 
     def run(self, source):
-        scanner = Scanner(source=source, error_handler=self.error_handler)
-        tokens = scanner.scan_tokens()
-        parser = Parser(tokens=tokens, error_handler=self.error_handler)
+        scanner = BufferScanner(source=source, error_handler=self.error_handler)
+        tokens = scanner.scan_buffer()
+        self._parse_and_run(BufferParser(
+            tokens=tokens, error_handler=self.error_handler, lazy_functions=self.lazy_functions
+        ))
+
+    def run_mapped(self, path):
+        """Run the program in the file at ``path`` without reading it whole.
+
+        The file is memory-mapped and scanned in place as bytes; only
+        the lexemes tokens need are decoded, so the source never exists
+        as one str.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can't be mapped
+                tokens = MappedScanner(b"", error_handler=self.error_handler).scan_tokens()
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                    with memoryview(mapping) as source:
+                        scanner = MappedScanner(source, error_handler=self.error_handler)
+                        tokens = scanner.scan_tokens()
+        self._parse_and_run(Parser(
+            tokens=tokens, error_handler=self.error_handler, lazy_functions=self.lazy_functions
+        ))
+
+    def run_cached(self, path):
+        """Run the script at ``path``, from its cached program if it has one.
+
+        Otherwise the script is parsed, resolved and optimized as by
+        ``run``, and the result is cached for the next run. Function
+        bodies are always parsed up front, whatever ``lazy_functions``
+        says: the cache can't hold a body that wasn't parsed.
+        """
+        with open(path, "rb") as f:
+            source = f.read()
+        key = cache.cache_key(source, self.optimizer.level)
+        program = cache.load(path, key)
+        if program is not None:
+            program.resolve(self._interpreter)
+            self._interpreter.interpret(program.statements)
+            return
+
+        scanner = BufferScanner(source=source.decode("utf-8"), error_handler=self.error_handler)
+        parser = BufferParser(tokens=scanner.scan_buffer(), error_handler=self.error_handler)
         statements = parser.parse()
         if self.error_handler.had_error():
             return
 
+        recorder = cache.ResolutionRecorder(self._interpreter)
+        Resolver(recorder, error_handler=self.error_handler).resolve(statements)
+        if self.error_handler.had_error():
+            return
+
+        statements = self.optimizer.optimize(statements)
+        cache.store(path, key, cache.Program(statements, recorder.resolutions))
         self._interpreter.interpret(statements)
 
+    def _parse_and_run(self, parser):
+        statements = parser.parse()
+        if self.error_handler.had_error():
+            return
+
+        self._resolve(statements)
+        if self.error_handler.had_error():
+            return
+
+        statements = self.optimizer.optimize(statements)
+        self._interpret(statements)
+
+    def run_stream(self, reader):
+        """Run a program read from ``reader`` while it is being read.
+
+        Each top-level declaration is resolved and executed as soon as
+        it has been parsed, so statements before a syntax error have
+        already run by the time it is reported. Nothing is executed
+        after the first error.
+        """
+        scanner = StreamingScanner(reader, error_handler=self.error_handler)
+        parser = Parser(
+            tokens=scanner, error_handler=self.error_handler, lazy_functions=self.lazy_functions
+        )
+        for statement in parser.declarations():
+            if self.error_handler.had_error() or self.had_runtime_error():
+                continue
+            self._resolve([statement])
+            if self.error_handler.had_error():
+                continue
+            self._interpret(self.optimizer.optimize([statement]))
+
+    def _interpret(self, statements):
+        try:
+            self._interpreter.interpret(statements)
+        except ParseError:
+            # a function body parsed on its first call had errors, they
+            # have been reported and the program can't go on
+            pass
+
+    def _resolve(self, statements):
+        resolver = Resolver(self._interpreter, error_handler=self.error_handler)
+        resolver.resolve(statements)
+
     def had_error(self):
         return self.error_handler.had_error()
 
@@ -8,3 +8,6 @@ class LoxCallable:
 
     def __call__(self, interpreter, arguments: list) -> Any:
         pass
+
+    def to_string(self) -> str:
+        return "<native fn>"
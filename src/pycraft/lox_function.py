@@ -1,28 +1,36 @@
-from .exception import ReturnException
+from .completion import TailCall
 from .lox_callable import LoxCallable
 from .environment import Environment
 
 
 class LoxFunction(LoxCallable):
 
-    def __init__(self, declaration):
+    def __init__(self, declaration, closure: Environment):
         self.declaration = declaration
+        # the environment that is active when the function is declared
+        self.closure = closure
 
     def __call__(self, interpreter, arguments: list) -> None:
-        # Each function call gets its own environment
-        environment = Environment(interpreter._globals)
-        for i, param in enumerate(self.declaration.params):
-            environment.define(
-                param.lexeme,
-                arguments[i],
-            )
+        function = self
+        while True:
+            # Each function call gets its own environment. Parameters are
+            # the first locals of the body, so the freshly built argument
+            # list becomes the slot array as is.
+            environment = Environment(function.closure, arguments)
 
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnException as exc:
-            return exc.value
-        else:
-            return None
+            completion = interpreter.execute_block(function.declaration.body, environment)
+            if completion is None:
+                return None
+            if type(completion) is not TailCall:
+                # a stray break ends the function like a bare return
+                return completion.value
+            # run the tail call here rather than one level deeper
+            function = completion.function
+            arguments = completion.arguments
+            if type(function) is not LoxFunction:
+                # a MemoizedFunction, which runs the rest of the chain
+                # in its own loop to store the result
+                return function(interpreter, arguments)
 
     def arity(self) -> int:
         return len(self.declaration.params)
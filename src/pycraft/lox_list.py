@@ -0,0 +1,61 @@
+"""The Lox list, a growable sequence of values.
+
+Lists of numbers only, by far the common case, keep their items unboxed
+in an ``array('d')``, which the list natives hand straight to C loops
+(and to NumPy, when it is installed). Storing anything but a number
+turns the array into a plain Python list for good.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Iterable
+
+
+class LoxList:
+
+    __slots__ = "items"
+
+    def __init__(self, items: array | list | None = None):
+        # an array('d') while every item is a float, a list otherwise
+        self.items: array | list = array("d") if items is None else items
+
+    @classmethod
+    def of(cls, values: Iterable) -> "LoxList":
+        """A list of ``values``, unboxed if they are all numbers."""
+        values = list(values)
+        if set(map(type, values)) <= {float}:
+            return cls(array("d", values))
+        return cls(values)
+
+    def is_numeric(self) -> bool:
+        return type(self.items) is array
+
+    def append(self, value) -> None:
+        if type(value) is not float and type(self.items) is array:
+            self.items = self.items.tolist()
+        self.items.append(value)
+
+    def __setitem__(self, index: int, value) -> None:
+        if type(value) is not float and type(self.items) is array:
+            self.items = self.items.tolist()
+        self.items[index] = value
+
+    def __getitem__(self, index: int):
+        return self.items[index]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not LoxList:
+            return NotImplemented
+        if type(self.items) is type(other.items):
+            return self.items == other.items
+        # an array never equals a list, compare their items
+        return len(self) == len(other) and list(self.items) == list(other.items)
+
+    # lists are mutable, they can't be hashed
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LoxList({self.items!r})"
@@ -0,0 +1,31 @@
+"""The Lox map, from keys to values.
+
+A map is a Python dict, so lookups, stores and removals are O(1) and
+iteration follows insertion order. Keys are the Lox values with value
+equality: strings, numbers, booleans and nil (see ``natives.map_key``).
+Two keys are the same key exactly when ``is_equal`` says they are equal,
+since both come down to Python's ``==``.
+"""
+from __future__ import annotations
+
+
+class LoxMap:
+
+    __slots__ = "entries"
+
+    def __init__(self, entries: dict | None = None):
+        self.entries: dict = {} if entries is None else entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not LoxMap:
+            return NotImplemented
+        return self.entries == other.entries
+
+    # maps are mutable, they can't be hashed
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LoxMap({self.entries!r})"
@@ -0,0 +1,168 @@
+"""Memoization of pure Lox functions.
+
+With memoization on, the interpreter runs each program through a
+``PurityAnalysis`` before executing it and declares the functions found
+pure as ``MemoizedFunction``s. A memoized function looks its arguments
+up in a ``MemoCache`` before running its body, and keeps the result
+after. Each cache holds at most ``size`` results, dropping the least
+recently used one to make room, so memory stays bounded however many
+different arguments a function sees.
+
+Arguments that can't be hashed, lists and maps, are passed through to
+an uncached call; the same goes for calls made while the function isn't
+(or is no longer) known to be pure.
+
+Memoized calls keep to the engine's own call discipline: a tail call to
+a memoized function still reuses the caller's frame, the result being
+stored under the arguments of every call of the chain once it is known,
+and the stack engine runs memoized calls on its explicit stack too.
+"""
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from typing import Iterable
+
+from . import stmt
+from .completion import TailCall
+from .environment import Environment
+from .lox_function import LoxFunction
+from .natives import NativeFunction
+from .purity import PurityAnalysis
+
+DEFAULT_MEMO_SIZE = 1024
+
+# the result of a call not in the cache
+MISSING = object()
+
+
+def _key(arguments: list) -> tuple:
+    # the types tell true from 1 and a Rope from a str, which are equal
+    # but not interchangeable; and -0 equals 0 but prints differently
+    key = (*arguments, *map(type, arguments))
+    if 0.0 in arguments:
+        key += tuple(math.copysign(1.0, value) for value in arguments if type(value) is float)
+    return key
+
+
+class MemoCache:
+    """The results of one function by arguments, least recently used
+    first, with hit and miss counts."""
+
+    __slots__ = "name", "size", "results", "enabled", "hits", "misses"
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.results: OrderedDict[tuple, object] = OrderedDict()
+        # cleared when the function stops being known to be pure
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.results.clear()
+
+    def look_up(self, arguments: list) -> tuple[tuple | None, object]:
+        """The key of ``arguments`` and the cached result of the call,
+        ``MISSING`` if there is none.
+
+        The key is None when the call can't be cached, the cache being
+        disabled or an argument an unhashable list or map.
+        """
+        if not self.enabled:
+            return None, MISSING
+        key = _key(arguments)
+        results = self.results
+        try:
+            value = results.get(key, MISSING)
+        except TypeError:
+            return None, MISSING
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            results.move_to_end(key)
+        return key, value
+
+    def store(self, key: tuple, value) -> None:
+        if not self.enabled:
+            # disabled while the call ran
+            return
+        results = self.results
+        results[key] = value
+        if len(results) > self.size:
+            results.popitem(last=False)
+
+    def __repr__(self) -> str:
+        return f"MemoCache({self.name!r}, hits={self.hits}, misses={self.misses})"
+
+
+class MemoizedFunction(LoxFunction):
+    """A pure LoxFunction, calling its body only for arguments it hasn't
+    seen recently."""
+
+    def __init__(self, declaration, closure, cache: MemoCache):
+        super().__init__(declaration, closure)
+        self.cache = cache
+
+    def __call__(self, interpreter, arguments: list):
+        function = self
+        # the caches and keys to store the result under, one per
+        # memoized call of the chain of tail calls
+        pending = []
+        while True:
+            if type(function) is MemoizedFunction:
+                cache = function.cache
+                key, value = cache.look_up(arguments)
+                if value is not MISSING:
+                    break
+                if key is not None:
+                    pending.append((cache, key))
+            completion = interpreter.execute_block(
+                function.declaration.body, Environment(function.closure, arguments)
+            )
+            if completion is None:
+                value = None
+                break
+            if type(completion) is not TailCall:
+                value = completion.value
+                break
+            function = completion.function
+            arguments = completion.arguments
+        # innermost first, leaving the outermost call the most recently used
+        for cache, key in reversed(pending):
+            cache.store(key, value)
+        return value
+
+
+class Memoizer:
+    """Decides, program by program, which functions an interpreter
+    memoizes, and holds their caches."""
+
+    def __init__(self, size: int = DEFAULT_MEMO_SIZE):
+        self.size = size
+        self.analysis = PurityAnalysis()
+        self.caches: dict[stmt.Function, MemoCache] = {}
+
+    def analyse(self, statements: Iterable[stmt.Stmt], globals_: dict[int, object]) -> None:
+        pure_natives = {
+            symbol
+            for symbol, value in globals_.items()
+            if isinstance(value, NativeFunction) and value.pure
+        }
+        pure, retracted = self.analysis.analyse(statements, pure_natives)
+        for function in retracted:
+            self.caches[function].disable()
+        for function in sorted(pure, key=lambda function: function.name.line):
+            self.caches[function] = MemoCache(function.name.lexeme, self.size)
+
+    def make_function(self, declaration: stmt.Function, closure) -> LoxFunction:
+        cache = self.caches.get(declaration)
+        if cache is None or not cache.enabled:
+            return LoxFunction(declaration, closure)
+        return MemoizedFunction(declaration, closure, cache)
+
+    def stats(self) -> list[MemoCache]:
+        return list(self.caches.values())
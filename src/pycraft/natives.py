@@ -0,0 +1,477 @@
+"""Natives: Python functions callable from Lox.
+
+Natives are registered in a ``NativeModule`` with its ``native``
+decorator, which declares their Lox name and arity, and a module is
+defined in an interpreter with ``NativeModule.install`` (or
+``Lox.install``). Every engine defines the modules of
+``STANDARD_LIBRARY`` when it starts.
+
+A ``NativeFunction`` is called straight, as ``fn(*arguments)``: each
+engine checks its arity against the number of arguments at the call
+site and calls ``fn`` without going through ``LoxCallable.__call__``,
+and with one or two arguments without building an argument list.
+Natives that call back into Lox take the interpreter as well; they are
+declared with ``interpreter=True`` and called through the generic
+protocol. A native of one number may also declare an ``elementwise``
+C function computing the same, which ``map`` applies to a list of
+numbers in one C loop.
+
+A native reports a bad argument by raising ``NativeError``, which the
+call site turns into a runtime error at the call's closing parenthesis.
+"""
+from __future__ import annotations
+
+import inspect
+import math
+import time
+from array import array
+from operator import mul
+from typing import Callable
+
+from .lox_callable import LoxCallable
+from .lox_list import LoxList
+from .lox_map import LoxMap
+from .runtime import Rope, is_string, stringify
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class NativeError(Exception):
+    """A native's complaint about its arguments, reported as a runtime
+    error where it was called."""
+
+
+class NativeFunction(LoxCallable):
+    """A native called as ``fn(*arguments)``."""
+
+    __slots__ = "name", "arity_", "fn", "elementwise", "pure"
+
+    def __init__(
+        self,
+        name: str,
+        arity: int,
+        fn: Callable,
+        elementwise: Callable | None = None,
+        pure: bool = False,
+    ):
+        self.name = name
+        self.arity_ = arity
+        self.fn = fn
+        # fn on one float, in C; errors where fn would report them
+        self.elementwise = elementwise
+        # whether the result only depends on the arguments, and the
+        # call has no other effect
+        self.pure = pure
+
+    def arity(self) -> int:
+        return self.arity_
+
+    def __call__(self, interpreter, arguments: list):
+        return self.fn(*arguments)
+
+
+class InterpreterNative(NativeFunction):
+    """A native called as ``fn(interpreter, *arguments)``."""
+
+    __slots__ = ()
+
+    def __call__(self, interpreter, arguments: list):
+        return self.fn(interpreter, *arguments)
+
+
+class NativeModule:
+    """A named batch of natives, defined in an interpreter together."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.functions: dict[str, NativeFunction] = {}
+
+    def native(
+        self,
+        name: str | None = None,
+        *,
+        arity: int | None = None,
+        interpreter: bool = False,
+        elementwise: Callable | None = None,
+        pure: bool = False,
+    ):
+        """Register the decorated function as the native ``name``, by
+        default its own name.
+
+        The arity defaults to the number of parameters of the function,
+        not counting the interpreter for an ``interpreter`` native. A
+        ``pure`` native may be called by memoized Lox functions.
+        """
+        def register(fn: Callable) -> Callable:
+            native_name = name or fn.__name__
+            native_arity = arity
+            if native_arity is None:
+                native_arity = len(inspect.signature(fn).parameters) - interpreter
+            kind = InterpreterNative if interpreter else NativeFunction
+            self.functions[native_name] = kind(native_name, native_arity, fn, elementwise, pure)
+            return fn
+        return register
+
+    def install(self, interpreter) -> None:
+        """Define every native of the module as a global of ``interpreter``."""
+        for name, function in self.functions.items():
+            interpreter.define_global(name, function)
+
+
+def _number(value) -> float:
+    if type(value) is not float:
+        raise NativeError("Argument must be a number.")
+    return value
+
+
+def _string(value) -> str:
+    if not is_string(value):
+        raise NativeError("Argument must be a string.")
+    # joins a Rope
+    return str(value)
+
+
+def _index(value) -> int:
+    if type(value) is not float or not value.is_integer():
+        raise NativeError("Index must be a whole number.")
+    return int(value)
+
+
+def _domain(function: Callable, *arguments) -> float:
+    try:
+        return function(*arguments)
+    except (ValueError, OverflowError):
+        raise NativeError("Argument out of range.") from None
+
+
+MATH = NativeModule("math")
+
+
+@MATH.native("abs", elementwise=math.fabs, pure=True)
+def _abs(x):
+    return abs(_number(x))
+
+
+@MATH.native(elementwise=math.floor, pure=True)
+def floor(x):
+    return float(_domain(math.floor, _number(x)))
+
+
+@MATH.native(elementwise=math.ceil, pure=True)
+def ceil(x):
+    return float(_domain(math.ceil, _number(x)))
+
+
+@MATH.native("round", pure=True)
+def _round(x):
+    # halves away from zero, not to even
+    x = _number(x)
+    return float(_domain(math.floor, abs(x) + 0.5)) * (-1.0 if x < 0 else 1.0)
+
+
+@MATH.native(elementwise=math.sqrt, pure=True)
+def sqrt(x):
+    return _domain(math.sqrt, _number(x))
+
+
+@MATH.native("pow", pure=True)
+def _pow(x, y):
+    return _domain(math.pow, _number(x), _number(y))
+
+
+@MATH.native(elementwise=math.exp, pure=True)
+def exp(x):
+    return _domain(math.exp, _number(x))
+
+
+@MATH.native(elementwise=math.log, pure=True)
+def log(x):
+    return _domain(math.log, _number(x))
+
+
+@MATH.native(elementwise=math.sin, pure=True)
+def sin(x):
+    return _domain(math.sin, _number(x))
+
+
+@MATH.native(elementwise=math.cos, pure=True)
+def cos(x):
+    return _domain(math.cos, _number(x))
+
+
+@MATH.native("min", pure=True)
+def _min(x, y):
+    return min(_number(x), _number(y))
+
+
+@MATH.native("max", pure=True)
+def _max(x, y):
+    return max(_number(x), _number(y))
+
+
+STRING = NativeModule("string")
+
+
+@STRING.native("len", pure=True)
+def _len(value):
+    # a Rope knows its length without being joined
+    if not is_string(value) and type(value) is not LoxList and type(value) is not LoxMap:
+        raise NativeError("Argument must be a string, a list or a map.")
+    return float(len(value))
+
+
+@STRING.native(pure=True)
+def substring(s, start, end):
+    s = _string(s)
+    start, end = _index(start), _index(end)
+    if not 0 <= start <= end <= len(s):
+        raise NativeError("Substring out of range.")
+    return s[start:end]
+
+
+@STRING.native(pure=True)
+def indexOf(s, part):
+    return float(_string(s).find(_string(part)))
+
+
+@STRING.native(pure=True)
+def upper(s):
+    return _string(s).upper()
+
+
+@STRING.native(pure=True)
+def lower(s):
+    return _string(s).lower()
+
+
+@STRING.native(pure=True)
+def trim(s):
+    return _string(s).strip()
+
+
+@STRING.native(pure=True)
+def replace(s, old, new):
+    return _string(s).replace(_string(old), _string(new))
+
+
+@STRING.native("str", pure=True)
+def _str(value):
+    return stringify(value)
+
+
+@STRING.native(pure=True)
+def num(s):
+    """The number ``s`` spells, or nil."""
+    s = _string(s).strip()
+    try:
+        value = float(s)
+    except ValueError:
+        return None
+    # only what a Lox number literal could say, no "inf" or "1e3"
+    return value if s.replace(".", "", 1).lstrip("-").isdigit() else None
+
+
+TIME = NativeModule("time")
+
+
+@TIME.native()
+def clock():
+    return time.time()
+
+
+@TIME.native()
+def sleep(seconds):
+    seconds = _number(seconds)
+    if seconds < 0:
+        raise NativeError("Argument out of range.")
+    time.sleep(seconds)
+
+
+def _list(value) -> LoxList:
+    if type(value) is not LoxList:
+        raise NativeError("Argument must be a list.")
+    return value
+
+
+def _numbers(value) -> array:
+    items = _list(value).items
+    if type(items) is not array:
+        raise NativeError("List must hold only numbers.")
+    return items
+
+
+def _element(items: LoxList, index) -> int:
+    index = _index(index)
+    if not 0 <= index < len(items):
+        raise NativeError("Index out of range.")
+    return index
+
+
+LIST = NativeModule("list")
+
+
+@LIST.native("list")
+def _new_list():
+    return LoxList()
+
+
+@LIST.native("range")
+def _range(start, end):
+    """The list of the whole numbers from ``start`` up to ``end``."""
+    return LoxList(array("d", map(float, range(_index(start), _index(end)))))
+
+
+@LIST.native()
+def push(items, value):
+    _list(items).append(value)
+
+
+@LIST.native()
+def pop(items):
+    items = _list(items)
+    if not len(items):
+        raise NativeError("Pop from empty list.")
+    return items.items.pop()
+
+
+@LIST.native(pure=True)
+def get(collection, index):
+    """The item of a list at ``index``, or the value of a map at key
+    ``index``, nil if it has none."""
+    if type(collection) is LoxMap:
+        return collection.entries.get(map_key(index))
+    items = _list(collection)
+    return items[_element(items, index)]
+
+
+@LIST.native("set")
+def _set(collection, index, value):
+    if type(collection) is LoxMap:
+        collection.entries[map_key(index)] = value
+        return
+    items = _list(collection)
+    items[_element(items, index)] = value
+
+
+@LIST.native()
+def slice(items, start, end):
+    items = _list(items)
+    start, end = _index(start), _index(end)
+    if not 0 <= start <= end <= len(items):
+        raise NativeError("Slice out of range.")
+    return LoxList(items.items[start:end])
+
+
+@LIST.native("sum", pure=True)
+def _sum(items):
+    return sum(_numbers(items), 0.0)
+
+
+@LIST.native(pure=True)
+def dot(left, right):
+    """The dot product of two lists of numbers, by NumPy when it is
+    installed, which may round differently."""
+    left, right = _numbers(left), _numbers(right)
+    if len(left) != len(right):
+        raise NativeError("Lists must have the same length.")
+    if numpy is not None and len(left):
+        return float(numpy.dot(numpy.frombuffer(left), numpy.frombuffer(right)))
+    return sum(map(mul, left, right), 0.0)
+
+
+@LIST.native()
+def sort(items):
+    """A sorted copy of a list of numbers or of strings."""
+    items = _list(items)
+    if items.is_numeric():
+        if numpy is not None and len(items):
+            return LoxList(array("d", numpy.sort(numpy.frombuffer(items.items)).tobytes()))
+        return LoxList(array("d", sorted(items.items)))
+    if not all(map(is_string, items.items)):
+        raise NativeError("Can only sort numbers or strings.")
+    return LoxList(sorted(items.items, key=str))
+
+
+@LIST.native("map", interpreter=True)
+def _map(interpreter, items, function):
+    """The list of ``function`` applied to each item.
+
+    A native runs over the items in a C loop, without a Lox call per
+    item: its elementwise C function over a list of numbers, or
+    otherwise ``fn`` itself.
+    """
+    items = _list(items)
+    if not isinstance(function, LoxCallable) or function.arity() != 1:
+        raise NativeError("Expect a function of one argument.")
+    if type(function) is NativeFunction:
+        elementwise = function.elementwise
+        if elementwise is not None and items.is_numeric():
+            try:
+                return LoxList(array("d", map(elementwise, items.items)))
+            except (ValueError, OverflowError):
+                # let the native report it
+                pass
+        return LoxList.of(map(function.fn, items.items))
+    return LoxList.of([function(interpreter, [item]) for item in items.items])
+
+
+def _map_of(value) -> LoxMap:
+    if type(value) is not LoxMap:
+        raise NativeError("Argument must be a map.")
+    return value
+
+
+def map_key(value):
+    """``value`` as the key of a LoxMap entry."""
+    kind = type(value)
+    if kind is str or kind is bool or value is None:
+        return value
+    if kind is float:
+        if value != value:
+            # NaN equals nothing, not even itself
+            raise NativeError("Map key can't be NaN.")
+        return value
+    if kind is Rope:
+        return str(value)
+    raise NativeError("Map key must be a string, number, boolean or nil.")
+
+
+MAP = NativeModule("map")
+
+
+@MAP.native()
+def hashMap():
+    return LoxMap()
+
+
+@MAP.native(pure=True)
+def has(entries, key):
+    return map_key(key) in _map_of(entries).entries
+
+
+@MAP.native()
+def remove(entries, key):
+    """Remove the entry of ``key``, giving its value, nil if it has none."""
+    return _map_of(entries).entries.pop(map_key(key), None)
+
+
+@MAP.native()
+def keys(entries):
+    return LoxList.of(_map_of(entries).entries)
+
+
+@MAP.native("values")
+def _values(entries):
+    return LoxList.of(_map_of(entries).entries.values())
+
+
+# defined in every interpreter
+STANDARD_LIBRARY = (MATH, STRING, TIME, LIST, MAP)
+
+
+def install_standard_library(interpreter) -> None:
+    for module in STANDARD_LIBRARY:
+        module.install(interpreter)
@@ -0,0 +1,443 @@
+"""Optional passes simplifying the tree between resolving and running.
+
+The passes run after the Resolver, so static errors are still reported
+for code that gets optimized away. They rewrite the tree in place and
+only ever replace nodes with literals or with one of their own
+children, which keeps every variable node the Resolver has seen (and
+the slot layout of every scope) intact.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from . import runtime, stmt
+from .exception import LoxRuntimeError
+from .expr import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from .stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
+from .tokenclass import TokenType
+
+# passes run at each optimization level, in order
+LEVELS = {
+    0: (),
+    1: ("fold", "dead_code"),
+    2: ("fold", "propagate", "fold", "dead_code"),
+}
+
+
+class _Transformer(ExprVisitor[Expr], StmtVisitor["Stmt | None"]):
+    """Walks the whole tree, rewriting children with whatever the visit
+    methods return. Statement visitors return None to drop the statement.
+
+    Expressions are rewritten bottom up by ``_expression``, without
+    recursing: an expression visitor gets a node whose operands have
+    been rewritten already, and returns the node to replace it with.
+    """
+
+    def transform(self, statements: Iterable[Stmt]) -> list[Stmt]:
+        return self._statements(statements)
+
+    def _statements(self, statements: Iterable[Stmt]) -> list[Stmt]:
+        result = []
+        for statement in statements:
+            statement = statement.accept(self)
+            if statement is not None:
+                result.append(statement)
+        return result
+
+    def _branch(self, statement: Stmt) -> Stmt:
+        # a branch can't be dropped on its own, leave an empty block
+        return statement.accept(self) or Block([])
+
+    def _expression(self, expr: Expr) -> Expr:
+        # (node, whether its operands are rewritten) pairs to go, and
+        # the rewritten operands waiting for their node
+        pending = [(expr, False)]
+        done = []
+        while pending:
+            expr, ready = pending.pop()
+            if not ready:
+                children = expr.children()
+                pending.append((expr, True))
+                pending.extend((child, False) for child in reversed(children))
+                continue
+            count = len(expr.children())
+            if count:
+                expr.set_children(done[-count:])
+                del done[-count:]
+            done.append(expr.accept(self))
+        return done[0]
+
+    def visit_block_stmt(self, stmt: Block) -> Stmt | None:
+        stmt.statements = self._statements(stmt.statements)
+        return stmt
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> Stmt | None:
+        stmt.expression = self._expression(stmt.expression)
+        return stmt
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> Stmt | None:
+        # bodies not parsed yet run as they are
+        if stmt.lazy_body() is None:
+            stmt.body = self._statements(stmt.body)
+        return stmt
+
+    def visit_if_stmt(self, stmt: stmt.If) -> Stmt | None:
+        stmt.condition = self._expression(stmt.condition)
+        stmt.then_branch = self._branch(stmt.then_branch)
+        if stmt.else_branch is not None:
+            stmt.else_branch = self._branch(stmt.else_branch)
+        return stmt
+
+    def visit_print_stmt(self, stmt: Print) -> Stmt | None:
+        stmt.expression = self._expression(stmt.expression)
+        return stmt
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> Stmt | None:
+        if stmt.value is not None:
+            stmt.value = self._expression(stmt.value)
+        return stmt
+
+    def visit_var_stmt(self, stmt: Var) -> Stmt | None:
+        if stmt.initializer is not None:
+            stmt.initializer = self._expression(stmt.initializer)
+        return stmt
+
+    def visit_while_stmt(self, stmt: stmt.While) -> Stmt | None:
+        stmt.condition = self._expression(stmt.condition)
+        stmt.body = self._branch(stmt.body)
+        return stmt
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> Stmt | None:
+        return stmt
+
+    def visit_assign_expr(self, expr: Assign) -> Expr:
+        return expr
+
+    def visit_binary_expr(self, expr: Binary) -> Expr:
+        return expr
+
+    def visit_call_expr(self, expr: Call) -> Expr:
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping) -> Expr:
+        return expr
+
+    def visit_literal_expr(self, expr: Literal) -> Expr:
+        return expr
+
+    def visit_logical_expr(self, expr: Logical) -> Expr:
+        return expr
+
+    def visit_unary_expr(self, expr: Unary) -> Expr:
+        return expr
+
+    def visit_variable_expr(self, expr: VariableExpr) -> Expr:
+        return expr
+
+
+def _fold_binary(operator, left, right):
+    match operator.type:
+        case TokenType.PLUS:
+            # a literal holds a plain str
+            return runtime.flatten(runtime.add(operator, left, right))
+        case TokenType.EQUAL_EQUAL:
+            return runtime.is_equal(left, right)
+        case TokenType.BANG_EQUAL:
+            return not runtime.is_equal(left, right)
+    runtime.check_number_operands(operator, left, right)
+    match operator.type:
+        case TokenType.MINUS:
+            return left - right
+        case TokenType.STAR:
+            return left * right
+        case TokenType.SLASH:
+            return left / right
+        case TokenType.GREATER:
+            return left > right
+        case TokenType.GREATER_EQUAL:
+            return left >= right
+        case TokenType.LESS:
+            return left < right
+        case TokenType.LESS_EQUAL:
+            return left <= right
+
+
+class ConstantFolder(_Transformer):
+    """Evaluates operators whose operands are all literals and strips
+    grouping parentheses. Operations that would fail at runtime are left
+    alone so that they still fail, on their own line, when reached.
+    """
+
+    def visit_grouping_expr(self, expr: Grouping) -> Expr:
+        return expr.expression
+
+    def visit_binary_expr(self, expr: Binary) -> Expr:
+        if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+            try:
+                return Literal(_fold_binary(expr.operator, expr.left.value, expr.right.value))
+            except (LoxRuntimeError, ZeroDivisionError):
+                pass
+        return expr
+
+    def visit_unary_expr(self, expr: Unary) -> Expr:
+        if not isinstance(expr.right, Literal):
+            return expr
+        value = expr.right.value
+        if expr.operator.type == TokenType.BANG:
+            return Literal(not runtime.is_truthy(value))
+        if type(value) is float:
+            return Literal(-value)
+        return expr
+
+    def visit_logical_expr(self, expr: Logical) -> Expr:
+        if not isinstance(expr.left, Literal):
+            return expr
+        truthy = runtime.is_truthy(expr.left.value)
+        if expr.operator.type == TokenType.OR:
+            return expr.left if truthy else expr.right
+        return expr.right if truthy else expr.left
+
+
+class DeadCodeEliminator(_Transformer):
+    """Drops the branches of ifs with a literal condition that can never
+    run, and loops whose condition is a falsey literal."""
+
+    def visit_if_stmt(self, stmt: stmt.If) -> Stmt | None:
+        super().visit_if_stmt(stmt)
+        if not isinstance(stmt.condition, Literal):
+            return stmt
+        if runtime.is_truthy(stmt.condition.value):
+            return stmt.then_branch
+        return stmt.else_branch
+
+    def visit_while_stmt(self, stmt: stmt.While) -> Stmt | None:
+        super().visit_while_stmt(stmt)
+        if isinstance(stmt.condition, Literal) and not runtime.is_truthy(stmt.condition.value):
+            return None
+        return stmt
+
+
+class _Bindings(ExprVisitor[None], StmtVisitor[None]):
+    """Binds local variable references to their declaring statement,
+    following the same scoping rules as the Resolver. Globals are left
+    out, any later line or function may redefine them."""
+
+    def __init__(self):
+        self.scopes: list[dict[str, object]] = []
+        self.references: dict[VariableExpr, object] = {}
+        self.assigned: set = set()
+
+    def bind(self, statements: Iterable[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.scopes.append({})
+        self.bind(stmt.statements)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> None:
+        self._expression(stmt.expression)
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> None:
+        self._declare(stmt.name.symbol, stmt)
+        self.scopes.append({})
+        for param in stmt.params:
+            self._declare(param.symbol, param)
+        if stmt.lazy_body() is None:
+            self.bind(stmt.body)
+        else:
+            # any local in sight may be assigned by the unparsed body
+            for scope in self.scopes:
+                self.assigned.update(scope.values())
+        self.scopes.pop()
+
+    def visit_if_stmt(self, stmt: stmt.If) -> None:
+        self._expression(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._expression(stmt.expression)
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+        if stmt.value is not None:
+            self._expression(stmt.value)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        if stmt.initializer is not None:
+            self._expression(stmt.initializer)
+        self._declare(stmt.name.symbol, stmt)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> None:
+        self._expression(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> None:
+        return None
+
+    def _expression(self, expr: Expr) -> None:
+        # every node of the expression, without recursing; expression
+        # visitors only look at the node itself
+        pending = [expr]
+        while pending:
+            expr = pending.pop()
+            expr.accept(self)
+            pending.extend(expr.children())
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        declaration = self._look_up(expr.name.symbol)
+        if declaration is not None:
+            self.assigned.add(declaration)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        return None
+
+    def visit_call_expr(self, expr: Call) -> None:
+        return None
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        return None
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        return None
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        return None
+
+    def visit_variable_expr(self, expr: VariableExpr) -> None:
+        declaration = self._look_up(expr.name.symbol)
+        if declaration is not None:
+            self.references[expr] = declaration
+
+    def _declare(self, symbol: int, declaration) -> None:
+        if self.scopes:
+            self.scopes[-1][symbol] = declaration
+
+    def _look_up(self, symbol: int):
+        for scope in reversed(self.scopes):
+            declaration = scope.get(symbol)
+            if declaration is not None:
+                return declaration
+        return None
+
+
+class ConstantPropagator(_Transformer):
+    """Replaces reads of local variables that are initialized with a
+    literal and never assigned afterwards by the literal itself.
+
+    ``nil`` initializers are skipped, reading those is an error.
+    """
+
+    def transform(self, statements: Iterable[Stmt]) -> list[Stmt]:
+        statements = list(statements)
+        bindings = _Bindings()
+        bindings.bind(statements)
+        self._references = bindings.references
+        self._assigned = bindings.assigned
+        return self._statements(statements)
+
+    def visit_variable_expr(self, expr: VariableExpr) -> Expr:
+        declaration = self._references.get(expr)
+        if (
+            isinstance(declaration, Var)
+            and declaration not in self._assigned
+            and isinstance(declaration.initializer, Literal)
+            and declaration.initializer.value is not None
+        ):
+            return Literal(declaration.initializer.value)
+        return expr
+
+
+PASSES = {
+    "fold": ConstantFolder,
+    "propagate": ConstantPropagator,
+    "dead_code": DeadCodeEliminator,
+}
+
+
+class _NodeCounter(StmtVisitor[int]):
+
+    def count(self, statements: Iterable[Stmt]) -> int:
+        return sum(statement.accept(self) for statement in statements)
+
+    def _expression(self, expr: Expr) -> int:
+        count = 0
+        pending = [expr]
+        while pending:
+            count += 1
+            pending.extend(pending.pop().children())
+        return count
+
+    def visit_block_stmt(self, stmt: Block) -> int:
+        return 1 + self.count(stmt.statements)
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> int:
+        return 1 + self._expression(stmt.expression)
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> int:
+        if stmt.lazy_body() is not None:
+            return 1
+        return 1 + self.count(stmt.body)
+
+    def visit_if_stmt(self, stmt: stmt.If) -> int:
+        count = 1 + self._expression(stmt.condition) + stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            count += stmt.else_branch.accept(self)
+        return count
+
+    def visit_print_stmt(self, stmt: Print) -> int:
+        return 1 + self._expression(stmt.expression)
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> int:
+        return 1 + (self._expression(stmt.value) if stmt.value is not None else 0)
+
+    def visit_var_stmt(self, stmt: Var) -> int:
+        return 1 + (self._expression(stmt.initializer) if stmt.initializer is not None else 0)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> int:
+        return 1 + self._expression(stmt.condition) + stmt.body.accept(self)
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> int:
+        return 1
+
+
+def count_nodes(statements: Iterable[Stmt]) -> int:
+    """Number of statement and expression nodes in the tree."""
+    return _NodeCounter().count(statements)
+
+
+class Optimizer:
+    """Runs the passes of an optimization level over resolved statements.
+
+    ``node_counts`` holds the size of the tree before the first pass and
+    after each of them, as ``(pass name, node count)`` pairs.
+    """
+
+    def __init__(self, level: int = 1):
+        if level not in LEVELS:
+            raise ValueError(f"Unknown optimization level {level}.")
+        self.level = level
+        self.node_counts: list[tuple[str, int]] = []
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        self.node_counts = [("input", count_nodes(statements))]
+        for name in LEVELS[self.level]:
+            statements = PASSES[name]().transform(statements)
+            self.node_counts.append((name, count_nodes(statements)))
+        return statements
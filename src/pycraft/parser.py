@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import sys
+from functools import partial
+from typing import Callable, Iterable, Iterator
+
 from . import stmt
 from .errors import ParseError
 from .exception import LoxRuntimeError
@@ -14,22 +18,70 @@ from .expr import (
     Unary,
     VariableExpr,
 )
-from .stmt import Block, Function, Print, Return, Stmt, StmtExpression, Var, While
-from .tokenclass import Token, TokenType
+from .stmt import (
+    Block,
+    Function,
+    LazyBody,
+    Print,
+    Return,
+    Stmt,
+    StmtExpression,
+    Var,
+    While,
+)
+from .tokenclass import TOKEN_TYPES, Token, TokenBuffer, TokenType
+
+# binding powers, loosest first
+ASSIGNMENT = 1
+OR = 2
+AND = 3
+EQUALITY = 4
+COMPARISON = 5
+TERM = 6
+FACTOR = 7
+UNARY = 8
+CALL = 9
+
+# infix (and postfix) operators: their binding power and the node they make
+_INFIX = {
+    TokenType.EQUAL: (ASSIGNMENT, Assign),
+    TokenType.OR: (OR, Logical),
+    TokenType.AND: (AND, Logical),
+    TokenType.BANG_EQUAL: (EQUALITY, Binary),
+    TokenType.EQUAL_EQUAL: (EQUALITY, Binary),
+    TokenType.GREATER: (COMPARISON, Binary),
+    TokenType.GREATER_EQUAL: (COMPARISON, Binary),
+    TokenType.LESS: (COMPARISON, Binary),
+    TokenType.LESS_EQUAL: (COMPARISON, Binary),
+    TokenType.PLUS: (TERM, Binary),
+    TokenType.MINUS: (TERM, Binary),
+    TokenType.SLASH: (FACTOR, Binary),
+    TokenType.STAR: (FACTOR, Binary),
+    TokenType.LEFT_PAREN: (CALL, Call),
+}
 
 
 class Parser:
 
-    def __init__(self, tokens: list[Token], error_handler):
-        self.tokens = tokens
-        self.current = 0
+    def __init__(self, tokens: Iterable[Token], error_handler, lazy_functions: bool = False):
+        # tokens are pulled one at a time, so they can come straight
+        # from a scanner reading its source as it goes
+        self.tokens = iter(tokens)
+        self._previous: Token | None = None
+        self._next: Token | None = None
+        self._kept_tokens: dict[tuple, Token] = {}
+        self._kept_lines: dict[int, int] = {}
         self.error_handler = error_handler
+        # skip function bodies, only parsing them when first called
+        self.lazy_functions = lazy_functions
 
     def parse(self) -> list[Stmt]:
-        statements: list[Stmt] = []
+        return list(self.declarations())
+
+    def declarations(self) -> Iterator[Stmt]:
+        """Yield the top-level declarations one by one, as they are parsed."""
         while not self.is_at_end():
-            statements.append(self.declaration())
-        return statements
+            yield self.declaration()
 
     def statement(self) -> Stmt:
 
@@ -111,8 +163,9 @@ class Parser:
         return body
 
     def break_statement(self) -> Stmt:
+        keyword: Token = self.kept()
         self.consume(TokenType.SEMICOLON, "Expect ';' after 'break'.")
-        return stmt.Break()
+        return stmt.Break(keyword)
 
     def if_statement(self) -> Stmt:
         """
@@ -141,7 +194,7 @@ class Parser:
         return Print(value)
 
     def return_statement(self) -> Stmt:
-        keyword: Token = self.previous()
+        keyword: Token = self.kept()
         value: Expr = None
         if not self.check(TokenType.SEMICOLON):
             value = self.expression()
@@ -149,7 +202,8 @@ class Parser:
         return Return(keyword, value)
 
     def var_declaration(self) -> Stmt:
-        name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
+        self.consume(TokenType.IDENTIFIER, "Expect variable name.")
+        name = self.kept()
         initializer: Expr = None
         if self.match(TokenType.EQUAL):
             initializer = self.expression()
@@ -165,52 +219,14 @@ class Parser:
 
         return stmt.While(condition, body)
 
-    def assignment(self) -> Expr:
-        # expression     → assignment ;
-        # assignment     → IDENTIFIER "=" assignment | logic_or ;
-        # logic_or       → logic_and ( "or" logic_and )* ;
-        # logic_and      → equality ( "and" equality )* ;
-        expr = self._or()
-
-        if self.match(TokenType.EQUAL):
-            equals: Token = self.previous()
-            value: Expr = self.assignment()
-
-            if isinstance(expr, VariableExpr):
-                name: Token = expr.name
-                return Assign(name, value)
-
-            self.__error(equals, "Invalid assignment target.")
-
-        return expr
-
-    def _or(self) -> Expr:
-        expr = self._and()
-
-        while self.match(TokenType.OR):
-            operator = self.previous()
-            right = self._and()
-            expr = Logical(expr, operator, right)
-
-        return expr
-
-    def _and(self) -> Expr:
-        expr = self.equality()
-
-        while self.match(TokenType.AND):
-            operator = self.previous()
-            right = self.equality()
-            expr = Logical(expr, operator, right)
-
-        return expr
-
     def expression_statement(self) -> Stmt:
         value = self.expression()
         self.consume(TokenType.SEMICOLON, "Expect ';' after value.")
         return StmtExpression(value)
 
     def function(self, kind: str) -> Stmt:
-        name = self.consume(TokenType.IDENTIFIER, "Expect " + kind + " name.")
+        self.consume(TokenType.IDENTIFIER, "Expect " + kind + " name.")
+        name = self.kept()
         self.consume(
             TokenType.LEFT_PAREN, "Expect '(' after " + kind + " name."
         )
@@ -222,7 +238,8 @@ class Parser:
                         self.peek(),
                         "Can't have more than 255 parameters."
                     )
-                parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
+                self.consume(TokenType.IDENTIFIER, "Expect parameter name.")
+                parameters.append(self.kept())
                 if not self.match(TokenType.COMMA):
                     break
 
@@ -231,6 +248,8 @@ class Parser:
         self.consume(
             TokenType.LEFT_BRACE, "Expect '{' before " + kind + " body."
         )
+        if self.lazy_functions:
+            return Function(name, parameters, LazyBody(self.skip_block(), self.error_handler))
         body = self.block()
         return Function(name, parameters, body)
 
@@ -248,8 +267,37 @@ class Parser:
         # so let's return list of Stmt instead of a Block for now
         return statements
 
+    def skip_block(self) -> Callable[[], list[Stmt]]:
+        """Skip the rest of a block, only matching braces.
+
+        Returns a function parsing the skipped block, as ``block`` would
+        have.
+        """
+        tokens = []
+        self._skip_to_closing_brace(tokens)
+        tokens.append(self.peek())
+        self.consume(TokenType.RIGHT_BRACE, "Expect '}' after block.")
+        tokens.append(Token(TokenType.EOF, "", None, tokens[-1].line))
+        return Parser(tokens, self.error_handler, lazy_functions=True).block
+
+    def _skip_to_closing_brace(self, skipped: list[Token] | None) -> None:
+        depth = 0
+        while True:
+            token_type = self.peek_type()
+            if token_type is TokenType.EOF:
+                return
+            if token_type is TokenType.RIGHT_BRACE:
+                if depth == 0:
+                    return
+                depth -= 1
+            elif token_type is TokenType.LEFT_BRACE:
+                depth += 1
+            if skipped is not None:
+                skipped.append(self.peek())
+            self.advance()
+
     def expression(self) -> "Expr":
-        return self.assignment()
+        return self.parse_precedence(ASSIGNMENT)
 
     def declaration(self) -> Stmt:
         """
@@ -266,67 +314,63 @@ class Parser:
         except ParseError:
             self._synchronize()
             return None
-
-    def equality(self) -> "Expr":
-        # equality       → comparison ( ( "!=" | "==" ) comparison )* ;
-        expr = self.comparison()
-        while self.match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            operator = self.previous()
-            right = self.comparison()
-            expr = Binary(expr, operator, right)
-        return expr
-
-    def comparison(self) -> "Expr":
-        # comparison     → term ( ( ">" | ">=" | "<" | "<=" ) term )* ;
-        expr = self.term()
-
-        while self.match(
-            TokenType.GREATER,
-            TokenType.GREATER_EQUAL,
-            TokenType.LESS_EQUAL,
-            TokenType.LESS,
-        ):
-            operator = self.previous()
-            right = self.term()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def term(self) -> "Expr":
-        expr = self.__factor()
-
-        while self.match(TokenType.PLUS, TokenType.MINUS):
-            operator = self.previous()
-            right = self.__factor()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def __factor(self) -> "Expr":
-        expr = self.unary()
-
-        while self.match(TokenType.SLASH, TokenType.STAR):
-            operator = self.previous()
-            right = self.unary()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def unary(self) -> "Expr":
+        except RecursionError:
+            # brackets or prefix operators nested deeper than the Python
+            # stack goes, a syntax error like any other
+            raise self.__error(token=self.peek(), message="Expression nests too deeply.") from None
+
+    def parse_precedence(self, precedence: int) -> Expr:
+        """Parse an expression whose operators bind at least as tightly
+        as ``precedence``.
+
+        expression     → assignment ;
+        assignment     → IDENTIFIER "=" assignment | logic_or ;
+        logic_or       → logic_and ( "or" logic_and )* ;
+        logic_and      → equality ( "and" equality )* ;
+        equality       → comparison ( ( "!=" | "==" ) comparison )* ;
+        comparison     → term ( ( ">" | ">=" | "<" | "<=" ) term )* ;
+        term           → factor ( ( "-" | "+" ) factor )* ;
+        factor         → unary ( ( "/" | "*" ) unary )* ;
+        unary          → ( "!" | "-" ) unary | call ;
+        call           → primary ( "(" arguments? ")" )* ;
+
+        Rather than one method per rule, each operand is parsed once and
+        infix operators are folded onto it while they bind tightly
+        enough, so an operand costs a couple of calls however deep the
+        ladder of rules above it is.
+        """
         if self.match(TokenType.BANG, TokenType.MINUS):
-            operator = self.previous()
-            right = self.unary()
-            return Unary(operator, right)
-        return self.call()
+            operator = self.kept()
+            expr = Unary(operator, self.parse_precedence(UNARY))
+        else:
+            expr = self.primary()
 
-    def call(self) -> Expr:
-        expr = self.primary()
         while True:
-            if self.match(TokenType.LEFT_PAREN):
+            rule = _INFIX.get(self.peek_type())
+            if rule is None or rule[0] < precedence:
+                return expr
+            binding, node = rule
+            self.advance()
+            if node is Call:
                 expr = self.finish_call(expr)
+            elif node is Assign:
+                expr = self.assignment(expr)
             else:
-                break
-        return expr
+                operator = self.kept()
+                # left-associative, the right operand binds tighter
+                expr = node(expr, operator, self.parse_precedence(binding + 1))
+
+    def assignment(self, target: Expr) -> Expr:
+        equals: Token = self.previous()
+        # right-associative, the value may be an assignment itself
+        value: Expr = self.parse_precedence(ASSIGNMENT)
+
+        if isinstance(target, VariableExpr):
+            name: Token = target.name
+            return Assign(name, value)
+
+        self.__error(equals, "Invalid assignment target.")
+        return target
 
     def finish_call(self, callee: Expr) -> Expr:
         arguments: list[Expr] = []
@@ -341,11 +385,11 @@ class Parser:
                 if not self.match(TokenType.COMMA):
                     break
 
-        paren = self.consume(
+        self.consume(
             TokenType.RIGHT_PAREN,
             "Expect ')' after arguments.",
         )
-        return Call(callee, paren, arguments)
+        return Call(callee, self.kept(), arguments)
 
     def primary(self) -> "Expr":
         if self.match(TokenType.FALSE):
@@ -357,7 +401,7 @@ class Parser:
         elif self.match(TokenType.NUMBER, TokenType.STRING):
             return Literal(self.previous().literal)
         elif self.match(TokenType.IDENTIFIER):
-            return VariableExpr(name=self.previous())
+            return VariableExpr(name=self.kept())
         elif self.match(TokenType.LEFT_PAREN):
             expr = self.expression()
             self.consume(
@@ -384,14 +428,42 @@ class Parser:
 
     def advance(self) -> Token:
         if not self.is_at_end():
-            self.current += 1
+            self._previous = self._next
+            self._next = None
         return self.previous()
 
     def previous(self) -> "Token":
-        return self.tokens[self.current - 1]
+        return self._previous
+
+    def kept(self) -> Token:
+        """The previous token, to be kept by a node.
+
+        Equal operator and keyword tokens are shared between nodes: every
+        `+` on a line refers to the same Token object. Names are not, the
+        transpiler and the optimizer tell parameters apart by their Token.
+        """
+        token = self.previous()
+        if token.type == TokenType.IDENTIFIER:
+            # its lexeme already comes canonical from the symbol table
+            token.line = self._kept_lines.setdefault(token.line, token.line)
+            return token
+        key = (token.type, token.lexeme, token.line)
+        kept = self._kept_tokens.get(key)
+        if kept is None:
+            # operators and line numbers repeat, share their objects
+            token.lexeme = sys.intern(token.lexeme)
+            token.line = self._kept_lines.setdefault(token.line, token.line)
+            kept = self._kept_tokens[key] = token
+        return kept
 
     def peek(self) -> "Token":
-        return self.tokens[self.current]
+        # the only lookahead the grammar needs is the next token
+        if self._next is None:
+            self._next = next(self.tokens)
+        return self._next
+
+    def peek_type(self) -> TokenType:
+        return self.peek().type
 
     def is_at_end(self) -> bool:
         return self.peek().type == TokenType.EOF
@@ -400,3 +472,52 @@ class Parser:
         if self.check(token_type):
             return self.advance()
         raise self.__error(token=self.peek(), message=message)
+
+
+class BufferParser(Parser):
+    """Parser reading a TokenBuffer by index.
+
+    Token types are compared straight from the buffer's type column; a
+    Token object is only made for the tokens the AST or an error message
+    keeps, when ``previous`` or ``peek`` is asked for one.
+    """
+
+    def __init__(self, tokens: TokenBuffer, error_handler, lazy_functions: bool = False):
+        self.tokens = tokens
+        self._types = tokens.types
+        self._current = 0
+        self._kept_tokens: dict[tuple, Token] = {}
+        self._kept_lines: dict[int, int] = {}
+        self.error_handler = error_handler
+        self.lazy_functions = lazy_functions
+
+    def skip_block(self) -> Callable[[], list[Stmt]]:
+        # the tokens stay in the buffer, the block is parsed from there
+        start = self._current
+        self._skip_to_closing_brace(None)
+        self.consume(TokenType.RIGHT_BRACE, "Expect '}' after block.")
+        return partial(self._parse_block_at, start)
+
+    def _parse_block_at(self, start: int) -> list[Stmt]:
+        parser = BufferParser(self.tokens, self.error_handler, lazy_functions=True)
+        parser._current = start
+        return parser.block()
+
+    def check(self, token_type) -> bool:
+        return TOKEN_TYPES[self._types[self._current]] is token_type is not TokenType.EOF
+
+    def advance(self) -> None:
+        if TOKEN_TYPES[self._types[self._current]] is not TokenType.EOF:
+            self._current += 1
+
+    def previous(self) -> Token:
+        return self.tokens[self._current - 1]
+
+    def peek(self) -> Token:
+        return self.tokens[self._current]
+
+    def peek_type(self) -> TokenType:
+        return TOKEN_TYPES[self._types[self._current]]
+
+    def is_at_end(self) -> bool:
+        return TOKEN_TYPES[self._types[self._current]] is TokenType.EOF
@@ -0,0 +1,251 @@
+"""Effect analysis finding the top-level functions that are pure.
+
+A function is pure, and so can be memoized, when a call's result only
+depends on its arguments and the call does nothing but compute it. The
+analysis proves that for a function declared at the top level with
+``fun`` when its body, read without running it:
+
+- doesn't print, and doesn't declare functions of its own (closures
+  made by a call would be shared by memoized calls);
+- only assigns to its own parameters and local variables;
+- only reads its own locals and globals naming pure functions or pure
+  natives, which it may call;
+- calls nothing else: not its parameters, not the result of a call.
+
+Function bodies left unparsed by ``--lazy-functions`` can't be read, so
+a program holding one has no pure functions.
+
+A global counts as naming a function or native only while the program
+never assigns to it or declares it again. The analysis is kept across
+the programs an interpreter runs (prompt lines, streamed declarations),
+so a later program redefining a global takes back the purity of every
+function depending on it; see ``PurityAnalysis.analyse``.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from . import stmt
+from .expr import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from .stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
+
+
+class _Effects(ExprVisitor[None], StmtVisitor[None]):
+    """Collects, in one walk of a program, the globals it writes and,
+    for each top-level function, whether its body is free of effects
+    and the globals it reads."""
+
+    def __init__(self):
+        # local scopes, as sets of symbols, both outside and inside of
+        # functions; empty at the top level
+        self.scopes: list[set[int]] = []
+        # the top-level function being walked, if any
+        self.function: stmt.Function | None = None
+        self.declared: list[int] = []
+        self.assigned: set[int] = set()
+        self.functions: dict[stmt.Function, set[int]] = {}
+        self.impure: set[stmt.Function] = set()
+        # whether a body went unread, which may write any global
+        self.opaque = False
+
+    def walk(self, statements: Iterable[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def _expression(self, expr: Expr) -> None:
+        # every node of the expression, without recursing; expression
+        # visitors only look at the node itself
+        pending = [expr]
+        while pending:
+            expr = pending.pop()
+            expr.accept(self)
+            pending.extend(expr.children())
+
+    def _impure(self) -> None:
+        if self.function is not None:
+            self.impure.add(self.function)
+
+    def _is_local(self, symbol: int) -> bool:
+        return any(symbol in scope for scope in self.scopes)
+
+    def _declare(self, symbol: int) -> None:
+        if self.scopes:
+            self.scopes[-1].add(symbol)
+        else:
+            self.declared.append(symbol)
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.scopes.append(set())
+        self.walk(stmt.statements)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> None:
+        self._expression(stmt.expression)
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> None:
+        top_level = not self.scopes
+        self._declare(stmt.name.symbol)
+        if not top_level:
+            # a closure, made anew by each call of the enclosing function
+            self._impure()
+        if stmt.lazy_body() is not None:
+            # not parsed yet, and parsing it here would defeat the point
+            self.opaque = True
+            return
+
+        enclosing = self.function
+        if top_level:
+            self.function = stmt
+            self.functions[stmt] = set()
+        self.scopes.append({param.symbol for param in stmt.params})
+        self.walk(stmt.body)
+        self.scopes.pop()
+        self.function = enclosing
+
+    def visit_if_stmt(self, stmt: stmt.If) -> None:
+        self._expression(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._impure()
+        self._expression(stmt.expression)
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+        if stmt.value is not None:
+            self._expression(stmt.value)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        if stmt.initializer is not None:
+            self._expression(stmt.initializer)
+        self._declare(stmt.name.symbol)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> None:
+        self._expression(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> None:
+        return None
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        if not self._is_local(expr.name.symbol):
+            self.assigned.add(expr.name.symbol)
+            self._impure()
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        return None
+
+    def visit_call_expr(self, expr: Call) -> None:
+        callee = expr.callee
+        if type(callee) is not VariableExpr or self._is_local(callee.name.symbol):
+            # no telling what gets called
+            self._impure()
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        return None
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        return None
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        return None
+
+    def visit_variable_expr(self, expr: VariableExpr) -> None:
+        symbol = expr.name.symbol
+        if self.function is not None and not self._is_local(symbol):
+            self.functions[self.function].add(symbol)
+
+
+class PurityAnalysis:
+    """Finds pure functions, program after program."""
+
+    def __init__(self):
+        # how many times each global was declared, and the globals ever
+        # assigned, over every program so far
+        self.declarations: dict[int, int] = {}
+        self.assigned: set[int] = set()
+        # the pure functions found so far, by the symbol of their name,
+        # and the globals each of them reads
+        self.pure: dict[int, stmt.Function] = {}
+        self.reads: dict[stmt.Function, set[int]] = {}
+        # set for good once a program holds a function body that wasn't
+        # parsed: it might assign to any global whenever it gets called
+        self.opaque = False
+
+    def _stable(self, symbol: int) -> bool:
+        # declared once, by the function itself
+        return self.declarations.get(symbol, 0) == 1 and symbol not in self.assigned
+
+    def _untouched(self, symbol: int) -> bool:
+        # never declared or assigned by the program, still the native
+        return symbol not in self.declarations and symbol not in self.assigned
+
+    def analyse(
+        self, statements: Iterable[Stmt], pure_natives: set[int]
+    ) -> tuple[set[stmt.Function], set[stmt.Function]]:
+        """The functions of ``statements`` found pure, and the pure
+        functions of earlier programs that no longer are.
+
+        ``pure_natives`` are the symbols of the globals holding pure
+        natives.
+        """
+        effects = _Effects()
+        effects.walk(statements)
+        for symbol in effects.declared:
+            self.declarations[symbol] = self.declarations.get(symbol, 0) + 1
+        self.assigned |= effects.assigned
+        if effects.opaque or self.opaque:
+            self.opaque = True
+            retracted = set(self.pure.values())
+            self.pure.clear()
+            return set(), retracted
+
+        candidates = {
+            function.name.symbol: function
+            for function in effects.functions
+            if function not in effects.impure
+        }
+        self.reads.update((function, effects.functions[function]) for function in candidates.values())
+        retracted = set()
+        for symbol, function in list(self.pure.items()):
+            if symbol in candidates or not self._stable(symbol):
+                retracted.add(function)
+                del self.pure[symbol]
+        pure = {**self.pure, **candidates}
+
+        # drop functions reading anything but stable pure functions and
+        # natives, until none are left to drop
+        changed = True
+        while changed:
+            changed = False
+            for symbol, function in list(pure.items()):
+                if not self._stable(symbol) or not all(
+                    (read in pure and self._stable(read))
+                    or (read in pure_natives and self._untouched(read))
+                    for read in self.reads[function]
+                ):
+                    del pure[symbol]
+                    changed = True
+
+        for symbol, function in list(self.pure.items()):
+            if symbol not in pure:
+                retracted.add(function)
+                del self.pure[symbol]
+        found = {function for symbol, function in pure.items() if symbol in candidates}
+        self.pure.update((symbol, pure[symbol]) for symbol in candidates if symbol in pure)
+        return found, retracted
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from enum import Enum, auto
+from functools import partial
+from typing import Iterable
+
+from . import stmt
+from .error_handler import ErrorHandler
+from .expr import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from .stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
+from .tokenclass import Token
+
+
+class FunctionType(Enum):
+    NONE = auto()
+    FUNCTION = auto()
+
+
+class Resolver(ExprVisitor[None], StmtVisitor[None]):
+    """Static pass run between parsing and interpreting.
+
+    It walks the tree once and tells the interpreter, for every local
+    variable reference, how many scopes up the variable lives (depth)
+    and at which index of that scope it was declared (slot). Names
+    that can't be found in any local scope are assumed to be globals.
+    """
+
+    def __init__(self, interpreter, error_handler: ErrorHandler):
+        self.interpreter = interpreter
+        self.error_handler = error_handler
+        # each scope maps a name's symbol id to its [slot, defined] pair; the global
+        # scope is not tracked since globals are looked up by name
+        self.scopes: list[dict[str, list]] = []
+        self.current_function = FunctionType.NONE
+        # how many loops enclose the code being resolved, counting from
+        # the function it is in
+        self.loop_depth = 0
+
+    def resolve(self, statements: Iterable[Stmt]) -> None:
+        for statement in statements:
+            self._resolve_stmt(statement)
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self._begin_scope()
+        self.resolve(stmt.statements)
+        self._end_scope()
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> None:
+        self._resolve_expr(stmt.expression)
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> None:
+        # declare and define the name eagerly so that
+        # a function can recursively refer to itself
+        self._declare(stmt.name)
+        self._define(stmt.name)
+        self._resolve_function(stmt, FunctionType.FUNCTION)
+
+    def visit_if_stmt(self, stmt: stmt.If) -> None:
+        self._resolve_expr(stmt.condition)
+        self._resolve_stmt(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self._resolve_stmt(stmt.else_branch)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._resolve_expr(stmt.expression)
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+        if self.current_function == FunctionType.NONE:
+            self.error_handler.error(
+                token=stmt.keyword,
+                message="Can't return from top-level code.",
+            )
+        if stmt.value is not None:
+            self._resolve_expr(stmt.value)
+            value = stmt.value
+            while isinstance(value, Grouping):
+                value = value.expression
+            if isinstance(value, Call):
+                # nothing is left to do in the function once this call
+                # returns, so the interpreter may reuse the caller's frame
+                stmt.tail_call = value
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        # split binding into declaring and defining so that
+        # a variable can't be read inside its own initializer
+        self._declare(stmt.name)
+        if stmt.initializer is not None:
+            self._resolve_expr(stmt.initializer)
+        self._define(stmt.name)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> None:
+        self._resolve_expr(stmt.condition)
+        self.loop_depth += 1
+        self._resolve_stmt(stmt.body)
+        self.loop_depth -= 1
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> None:
+        if self.loop_depth == 0:
+            self.error_handler.error(
+                token=stmt.keyword,
+                message="Can't break outside a loop.",
+            )
+
+    # expression visitors only resolve the node itself, _resolve_expr
+    # walks the operands
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self._resolve_local(expr, expr.name)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        return None
+
+    def visit_call_expr(self, expr: Call) -> None:
+        return None
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        return None
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        return None
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        return None
+
+    def visit_variable_expr(self, expr: VariableExpr) -> None:
+        if self.scopes:
+            local = self.scopes[-1].get(expr.name.symbol)
+            if local is not None and not local[1]:
+                self.error_handler.error(
+                    token=expr.name,
+                    message="Can't read local variable in its own initializer.",
+                )
+        self._resolve_local(expr, expr.name)
+
+    def _resolve_stmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def _resolve_expr(self, expr: Expr) -> None:
+        # every node of the expression, operands left to right, without
+        # recursing
+        pending = [expr]
+        while pending:
+            expr = pending.pop()
+            expr.accept(self)
+            pending.extend(reversed(expr.children()))
+
+    def _resolve_function(self, function: stmt.Function, type: FunctionType) -> None:
+        lazy = function.lazy_body()
+        if lazy is not None:
+            # resolve the body once it's parsed, against the scopes
+            # as they are now
+            scopes = [dict(scope) for scope in self.scopes]
+            lazy.prepare = partial(self._resolve_body_later, function, type, scopes)
+            return
+        self._resolve_body(function, type, function.body)
+
+    def _resolve_body_later(
+        self, function: stmt.Function, type: FunctionType, scopes: list[dict], body: list[Stmt]
+    ) -> None:
+        resolver = Resolver(self.interpreter, self.error_handler)
+        resolver.scopes = scopes
+        resolver._resolve_body(function, type, body)
+
+    def _resolve_body(self, function: stmt.Function, type: FunctionType, body: list[Stmt]) -> None:
+        enclosing_function = self.current_function
+        enclosing_loop_depth = self.loop_depth
+        self.current_function = type
+        # a break in the body can't leave a loop around the declaration
+        self.loop_depth = 0
+
+        # parameters and the body share one scope, the same one
+        # LoxFunction creates for every call
+        self._begin_scope()
+        for param in function.params:
+            self._declare(param)
+            self._define(param)
+        self.resolve(body)
+        self._end_scope()
+
+        self.current_function = enclosing_function
+        self.loop_depth = enclosing_loop_depth
+
+    def _begin_scope(self) -> None:
+        self.scopes.append({})
+
+    def _end_scope(self) -> None:
+        self.scopes.pop()
+
+    def _declare(self, name: Token) -> None:
+        if not self.scopes:
+            return
+        scope = self.scopes[-1]
+        if name.symbol in scope:
+            self.error_handler.error(
+                token=name,
+                message="Already a variable with this name in this scope.",
+            )
+            return
+        # slots are handed out in declaration order, which is
+        # the order the interpreter appends values at runtime
+        scope[name.symbol] = [len(scope), False]
+
+    def _define(self, name: Token) -> None:
+        if not self.scopes:
+            return
+        local = self.scopes[-1].get(name.symbol)
+        if local is not None:
+            local[1] = True
+
+    def _resolve_local(self, expr: Expr, name: Token) -> None:
+        for i in range(len(self.scopes) - 1, -1, -1):
+            local = self.scopes[i].get(name.symbol)
+            if local is not None:
+                self.interpreter.resolve(expr, len(self.scopes) - 1 - i, local[0])
+                return
+        # not found, assume it is global
@@ -0,0 +1,181 @@
+"""Value semantics shared by every execution engine."""
+from .exception import LoxRuntimeError
+from .lox_callable import LoxCallable
+from .lox_list import LoxList
+from .lox_map import LoxMap
+
+
+def is_truthy(obj) -> bool:
+    """Lox follows Ruby's simple rule: false and nil are falsey,
+
+    and everything else is truthy.
+    """
+    if obj is None:
+        return False
+    if isinstance(obj, bool):
+        return obj
+    return True
+
+
+# concatenations at least this long make a Rope rather than a str
+ROPE_THRESHOLD = 256
+
+
+class Rope:
+    """A Lox string built by ``+``, joined into a str only when used.
+
+    Appending to a str in a loop copies the whole string every time. A
+    Rope instead keeps the pieces in a list shared with the ropes it was
+    grown from: ``concat`` appends to that list and returns a rope
+    counting one more piece, so building a string piece by piece is
+    linear. Should an older rope be grown again, it copies its own
+    pieces first. The pieces are joined on the first ``str()``, which
+    printing, comparing, hashing and measuring all go through, and the
+    result is kept.
+
+    A Rope is a Lox string like a str is: it is equal to, and hashes
+    like, the str it stands for.
+    """
+
+    __slots__ = "_parts", "_count", "_length", "_flat"
+
+    def __init__(self, parts: list[str], length: int):
+        self._parts = parts
+        self._count = len(parts)
+        self._length = length
+        self._flat: str | None = None
+
+    def concat(self, text: str) -> "Rope":
+        parts = self._parts
+        if len(parts) != self._count:
+            # these parts have grown past us already, branch off
+            parts = parts[:self._count]
+        parts.append(text)
+        return Rope(parts, self._length + len(text))
+
+    def __str__(self) -> str:
+        flat = self._flat
+        if flat is None:
+            parts = self._parts
+            flat = self._flat = "".join(
+                parts if len(parts) == self._count else parts[:self._count]
+            )
+        return flat
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __eq__(self, other) -> bool:
+        if type(other) is Rope:
+            return self._length == other._length and str(self) == str(other)
+        if type(other) is str:
+            return self._length == len(other) and str(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return f"Rope({str(self)!r})"
+
+    def __reduce__(self):
+        # pickles as the str it stands for
+        return str, (str(self),)
+
+
+def is_string(obj) -> bool:
+    return type(obj) is str or type(obj) is Rope
+
+
+def flatten(obj):
+    """``obj``, with a Rope turned into its str."""
+    return str(obj) if type(obj) is Rope else obj
+
+
+def concat(left: str | Rope, right: str | Rope) -> str | Rope:
+    """The Lox string ``left + right``."""
+    if type(left) is Rope:
+        return left.concat(str(right))
+    if type(right) is Rope:
+        right = str(right)
+    if len(left) + len(right) < ROPE_THRESHOLD:
+        return left + right
+    return Rope([left, right], len(left) + len(right))
+
+
+def is_equal(a, b) -> bool:
+    if a is None and b is None:
+        return True
+    if a is None:
+        return False
+    return a == b
+
+
+def stringify(obj) -> str:
+    if obj is None:
+        return "nil"
+    if isinstance(obj, float):
+        text = str(obj)
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+    if isinstance(obj, LoxCallable):
+        return obj.to_string()
+    if type(obj) is LoxList or type(obj) is LoxMap:
+        return _stringify_collection(obj, set())
+    # a Rope is joined here
+    return str(obj)
+
+
+def _stringify_collection(collection: LoxList | LoxMap, outer: set[int]) -> str:
+    def item(value) -> str:
+        if type(value) is LoxList or type(value) is LoxMap:
+            return _stringify_collection(value, outer)
+        return stringify(value)
+
+    if id(collection) in outer:
+        # a collection holding itself
+        return "[...]" if type(collection) is LoxList else "{...}"
+    outer.add(id(collection))
+    if type(collection) is LoxList:
+        text = "[" + ", ".join(map(item, collection.items)) + "]"
+    else:
+        text = "{" + ", ".join(
+            f"{item(key)}: {item(value)}" for key, value in collection.entries.items()
+        ) + "}"
+    outer.discard(id(collection))
+    return text
+
+
+def add(operator, left, right):
+    """Slow path of '+' once the two-numbers case has been ruled out."""
+    if isinstance(left, float) and isinstance(right, float):
+        return left + right
+    left_is_string = is_string(left)
+    right_is_string = is_string(right)
+    if left_is_string and right_is_string:
+        return concat(left, right)
+    if left_is_string:
+        return concat(left, stringify(right))
+    if right_is_string:
+        return concat(stringify(left), right)
+    raise LoxRuntimeError(
+        operator,
+        "Operands must be two numbers or two strings.",
+    )
+
+
+def check_number_operand(operator, operand):
+    if isinstance(operand, float):
+        return
+    raise LoxRuntimeError(
+        operator, "Operand must be a number.",
+    )
+
+
+def check_number_operands(operator, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return
+    raise LoxRuntimeError(
+        operator, "Operands must be numbers.",
+    )
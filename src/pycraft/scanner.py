@@ -1,5 +1,7 @@
+import re
+
 from .error_handler import ErrorHandler
-from .tokenclass import Token, TokenType
+from .tokenclass import Token, TokenBuffer, TokenType
 
 
 class Scanner:
@@ -137,7 +139,7 @@ class Scanner:
             self.advance()
 
         if self._isAtEnd():
-            self.error_handler.error(self._line, "Unterminated string.")
+            self.error_handler.error(line=self._line, message="Unterminated string.")
             return
 
         # the closing "
@@ -191,3 +193,330 @@ class Scanner:
         if self._current + 1 >= len(self.source):
             return "\0"
         return self.source[self._current + 1]
+
+
+# one alternative per kind of lexeme, tried in order; ASCII only, the
+# rest of Unicode goes through Scanner's own character tests
+_LEXEME = re.compile(
+    r"""
+    (?P<space>[ \t\r\n]+)
+    |(?P<comment>//[^\n]*)
+    |(?P<identifier>[A-Za-z][A-Za-z0-9]*)
+    |(?P<number>[0-9]+(?:\.[0-9]+)?)
+    |(?P<symbol>[!=<>]=?|[(){},.\-+;*/])
+    |(?P<string>"[^"]*")
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# group numbers of the alternatives above
+_SPACE, _COMMENT, _IDENTIFIER, _NUMBER, _SYMBOL, _STRING, _OTHER = range(1, 8)
+
+_SYMBOLS = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "*": TokenType.STAR,
+    "/": TokenType.SLASH,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+}
+
+
+class RegexScanner(Scanner):
+    """Scanner matching one whole lexeme at a time with a single regex.
+
+    Produces the same tokens and errors as Scanner, but the per
+    character method calls are replaced by one regex match per lexeme.
+    Identifiers and numbers running into non-ASCII characters are
+    handed to Scanner's methods, whose str.isalpha/isdigit tests define
+    what those characters mean.
+    """
+
+    def scan_tokens(self):
+        self._scan()
+        self.tokens.append(Token(TokenType.EOF, "", None, self._line))
+        return self.tokens
+
+    def _scan(self, final: bool = True) -> None:
+        """Scan what is left of the source into ``tokens``.
+
+        Unless ``final``, the source may be cut short: a string missing
+        its closing quote is left unscanned, at ``_current``, rather than
+        reported.
+        """
+        source = self.source
+        tokens = self.tokens
+        keywords = self._keywords
+        symbols = _SYMBOLS
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        end = len(source)
+        line = self._line
+        position = self._current
+
+        while position < end:
+            for match in _LEXEME.finditer(source, position):
+                kind = match.lastindex
+                if kind == _SPACE:
+                    line += match.group().count("\n")
+                elif kind == _IDENTIFIER or kind == _NUMBER:
+                    text = match.group()
+                    following = match.end()
+                    # a non-ASCII character next (or after a number's
+                    # dot) may carry the lexeme on, let Scanner decide
+                    if following < end and (
+                        source[following] >= "\x80"
+                        or kind == _NUMBER
+                        and source[following] == "."
+                        and source[following + 1:following + 2] >= "\x80"
+                    ):
+                        position, line = self._scan_slowly(match.start(), line)
+                        break
+                    if kind == _IDENTIFIER:
+                        tokens.append(Token(keywords.get(text, identifier), text, None, line))
+                    else:
+                        tokens.append(Token(number, text, float(text), line))
+                elif kind == _SYMBOL:
+                    text = match.group()
+                    tokens.append(Token(symbols[text], text, None, line))
+                elif kind == _STRING:
+                    text = match.group()
+                    line += text.count("\n")
+                    tokens.append(Token(TokenType.STRING, text, text[1:-1], line))
+                elif kind == _COMMENT:
+                    pass
+                else:
+                    text = match.group()
+                    if text == '"':
+                        if not final:
+                            # stop here, the rest comes with the next block
+                            position = end = match.start()
+                            break
+                        line += source.count("\n", match.start())
+                        self.error_handler.error(line=line, message="Unterminated string.")
+                        position = end
+                        break
+                    if text >= "\x80":
+                        position, line = self._scan_slowly(match.start(), line)
+                        break
+                    self.error_handler.error(line=line, message="Unexpected character.")
+            else:
+                position = end
+
+        self._current = position
+        self._line = line
+
+    def _scan_slowly(self, position: int, line: int) -> tuple[int, int]:
+        self._start = self._current = position
+        self._line = line
+        self.scan_token()
+        return self._current, self._line
+
+
+class StreamingScanner(RegexScanner):
+    """Scanner reading its source from a text file as it goes.
+
+    Iterating over it yields the tokens of one block of the file at a
+    time, so only a block of source and its tokens are ever held in
+    memory. Blocks are cut after a newline, which no lexeme but a string
+    spans; a string still open at the end of a block is carried over to
+    the next one.
+    """
+
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, reader, error_handler: ErrorHandler) -> None:
+        super().__init__("", error_handler)
+        self.reader = reader
+
+    def __iter__(self):
+        pending = ""
+        while True:
+            block = self.reader.read(self.BLOCK_SIZE)
+            if not block:
+                break
+            text = pending + block
+            cut = text.rfind("\n") + 1
+            if cut == 0:
+                # no complete line yet
+                pending = text
+                continue
+            yield from self._scan_block(text[:cut], final=False)
+            pending = self.source[self._current:] + text[cut:]
+
+        yield from self._scan_block(pending, final=True)
+        yield Token(TokenType.EOF, "", None, self._line)
+
+    def _scan_block(self, source: str, final: bool) -> list[Token]:
+        self.source = source
+        self._current = 0
+        self.tokens = []
+        self._scan(final)
+        return self.tokens
+
+
+# the same lexemes over bytes, for sources that are never decoded whole
+_BYTE_LEXEME = re.compile(_LEXEME.pattern.encode(), re.VERBOSE | re.DOTALL)
+
+# symbol and keyword bytes to their token type and (str) lexeme
+_BYTE_SYMBOLS = {
+    text.encode(): (token_type, text) for text, token_type in _SYMBOLS.items()
+}
+_BYTE_KEYWORDS = {
+    text.encode(): (token_type, text) for text, token_type in Scanner._keywords.items()
+}
+
+
+class MappedScanner(RegexScanner):
+    """Scanner over the UTF-8 bytes of a source, e.g. a memory-mapped file.
+
+    ``source`` is any bytes-like object; matching runs over it in place,
+    and only identifiers, numbers and strings are decoded, one lexeme at
+    a time. Symbols and keywords reuse shared str lexemes. On the first
+    non-ASCII character outside a string or comment, the rest of the
+    source is decoded and left to RegexScanner.
+    """
+
+    def _scan(self, final: bool = True) -> None:
+        source = self.source
+        tokens = self.tokens
+        keywords = _BYTE_KEYWORDS
+        symbols = _BYTE_SYMBOLS
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        string = TokenType.STRING
+        end = len(source)
+        line = self._line
+        position = self._current
+
+        for match in _BYTE_LEXEME.finditer(source, position):
+            kind = match.lastindex
+            if kind == _SPACE:
+                line += match.group().count(b"\n")
+            elif kind == _IDENTIFIER or kind == _NUMBER:
+                following = match.end()
+                if following < end and (
+                    source[following] >= 0x80
+                    or kind == _NUMBER
+                    and source[following] == 0x2E  # "."
+                    and following + 1 < end
+                    and source[following + 1] >= 0x80
+                ):
+                    return self._scan_decoded(match.start(), line, final)
+                text = match.group()
+                if kind == _IDENTIFIER:
+                    keyword = keywords.get(text)
+                    if keyword is None:
+                        tokens.append(Token(identifier, text.decode("ascii"), None, line))
+                    else:
+                        tokens.append(Token(keyword[0], keyword[1], None, line))
+                else:
+                    tokens.append(Token(number, text.decode("ascii"), float(text), line))
+            elif kind == _SYMBOL:
+                token_type, text = symbols[match.group()]
+                tokens.append(Token(token_type, text, None, line))
+            elif kind == _STRING:
+                text = match.group().decode("utf-8")
+                line += text.count("\n")
+                tokens.append(Token(string, text, text[1:-1], line))
+            elif kind == _COMMENT:
+                pass
+            else:
+                text = match.group()
+                if text == b'"' or text >= b"\x80":
+                    # RegexScanner reports the unterminated string, or
+                    # scans the non-ASCII character
+                    return self._scan_decoded(match.start(), line, final)
+                self.error_handler.error(line=line, message="Unexpected character.")
+
+        self._current = end
+        self._line = line
+
+    def _scan_decoded(self, position: int, line: int, final: bool) -> None:
+        self.source = str(self.source[position:], "utf-8")
+        self._current = 0
+        self._line = line
+        super()._scan(final)
+
+
+class BufferScanner(RegexScanner):
+    """RegexScanner filling a TokenBuffer instead of a list of Tokens."""
+
+    def scan_buffer(self) -> TokenBuffer:
+        source = self.source
+        buffer = TokenBuffer(source)
+        append = buffer.append
+        keywords = self._keywords
+        symbols = _SYMBOLS
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        string = TokenType.STRING
+        end = len(source)
+        line = 1
+        position = 0
+
+        while position < end:
+            for match in _LEXEME.finditer(source, position):
+                kind = match.lastindex
+                if kind == _SPACE:
+                    line += match.group().count("\n")
+                elif kind == _IDENTIFIER or kind == _NUMBER:
+                    start, following = match.span()
+                    if following < end and (
+                        source[following] >= "\x80"
+                        or kind == _NUMBER
+                        and source[following] == "."
+                        and source[following + 1:following + 2] >= "\x80"
+                    ):
+                        position, line = self._scan_slowly_into(buffer, start, line)
+                        break
+                    if kind == _IDENTIFIER:
+                        append(keywords.get(match.group(), identifier), start, following - start, line)
+                    else:
+                        append(number, start, following - start, line, float(match.group()))
+                elif kind == _SYMBOL:
+                    start, following = match.span()
+                    append(symbols[match.group()], start, following - start, line)
+                elif kind == _STRING:
+                    start, following = match.span()
+                    line += source.count("\n", start, following)
+                    append(string, start, following - start, line, source[start + 1:following - 1])
+                elif kind == _COMMENT:
+                    pass
+                else:
+                    text = match.group()
+                    if text == '"':
+                        line += source.count("\n", match.start())
+                        self.error_handler.error(line=line, message="Unterminated string.")
+                        position = end
+                        break
+                    if text >= "\x80":
+                        position, line = self._scan_slowly_into(buffer, match.start(), line)
+                        break
+                    self.error_handler.error(line=line, message="Unexpected character.")
+            else:
+                position = end
+
+        append(TokenType.EOF, end, 0, line)
+        return buffer
+
+    def _scan_slowly_into(self, buffer: TokenBuffer, position: int, line: int) -> tuple[int, int]:
+        position, line = self._scan_slowly(position, line)
+        if self.tokens:
+            token = self.tokens.pop()
+            buffer.append(token.type, self._start, position - self._start, token.line, token.literal)
+        return position, line
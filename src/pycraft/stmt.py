@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from abc import ABC
-from typing import Generic, TypeVar
+from typing import Callable, Generic, TypeVar
 
-from .expr import Expr
+from .errors import ParseError
+from .exception import LoxRuntimeError
+from .expr import Expr, rebuild_node
 from .tokenclass import Token
 
 R = TypeVar('R')
@@ -25,12 +27,22 @@ class Stmt(ABC):
     Abstract base class for statements in the programming language.
 
     Subclasses should implement the specific behavior for different types of statements.
+    They list their fields in ``__slots__``, so nodes carry no ``__dict__``.
     """
 
+    __slots__ = ()
+
+    def __reduce__(self):
+        # as Expr.__reduce__
+        node_class = type(self)
+        return rebuild_node, (node_class, *[getattr(self, slot) for slot in node_class.__slots__])
+
     def accept(self, visitor: StmtVisitor[R]) -> R: ...
 
 
 class Block(Stmt):
+    __slots__ = "statements",
+
     def __init__(self, statements: list[Stmt]):
         self.statements = statements
 
@@ -39,6 +51,8 @@ class Block(Stmt):
 
 
 class StmtExpression(Stmt):
+    __slots__ = "expression",
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
@@ -47,6 +61,8 @@ class StmtExpression(Stmt):
 
 
 class If(Stmt):
+    __slots__ = "condition", "then_branch", "else_branch"
+
     def __init__(self, condition, then_branch, else_branch):
         self.condition = condition
         self.then_branch = then_branch
@@ -56,17 +72,69 @@ class If(Stmt):
         return visitor.visit_if_stmt(self)
 
 
+class LazyBody:
+    """A function body skipped by the parser, parsed on first use.
+
+    ``parse`` parses the skipped tokens. ``prepare``, set by the
+    Resolver, resolves the body once it is parsed. Errors found by either
+    are reported as usual, then raised as a ParseError: the function
+    can't run.
+    """
+
+    __slots__ = "parse", "prepare", "error_handler"
+
+    def __init__(self, parse: Callable[[], list[Stmt]], error_handler):
+        self.parse = parse
+        self.prepare: Callable[[list[Stmt]], None] | None = None
+        self.error_handler = error_handler
+
+    def force(self) -> list[Stmt]:
+        errors = self.error_handler.errors
+        reported = len(errors)
+        try:
+            body = self.parse()
+        except LoxRuntimeError:
+            # the parser reports syntax errors, then gives up
+            body = None
+        else:
+            if self.prepare is not None:
+                self.prepare(body)
+        if len(errors) != reported:
+            raise ParseError(errors[-1])
+        return body
+
+
 class Function(Stmt):
-    def __init__(self, name: Token, params: list[Token], body: list[Stmt]):
+    __slots__ = "name", "params", "_body"
+
+    def __init__(self, name: Token, params: list[Token], body: list[Stmt] | LazyBody):
         self.name = name
         self.params = params
-        self.body = body
+        self._body = body
+
+    @property
+    def body(self) -> list[Stmt]:
+        body = self._body
+        if type(body) is LazyBody:
+            body = self._body = body.force()
+        return body
+
+    @body.setter
+    def body(self, body: list[Stmt]) -> None:
+        self._body = body
+
+    def lazy_body(self) -> LazyBody | None:
+        """The body, if it has not been parsed yet."""
+        body = self._body
+        return body if type(body) is LazyBody else None
 
     def accept(self, visitor: StmtVisitor[R]) -> R:
         return visitor.visit_function_stmt(self)
 
 
 class Print(Stmt):
+    __slots__ = "expression",
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
@@ -75,6 +143,8 @@ class Print(Stmt):
 
 
 class Var(Stmt):
+    __slots__ = "name", "initializer"
+
     def __init__(self, name: "Token", initializer: Expr):
         self.name = name
         self.initializer = initializer
@@ -84,6 +154,8 @@ class Var(Stmt):
 
 
 class While(Stmt):
+    __slots__ = "condition", "body"
+
     def __init__(self, condition: "Expr", body: "Stmt"):
         self.condition = condition
         self.body = body
@@ -93,15 +165,23 @@ class While(Stmt):
 
 
 class Break(Stmt):
+    __slots__ = "keyword",
+
+    def __init__(self, keyword: Token):
+        self.keyword = keyword
 
     def accept(self, visitor: StmtVisitor[R]) -> R:
         return visitor.visit_break_stmt(self)
 
 
 class Return(Stmt):
+    __slots__ = "keyword", "value", "tail_call"
+
     def __init__(self, keyword: Token, value: Expr):
         self.keyword = keyword
         self.value = value
+        # the call made by `return f(...)`, set by the Resolver
+        self.tail_call = None
 
     def accept(self, visitor: StmtVisitor[R]) -> R:
         return visitor.visit_return_stmt(self)
@@ -0,0 +1,31 @@
+"""Process-wide table of identifier symbols.
+
+Every identifier is interned to a small integer id, handed out in order
+of first sight, and to one canonical str shared by all its tokens.
+Environments and the Resolver key their tables by id, so a name costs
+one int instead of a fresh str per occurrence, and reading a global
+hashes an int. Ids are only meaningful within one process: anything
+persisted (like cached programs) keeps the names and interns them again
+on load.
+"""
+from __future__ import annotations
+
+import sys
+
+_ids: dict[str, int] = {}
+_names: list[str] = []
+
+
+def intern(name: str) -> int:
+    """The id of ``name``, giving it the next id if it has none yet."""
+    symbol = _ids.get(name)
+    if symbol is None:
+        name = sys.intern(name)
+        symbol = _ids[name] = len(_names)
+        _names.append(name)
+    return symbol
+
+
+def name(symbol: int) -> str:
+    """The canonical str of ``symbol``."""
+    return _names[symbol]
@@ -1,5 +1,8 @@
+from array import array
 from enum import Enum
 
+from . import symbols
+
 TokenType = Enum(
     "TokenType",
     "LEFT_PAREN, RIGHT_PAREN, LEFT_BRACE, RIGHT_BRACE, \
@@ -20,16 +23,79 @@ TokenType = Enum(
 class Token:
 
     # Adding slots to minimize memory usage since we'll have a lot of tokens
-    __slots__ = "type", "lexeme", "literal", "line"
+    __slots__ = "type", "lexeme", "literal", "line", "symbol"
 
     def __init__(self, type: TokenType, lexeme: str, literal: object | None, line: int):
         self.type: TokenType = type
         self.lexeme: str = lexeme
         self.literal: object | None = literal
         self.line: int = line  # TODO: more precise column, line
+        # identifiers carry their interned id, and the canonical str
+        # of their name as lexeme
+        self.symbol: int | None = None
+        if type is TokenType.IDENTIFIER:
+            self.symbol = symbols.intern(lexeme)
+            self.lexeme = symbols.name(self.symbol)
+
+    def __reduce__(self):
+        # positional, for small pickles; symbol ids are per process, so
+        # identifiers are interned again when unpickled
+        return Token, (self.type, self.lexeme, self.literal, self.line)
 
     def __str__(self) -> str:
         return "{token_type} {literal_or_lexeme}".format(
             token_type=self.type.name,
             literal_or_lexeme=self.literal or self.lexeme,
         )
+
+
+# token types by their value, so a type id indexes straight to its type
+TOKEN_TYPES = (None, *TokenType)
+
+
+class TokenBuffer:
+    """The tokens of a source, held column-wise rather than as objects.
+
+    Each token is a type id, a start offset and a length into ``source``
+    and a line, stored in parallel arrays; literals go in a side table
+    keyed by token index. Token objects are only created on indexing,
+    for the few tokens that end up in the AST or in an error message.
+    """
+
+    __slots__ = "source", "types", "starts", "lengths", "lines", "literals"
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array("B")
+        self.starts = array("I")
+        self.lengths = array("I")
+        self.lines = array("I")
+        self.literals: dict[int, object] = {}
+
+    def append(
+        self, type: TokenType, start: int, length: int, line: int, literal: object | None = None
+    ) -> None:
+        if literal is not None:
+            self.literals[len(self.types)] = literal
+        self.types.append(type.value)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.lines.append(line)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        start = self.starts[index]
+        return Token(
+            TOKEN_TYPES[self.types[index]],
+            self.source[start:start + self.lengths[index]],
+            self.literals.get(index),
+            self.lines[index],
+        )
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
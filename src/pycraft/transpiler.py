@@ -0,0 +1,601 @@
+"""Engine that translates Lox into Python source and runs it natively.
+
+Lox functions become ``def``s, loops become ``while`` loops and locals
+become Python locals, so once compiled the program runs on CPython's own
+bytecode. Lox semantics are kept by the shape of the generated code plus
+a handful of runtime helpers:
+
+* globals are ``g_<name>`` module globals, reads check for ``None`` so
+  that undefined and uninitialized variables still raise
+* a local captured by an inner function lives in a one element list (a
+  box) handed to the inner ``def`` as a keyword-only default, so every
+  declaration executed gets its own binding, just like a Lox scope
+* arithmetic type checks are inlined and only call into the helpers on
+  the error or string paths
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from . import natives, runtime, stmt
+from .error_handler import ErrorHandler
+from .exception import LoxRuntimeError
+from .expr import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from .lox_callable import LoxCallable
+from .natives import NativeError, NativeFunction
+from .stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
+from .tokenclass import Token, TokenType
+
+# static types the code generator tracks to drop redundant checks
+FLOAT = "float"
+BOOL = "bool"
+
+_COMPARISONS = {
+    TokenType.GREATER: ">",
+    TokenType.GREATER_EQUAL: ">=",
+    TokenType.LESS: "<",
+    TokenType.LESS_EQUAL: "<=",
+}
+_ARITHMETIC = {
+    TokenType.MINUS: "-",
+    TokenType.STAR: "*",
+    TokenType.SLASH: "/",
+}
+
+
+class PythonFunction(LoxCallable):
+    """A Lox function compiled to the Python function ``fn``."""
+
+    __slots__ = "name", "arity_", "fn"
+
+    def __init__(self, name: str, arity: int, fn):
+        self.name = name
+        self.arity_ = arity
+        self.fn = fn
+
+    def arity(self) -> int:
+        return self.arity_
+
+    def __call__(self, interpreter, arguments: list):
+        return self.fn(*arguments)
+
+    def to_string(self) -> str:
+        return "<fn " + self.name + ">"
+
+
+class _Decl:
+    """A local variable declaration."""
+
+    __slots__ = "pyname", "function", "boxed"
+
+    def __init__(self, pyname: str, function: "_FunctionInfo | None"):
+        self.pyname = pyname
+        # None for locals of blocks at the top level
+        self.function = function
+        self.boxed = False
+
+
+class _FunctionInfo:
+
+    def __init__(self, parent: "_FunctionInfo | None"):
+        self.parent = parent
+        # boxes of enclosing scopes used here or in nested functions,
+        # a dict to keep the order stable
+        self.free: dict[_Decl, None] = {}
+        self.assigned_globals: set[str] = set()
+
+
+class _Analyzer(ExprVisitor[None], StmtVisitor[None]):
+    """First pass: binds every variable reference to its declaration and
+    works out which locals have to be boxed."""
+
+    def __init__(self, transpiler: "Transpiler"):
+        self.transpiler = transpiler
+        self.scopes: list[dict[str, _Decl]] = []
+        self.function: _FunctionInfo | None = None
+        # loops around the code being analyzed, in its function
+        self.loops = 0
+
+    def analyze(self, statements: Iterable[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.scopes.append({})
+        self.analyze(stmt.statements)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> None:
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> None:
+        self._declare(stmt.name, stmt)
+        function = _FunctionInfo(self.function)
+        self.transpiler.functions[stmt] = function
+        self.function = function
+        loops, self.loops = self.loops, 0
+        self.scopes.append({})
+        for param in stmt.params:
+            self._declare(param, param)
+        self.analyze(stmt.body)
+        self.scopes.pop()
+        self.loops = loops
+        self.function = function.parent
+
+    def visit_if_stmt(self, stmt: stmt.If) -> None:
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        self._declare(stmt.name, stmt)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> None:
+        stmt.condition.accept(self)
+        self.loops += 1
+        stmt.body.accept(self)
+        self.loops -= 1
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> None:
+        if not self.loops:
+            # Python would reject the break, the Resolver reports it
+            # first unless it didn't run
+            raise LoxRuntimeError(stmt.keyword, "Can't break outside a loop.")
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        expr.value.accept(self)
+        if self._bind(expr, expr.name) is None and self.function is not None:
+            self.function.assigned_globals.add(expr.name.lexeme)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: Call) -> None:
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr: VariableExpr) -> None:
+        self._bind(expr, expr.name)
+
+    def _declare(self, name: Token, key) -> None:
+        if not self.scopes:
+            return
+        decl = _Decl(self.transpiler.local_name(name.lexeme), self.function)
+        self.scopes[-1][name.lexeme] = decl
+        self.transpiler.decls[key] = decl
+
+    def _bind(self, expr: Expr, name: Token) -> _Decl | None:
+        for scope in reversed(self.scopes):
+            decl = scope.get(name.lexeme)
+            if decl is None:
+                continue
+            self.transpiler.refs[expr] = decl
+            if decl.function is not self.function:
+                # used from an inner function, every function in
+                # between has to pass the box along
+                decl.boxed = True
+                function = self.function
+                while function is not decl.function:
+                    function.free[decl] = None
+                    function = function.parent
+            return decl
+        self.transpiler.global_names.add(name.lexeme)
+        return None
+
+
+class Transpiler(ExprVisitor[tuple], StmtVisitor[None]):
+    """Second pass: emits Python source for the analyzed statements.
+
+    Expression visitors return ``(source, static_type)`` pairs.
+    """
+
+    def __init__(self, interpreter: "PythonInterpreter"):
+        self.interpreter = interpreter
+        self.decls: dict[object, _Decl] = {}
+        self.refs: dict[Expr, _Decl] = {}
+        self.functions: dict[stmt.Function, _FunctionInfo] = {}
+        self.global_names: set[str] = set()
+        self._lines: list[str] = []
+        self._indent = 0
+        self._counter = 0
+
+    def transpile(self, statements: list[Stmt]) -> str:
+        _Analyzer(self).analyze(statements)
+        for statement in statements:
+            statement.accept(self)
+        return "\n".join(self._lines) + "\n"
+
+    def local_name(self, lexeme: str) -> str:
+        self._counter += 1
+        if lexeme.isidentifier():
+            return f"l_{lexeme}_{self._counter}"
+        return f"l_{self._counter}"
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        # names are unique per declaration, so scopes need no code
+        for statement in stmt.statements:
+            statement.accept(self)
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> None:
+        if isinstance(stmt.expression, Assign):
+            self._assign_statement(stmt.expression)
+        else:
+            self._emit(self._expr(stmt.expression)[0])
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> None:
+        function = self.functions[stmt]
+        decl = self.decls.get(stmt)
+        if decl is not None and decl.boxed:
+            # create the box up front, the body may refer to itself
+            self._emit(f"{decl.pyname} = [None]")
+
+        self._counter += 1
+        def_name = f"_fn_{self._counter}"
+        params = []
+        prologue = []
+        for param in stmt.params:
+            param_decl = self.decls[param]
+            if param_decl.boxed:
+                params.append(param_decl.pyname + "_arg")
+                prologue.append(f"{param_decl.pyname} = [{param_decl.pyname}_arg]")
+            else:
+                params.append(param_decl.pyname)
+        if function.free:
+            params.append("*")
+            params.extend(f"{free.pyname}={free.pyname}" for free in function.free)
+
+        self._emit(f"def {def_name}({', '.join(params)}):")
+        self._indent += 1
+        start = len(self._lines)
+        if function.assigned_globals:
+            names = ", ".join(sorted(self._global(name) for name in function.assigned_globals))
+            self._emit(f"global {names}")
+        for line in prologue:
+            self._emit(line)
+        for statement in stmt.body:
+            statement.accept(self)
+        if len(self._lines) == start:
+            self._emit("pass")
+        self._indent -= 1
+
+        value = f"_PythonFunction({stmt.name.lexeme!r}, {len(stmt.params)}, {def_name})"
+        if decl is not None and decl.boxed:
+            self._emit(f"{decl.pyname}[0] = {value}")
+        else:
+            self._define(stmt.name, decl, value)
+
+    def visit_if_stmt(self, stmt: stmt.If) -> None:
+        self._emit(f"if {self._condition(stmt.condition)}:")
+        self._block(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self._emit("else:")
+            self._block(stmt.else_branch)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._emit(f"print(_stringify({self._expr(stmt.expression)[0]}))")
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+        if stmt.value is None:
+            self._emit("return None")
+        else:
+            self._emit(f"return {self._expr(stmt.value)[0]}")
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        value = "None"
+        if stmt.initializer is not None:
+            value = self._expr(stmt.initializer)[0]
+        self._define(stmt.name, self.decls.get(stmt), value)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> None:
+        self._emit(f"while {self._condition(stmt.condition)}:")
+        self._block(stmt.body)
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> None:
+        self._emit("break")
+
+    # expressions
+
+    def visit_literal_expr(self, expr: Literal) -> tuple:
+        value = expr.value
+        if isinstance(value, bool):
+            return repr(value), BOOL
+        if isinstance(value, float):
+            return repr(value), FLOAT
+        return repr(value), None
+
+    def visit_grouping_expr(self, expr: Grouping) -> tuple:
+        return self._expr(expr.expression)
+
+    def visit_variable_expr(self, expr: VariableExpr) -> tuple:
+        k = self._token(expr.name)
+        decl = self.refs.get(expr)
+        if decl is None:
+            name = self._global(expr.name.lexeme)
+            return f"({name} if {name} is not None else _global_error({k}))", None
+        if decl.boxed:
+            temp = self._temp()
+            read = f"({temp} := {decl.pyname}[0])"
+            return f"({temp} if {read} is not None else _not_initialized({k}))", None
+        name = decl.pyname
+        return f"({name} if {name} is not None else _not_initialized({k}))", None
+
+    def visit_assign_expr(self, expr: Assign) -> tuple:
+        value, type_ = self._expr(expr.value)
+        decl = self.refs.get(expr)
+        if decl is None:
+            name = self._global(expr.name.lexeme)
+            temp = self._temp()
+            check = f"({expr.name.lexeme!r} in _defined or _undefined({self._token(expr.name)}))"
+            return f"(({temp} := {value}), {check}, ({name} := {temp}))[2]", type_
+        if decl.boxed:
+            return f"_store({decl.pyname}, {value})", type_
+        return f"({decl.pyname} := {value})", type_
+
+    def visit_logical_expr(self, expr: Logical) -> tuple:
+        left = self._expr(expr.left)[0]
+        right = self._expr(expr.right)[0]
+        temp = self._temp()
+        truthy = f"(({temp} := {left}) is not None and {temp} is not False)"
+        if expr.operator.type == TokenType.OR:
+            return f"({temp} if {truthy} else {right})", None
+        return f"({right} if {truthy} else {temp})", None
+
+    def visit_unary_expr(self, expr: Unary) -> tuple:
+        right, type_ = self._expr(expr.right)
+        if expr.operator.type == TokenType.BANG:
+            if type_ == BOOL:
+                return f"(not {right})", BOOL
+            temp = self._temp()
+            return f"(({temp} := {right}) is None or {temp} is False)", BOOL
+        if type_ == FLOAT:
+            return f"(-{right})", FLOAT
+        temp = self._temp()
+        k = self._token(expr.operator)
+        return f"(-{temp} if type({temp} := {right}) is float else _operand_error({k}))", FLOAT
+
+    def visit_binary_expr(self, expr: Binary) -> tuple:
+        operator = expr.operator.type
+        left, left_type = self._expr(expr.left)
+        right, right_type = self._expr(expr.right)
+        if operator == TokenType.EQUAL_EQUAL:
+            return f"({left} == {right})", BOOL
+        if operator == TokenType.BANG_EQUAL:
+            return f"({left} != {right})", BOOL
+
+        k = self._token(expr.operator)
+        if operator == TokenType.PLUS:
+            symbol, result_type = "+", FLOAT
+        elif operator in _COMPARISONS:
+            symbol, result_type = _COMPARISONS[operator], BOOL
+        else:
+            symbol, result_type = _ARITHMETIC[operator], FLOAT
+
+        if left_type == FLOAT and right_type == FLOAT:
+            return f"({left} {symbol} {right})", result_type
+
+        # both operands are evaluated, in order, before anything is
+        # checked; '&' rather than 'and' makes sure of that
+        if isinstance(expr.right, Literal) and right_type == FLOAT:
+            a, b = self._temp(), right
+            condition = f"type({a} := {left}) is float"
+        elif isinstance(expr.left, Literal) and left_type == FLOAT:
+            a, b = left, self._temp()
+            condition = f"type({b} := {right}) is float"
+        else:
+            a, b = self._temp(), self._temp()
+            condition = f"(type({a} := {left}) is float) & (type({b} := {right}) is float)"
+        if operator == TokenType.PLUS:
+            return f"({a} + {b} if {condition} else _add(_tokens[{k}], {a}, {b}))", None
+        return f"({a} {symbol} {b} if {condition} else _operands_error({k}))", result_type
+
+    def visit_call_expr(self, expr: Call) -> tuple:
+        callee = self._expr(expr.callee)[0]
+        arguments = ", ".join(self._expr(argument)[0] for argument in expr.arguments)
+        temp = self._temp()
+        count = len(expr.arguments)
+        k = self._token(expr.paren)
+        fast = f"type({temp} := {callee}) is _PythonFunction and {temp}.arity_ == {count}"
+        return f"({temp}.fn({arguments}) if {fast} else _call({temp}, [{arguments}], {k}))", None
+
+    # helpers
+
+    def _expr(self, expr: Expr) -> tuple:
+        return expr.accept(self)
+
+    def _condition(self, expr: Expr) -> str:
+        source, type_ = self._expr(expr)
+        if type_ == BOOL:
+            return source
+        temp = self._temp()
+        return f"(({temp} := {source}) is not None and {temp} is not False)"
+
+    def _block(self, statement: Stmt) -> None:
+        self._indent += 1
+        start = len(self._lines)
+        statement.accept(self)
+        if len(self._lines) == start:
+            self._emit("pass")
+        self._indent -= 1
+
+    def _assign_statement(self, expr: Assign) -> None:
+        value = self._expr(expr.value)[0]
+        decl = self.refs.get(expr)
+        if decl is None:
+            temp = self._temp()
+            self._emit(f"{temp} = {value}")
+            self._emit(f"if {expr.name.lexeme!r} not in _defined:")
+            self._emit(f"    _undefined({self._token(expr.name)})")
+            self._emit(f"{self._global(expr.name.lexeme)} = {temp}")
+        elif decl.boxed:
+            self._emit(f"{decl.pyname}[0] = {value}")
+        else:
+            self._emit(f"{decl.pyname} = {value}")
+
+    def _define(self, name: Token, decl: _Decl | None, value: str) -> None:
+        if decl is None:
+            self._emit(f"{self._global(name.lexeme)} = {value}")
+            self._emit(f"_defined.add({name.lexeme!r})")
+        elif decl.boxed:
+            self._emit(f"{decl.pyname} = [{value}]")
+        else:
+            self._emit(f"{decl.pyname} = {value}")
+
+    def _global(self, lexeme: str) -> str:
+        return self.interpreter.global_name(lexeme)
+
+    def _token(self, token: Token) -> int:
+        tokens = self.interpreter.tokens
+        tokens.append(token)
+        return len(tokens) - 1
+
+    def _temp(self) -> str:
+        self._counter += 1
+        return f"_t{self._counter}"
+
+    def _emit(self, line: str) -> None:
+        self._lines.append("    " * self._indent + line)
+
+
+class PythonInterpreter:
+    """Runs programs by transpiling them to Python first."""
+
+    def __init__(self, error_handler: ErrorHandler):
+        self.error_handler = error_handler
+        # tokens referenced by generated code, by index
+        self.tokens: list[Token] = []
+        # names of the Lox globals defined so far
+        self.defined: set[str] = set()
+        self._global_names: dict[str, str] = {}
+        self.namespace = self._make_namespace()
+        # source generated for the last program, handy for debugging
+        self.source = ""
+
+        natives.install_standard_library(self)
+
+    def resolve(self, expr: Expr, depth: int, slot: int):
+        # the transpiler binds names itself, the Resolver still runs
+        # first to report static errors
+        pass
+
+    def interpret(self, statements: Iterable[Stmt]):
+        transpiler = Transpiler(self)
+        try:
+            self.source = transpiler.transpile(list(statements))
+            for lexeme in transpiler.global_names:
+                self.namespace.setdefault(self.global_name(lexeme), None)
+            exec(compile(self.source, "<lox>", "exec"), self.namespace)
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error=error)
+
+    def define_global(self, name: str, value) -> None:
+        self.namespace[self.global_name(name)] = value
+        self.defined.add(name)
+
+    def global_name(self, lexeme: str) -> str:
+        name = self._global_names.get(lexeme)
+        if name is None:
+            name = "g_" + lexeme
+            if not name.isidentifier():
+                name = f"g_{len(self._global_names)}"
+            self._global_names[lexeme] = name
+        return name
+
+    def _make_namespace(self) -> dict:
+        tokens = self.tokens
+        defined = self.defined
+
+        def not_initialized(k):
+            name = tokens[k]
+            raise LoxRuntimeError(name, f"{name.lexeme} is not initialized.")
+
+        def global_error(k):
+            name = tokens[k]
+            if name.lexeme in defined:
+                not_initialized(k)
+            raise LoxRuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
+
+        def undefined(k):
+            name = tokens[k]
+            raise LoxRuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
+
+        def operand_error(k):
+            raise LoxRuntimeError(tokens[k], "Operand must be a number.")
+
+        def operands_error(k):
+            raise LoxRuntimeError(tokens[k], "Operands must be numbers.")
+
+        def store(box, value):
+            box[0] = value
+            return value
+
+        def call(callee, arguments, k):
+            if type(callee) is NativeFunction and len(arguments) == callee.arity_:
+                try:
+                    return callee.fn(*arguments)
+                except NativeError as error:
+                    raise LoxRuntimeError(tokens[k], str(error)) from None
+            if not isinstance(callee, LoxCallable):
+                raise LoxRuntimeError(tokens[k], "Can only call functions and classes.")
+            if len(arguments) != callee.arity():
+                raise LoxRuntimeError(
+                    tokens[k],
+                    f"Expected {callee.arity()} arguments but got {len(arguments)}.",
+                )
+            try:
+                return callee(self, arguments)
+            except NativeError as error:
+                raise LoxRuntimeError(tokens[k], str(error)) from None
+
+        return {
+            "__name__": "__lox__",
+            "_tokens": tokens,
+            "_defined": defined,
+            "_PythonFunction": PythonFunction,
+            "_stringify": runtime.stringify,
+            "_add": runtime.add,
+            "_not_initialized": not_initialized,
+            "_global_error": global_error,
+            "_undefined": undefined,
+            "_operand_error": operand_error,
+            "_operands_error": operands_error,
+            "_store": store,
+            "_call": call,
+        }
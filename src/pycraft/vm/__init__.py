@@ -0,0 +1,4 @@
+from .compiler import Compiler
+from .machine import VM
+
+__all__ = ["Compiler", "VM"]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from ..tokenclass import Token
+from . import opcodes
+
+
+class Chunk:
+    """A compiled sequence of instructions.
+
+    ``code`` holds opcodes and their operands in one flat list. ``tokens``
+    runs parallel to it so that a runtime error raised while executing
+    any byte of an instruction can be reported with the source token
+    that produced it.
+    """
+
+    __slots__ = "code", "constants", "tokens", "_constant_index"
+
+    def __init__(self):
+        self.code: list[int] = []
+        self.constants: list = []
+        self.tokens: list[Token | None] = []
+        self._constant_index: dict = {}
+
+    def write(self, byte: int, token: Token | None) -> int:
+        self.code.append(byte)
+        self.tokens.append(token)
+        return len(self.code) - 1
+
+    def add_constant(self, value) -> int:
+        # key on the type as well, 1.0 and True compare (and hash) equal
+        key = (type(value), value)
+        try:
+            return self._constant_index[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable constants, like functions, are never shared
+            self.constants.append(value)
+            return len(self.constants) - 1
+        self.constants.append(value)
+        self._constant_index[key] = len(self.constants) - 1
+        return len(self.constants) - 1
+
+
+def disassemble(chunk: Chunk, name: str) -> str:
+    lines = [f"== {name} =="]
+    offset = 0
+    code = chunk.code
+    while offset < len(code):
+        op = code[offset]
+        text = f"{offset:04d} {opcodes.NAMES.get(op, op)}"
+        if op == opcodes.CLOSURE:
+            function = chunk.constants[code[offset + 1]]
+            text += f" {function.name}"
+            offset += 2
+            for _ in range(function.upvalue_count):
+                kind = "local" if code[offset] else "upvalue"
+                text += f" ({kind} {code[offset + 1]})"
+                offset += 2
+        elif op in opcodes.OPERAND_COUNT:
+            operand = code[offset + 1]
+            text += f" {operand}"
+            if op in (
+                opcodes.CONSTANT,
+                opcodes.GET_GLOBAL,
+                opcodes.DEFINE_GLOBAL,
+                opcodes.SET_GLOBAL,
+            ):
+                text += f" '{chunk.constants[operand]}'"
+            offset += 2
+        else:
+            offset += 1
+        lines.append(text)
+    return "\n".join(lines)
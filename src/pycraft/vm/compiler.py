@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from .. import stmt
+from ..exception import LoxRuntimeError
+from ..expr import (
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    VariableExpr,
+)
+from ..stmt import Block, Print, Stmt, StmtExpression, StmtVisitor, Var
+from ..tokenclass import Token, TokenType
+from . import opcodes as op
+from .objects import VMFunction
+
+_BINARY_OPCODES = {
+    TokenType.PLUS: op.ADD,
+    TokenType.MINUS: op.SUBTRACT,
+    TokenType.STAR: op.MULTIPLY,
+    TokenType.SLASH: op.DIVIDE,
+    TokenType.EQUAL_EQUAL: op.EQUAL,
+    TokenType.BANG_EQUAL: op.NOT_EQUAL,
+    TokenType.GREATER: op.GREATER,
+    TokenType.GREATER_EQUAL: op.GREATER_EQUAL,
+    TokenType.LESS: op.LESS,
+    TokenType.LESS_EQUAL: op.LESS_EQUAL,
+}
+
+
+class _Local:
+
+    __slots__ = "name", "depth", "is_captured"
+
+    def __init__(self, name: str, depth: int):
+        self.name = name
+        self.depth = depth
+        self.is_captured = False
+
+
+class _Loop:
+
+    __slots__ = "scope_depth", "break_jumps"
+
+    def __init__(self, scope_depth: int):
+        self.scope_depth = scope_depth
+        self.break_jumps: list[int] = []
+
+
+class _FunctionState:
+    """Compiler bookkeeping for the function currently being compiled."""
+
+    def __init__(self, enclosing: "_FunctionState | None", function: VMFunction):
+        self.enclosing = enclosing
+        self.function = function
+        # slot zero of every frame holds the closure being called
+        self.locals: list[_Local] = [_Local("", 0)]
+        self.upvalues: list[tuple[bool, int]] = []
+        self.scope_depth = 0
+        self.loops: list[_Loop] = []
+
+
+class Compiler(ExprVisitor[None], StmtVisitor[None]):
+    """Compiles the parsed AST into bytecode for the VM.
+
+    The top-level statements become the body of an implicit "script"
+    function. Globals stay late bound and are accessed by name, locals
+    live in stack slots and captured locals are reached via upvalues.
+    """
+
+    def __init__(self):
+        self._state: _FunctionState = None
+
+    def compile(self, statements: Iterable[Stmt]) -> VMFunction:
+        self._state = _FunctionState(None, VMFunction("script"))
+        for statement in statements:
+            self._compile_stmt(statement)
+        self._emit_return(None)
+        return self._state.function
+
+    # statements
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self._begin_scope()
+        for statement in stmt.statements:
+            self._compile_stmt(statement)
+        self._end_scope()
+
+    def visit_expression_stmt(self, stmt: StmtExpression) -> None:
+        self._compile_expr(stmt.expression)
+        self._emit(op.POP)
+
+    def visit_function_stmt(self, stmt: stmt.Function) -> None:
+        if self._state.scope_depth > 0:
+            # the local is usable right away so the body can recurse
+            self._add_local(stmt.name)
+            self._state.locals[-1].depth = self._state.scope_depth
+        self._function(stmt)
+        self._define_variable(stmt.name)
+
+    def visit_if_stmt(self, stmt: stmt.If) -> None:
+        self._compile_expr(stmt.condition)
+        else_jump = self._emit_jump(op.POP_JUMP_IF_FALSE)
+        self._compile_stmt(stmt.then_branch)
+        if stmt.else_branch is None:
+            self._patch_jump(else_jump)
+            return
+        end_jump = self._emit_jump(op.JUMP)
+        self._patch_jump(else_jump)
+        self._compile_stmt(stmt.else_branch)
+        self._patch_jump(end_jump)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self._compile_expr(stmt.expression)
+        self._emit(op.PRINT)
+
+    def visit_return_stmt(self, stmt: stmt.Return) -> None:
+        if stmt.value is None:
+            self._emit_return(stmt.keyword)
+        else:
+            self._compile_expr(stmt.value)
+            self._emit(op.RETURN, stmt.keyword)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        if self._state.scope_depth > 0:
+            self._add_local(stmt.name)
+        if stmt.initializer is None:
+            self._emit(op.NIL)
+        else:
+            self._compile_expr(stmt.initializer)
+        self._define_variable(stmt.name)
+
+    def visit_while_stmt(self, stmt: stmt.While) -> None:
+        loop_start = len(self._code)
+        self._compile_expr(stmt.condition)
+        exit_jump = self._emit_jump(op.POP_JUMP_IF_FALSE)
+
+        loop = _Loop(self._state.scope_depth)
+        self._state.loops.append(loop)
+        self._compile_stmt(stmt.body)
+        self._state.loops.pop()
+
+        self._emit(op.LOOP)
+        self._emit(loop_start)
+        self._patch_jump(exit_jump)
+        for jump in loop.break_jumps:
+            self._patch_jump(jump)
+
+    def visit_break_stmt(self, stmt: stmt.Break) -> None:
+        if not self._state.loops:
+            # the Resolver reports it first, unless it didn't run
+            raise LoxRuntimeError(stmt.keyword, "Can't break outside a loop.")
+        loop = self._state.loops[-1]
+        # discard the locals of every scope the break jumps out of,
+        # they stay declared for the rest of the enclosing block though
+        for local in reversed(self._state.locals):
+            if local.depth <= loop.scope_depth:
+                break
+            self._emit(op.CLOSE_UPVALUE if local.is_captured else op.POP)
+        loop.break_jumps.append(self._emit_jump(op.JUMP))
+
+    # expressions
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self._compile_expr(expr.value)
+        self._named_variable(expr.name, assign=True)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        self._compile_expr(expr.left)
+        self._compile_expr(expr.right)
+        self._emit(_BINARY_OPCODES[expr.operator.type], expr.operator)
+
+    def visit_call_expr(self, expr: Call) -> None:
+        self._compile_expr(expr.callee)
+        for argument in expr.arguments:
+            self._compile_expr(argument)
+        self._emit(op.CALL, expr.paren)
+        self._emit(len(expr.arguments), expr.paren)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self._compile_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        if expr.value is None:
+            self._emit(op.NIL)
+        elif expr.value is True:
+            self._emit(op.TRUE)
+        elif expr.value is False:
+            self._emit(op.FALSE)
+        else:
+            self._emit(op.CONSTANT)
+            self._emit(self._chunk.add_constant(expr.value))
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        self._compile_expr(expr.left)
+        # the left operand is the result whenever it short-circuits
+        if expr.operator.type == TokenType.OR:
+            end_jump = self._emit_jump(op.JUMP_IF_TRUE)
+        else:
+            end_jump = self._emit_jump(op.JUMP_IF_FALSE)
+        self._emit(op.POP)
+        self._compile_expr(expr.right)
+        self._patch_jump(end_jump)
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        self._compile_expr(expr.right)
+        if expr.operator.type == TokenType.MINUS:
+            self._emit(op.NEGATE, expr.operator)
+        else:
+            self._emit(op.NOT, expr.operator)
+
+    def visit_variable_expr(self, expr: VariableExpr) -> None:
+        self._named_variable(expr.name, assign=False)
+
+    # helpers
+
+    @property
+    def _chunk(self):
+        return self._state.function.chunk
+
+    @property
+    def _code(self) -> list[int]:
+        return self._state.function.chunk.code
+
+    def _compile_stmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def _compile_expr(self, expr: Expr) -> None:
+        expr.accept(self)
+
+    def _emit(self, byte: int, token: Token = None) -> int:
+        return self._chunk.write(byte, token)
+
+    def _emit_jump(self, instruction: int) -> int:
+        self._emit(instruction)
+        # placeholder target, patched once the destination is known
+        return self._emit(-1)
+
+    def _patch_jump(self, operand_offset: int) -> None:
+        self._code[operand_offset] = len(self._code)
+
+    def _emit_return(self, token: Token | None) -> None:
+        self._emit(op.NIL)
+        self._emit(op.RETURN, token)
+
+    def _function(self, declaration: stmt.Function) -> None:
+        function = VMFunction(declaration.name.lexeme)
+        function.arity = len(declaration.params)
+        self._state = _FunctionState(self._state, function)
+        self._begin_scope()
+        for param in declaration.params:
+            self._add_local(param)
+            self._state.locals[-1].depth = self._state.scope_depth
+        for statement in declaration.body:
+            self._compile_stmt(statement)
+        self._emit_return(None)
+
+        # no end_scope here, RETURN discards the whole frame
+        state = self._state
+        function.upvalue_count = len(state.upvalues)
+        self._state = state.enclosing
+
+        self._emit(op.CLOSURE)
+        self._emit(self._chunk.add_constant(function))
+        for is_local, index in state.upvalues:
+            self._emit(1 if is_local else 0)
+            self._emit(index)
+
+    def _begin_scope(self) -> None:
+        self._state.scope_depth += 1
+
+    def _end_scope(self) -> None:
+        state = self._state
+        state.scope_depth -= 1
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            local = state.locals.pop()
+            self._emit(op.CLOSE_UPVALUE if local.is_captured else op.POP)
+
+    def _add_local(self, name: Token) -> None:
+        # depth stays -1 until the initializer has been compiled
+        self._state.locals.append(_Local(name.lexeme, -1))
+
+    def _define_variable(self, name: Token) -> None:
+        if self._state.scope_depth > 0:
+            # the value on top of the stack simply becomes the local
+            self._state.locals[-1].depth = self._state.scope_depth
+            return
+        self._emit(op.DEFINE_GLOBAL, name)
+        self._emit(self._chunk.add_constant(name.lexeme), name)
+
+    def _named_variable(self, name: Token, assign: bool) -> None:
+        slot = self._resolve_local(self._state, name)
+        if slot is not None:
+            instruction = op.SET_LOCAL if assign else op.GET_LOCAL
+            operand = slot
+        else:
+            index = self._resolve_upvalue(self._state, name)
+            if index is not None:
+                instruction = op.SET_UPVALUE if assign else op.GET_UPVALUE
+                operand = index
+            else:
+                instruction = op.SET_GLOBAL if assign else op.GET_GLOBAL
+                operand = self._chunk.add_constant(name.lexeme)
+        self._emit(instruction, name)
+        self._emit(operand, name)
+
+    def _resolve_local(self, state: _FunctionState, name: Token) -> int | None:
+        for slot in range(len(state.locals) - 1, -1, -1):
+            local = state.locals[slot]
+            # skip locals whose initializer is still being compiled,
+            # the Resolver already reported reads of those
+            if local.name == name.lexeme and local.depth != -1:
+                return slot
+        return None
+
+    def _resolve_upvalue(self, state: _FunctionState, name: Token) -> int | None:
+        if state.enclosing is None:
+            return None
+        slot = self._resolve_local(state.enclosing, name)
+        if slot is not None:
+            state.enclosing.locals[slot].is_captured = True
+            return self._add_upvalue(state, True, slot)
+        index = self._resolve_upvalue(state.enclosing, name)
+        if index is not None:
+            return self._add_upvalue(state, False, index)
+        return None
+
+    def _add_upvalue(self, state: _FunctionState, is_local: bool, index: int) -> int:
+        upvalue = (is_local, index)
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+        state.upvalues.append(upvalue)
+        return len(state.upvalues) - 1
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from ..error_handler import ErrorHandler
+from ..exception import LoxRuntimeError
+from ..expr import Expr
+from ..lox_callable import LoxCallable
+from ..natives import NativeError, NativeFunction, install_standard_library
+from ..runtime import add, is_equal, stringify
+from ..stmt import Stmt
+from .compiler import Compiler
+from .objects import Upvalue, VMClosure
+from .opcodes import (
+    ADD,
+    CALL,
+    CLOSE_UPVALUE,
+    CLOSURE,
+    CONSTANT,
+    DEFINE_GLOBAL,
+    DIVIDE,
+    EQUAL,
+    FALSE,
+    GET_GLOBAL,
+    GET_LOCAL,
+    GET_UPVALUE,
+    GREATER,
+    GREATER_EQUAL,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_TRUE,
+    LESS,
+    LESS_EQUAL,
+    LOOP,
+    MULTIPLY,
+    NEGATE,
+    NIL,
+    NOT,
+    NOT_EQUAL,
+    POP,
+    POP_JUMP_IF_FALSE,
+    PRINT,
+    RETURN,
+    SET_GLOBAL,
+    SET_LOCAL,
+    SET_UPVALUE,
+    SUBTRACT,
+    TRUE,
+)
+
+FRAMES_MAX = 100_000
+
+
+class VM:
+    """Stack based virtual machine running code produced by the Compiler.
+
+    Calls between Lox functions push a frame onto ``frames`` and keep
+    going in the same dispatch loop, so Lox recursion doesn't recurse
+    in Python.
+    """
+
+    def __init__(self, error_handler: ErrorHandler, max_call_depth: int = FRAMES_MAX):
+        self.error_handler = error_handler
+        self.max_call_depth = max_call_depth
+        self.globals: dict[str, object] = {}
+        self.stack: list = []
+        # saved (closure, ip, base) of every caller
+        self.frames: list[tuple] = []
+        self.open_upvalues: dict[int, Upvalue] = {}
+
+        install_standard_library(self)
+
+    def define_global(self, name: str, value) -> None:
+        self.globals[name] = value
+
+    def resolve(self, expr: Expr, depth: int, slot: int):
+        # the compiler works out its own stack slots and upvalues, the
+        # Resolver still runs first to report static errors
+        pass
+
+    def interpret(self, statements: Iterable[Stmt]):
+        try:
+            closure = VMClosure(Compiler().compile(statements), [])
+            self.stack.append(closure)
+            self._run(closure, 0)
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error=error)
+            self.stack.clear()
+            self.frames.clear()
+            self.open_upvalues.clear()
+
+    def call_closure(self, closure: VMClosure, arguments: list):
+        base = len(self.stack)
+        self.stack.append(closure)
+        self.stack.extend(arguments)
+        return self._run(closure, base)
+
+    def _run(self, closure: VMClosure, base: int):
+        """Execute ``closure`` whose frame starts at ``base`` until it returns."""
+        stack = self.stack
+        frames = self.frames
+        globals_ = self.globals
+        # frames below this belong to whoever called into _run
+        floor = len(frames)
+
+        code = closure.function.chunk.code
+        constants = closure.function.chunk.constants
+        upvalues = closure.upvalues
+        ip = 0
+
+        while True:
+            instruction = code[ip]
+            ip += 1
+
+            if instruction == GET_LOCAL:
+                value = stack[base + code[ip]]
+                ip += 1
+                if value is None:
+                    raise self._not_initialized(closure, ip)
+                stack.append(value)
+
+            elif instruction == CONSTANT:
+                stack.append(constants[code[ip]])
+                ip += 1
+
+            elif instruction == GET_GLOBAL:
+                value = globals_.get(constants[code[ip]])
+                ip += 1
+                if value is None:
+                    raise self._undefined_global(closure, ip)
+                stack.append(value)
+
+            elif instruction == ADD:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left + right
+                else:
+                    stack[-1] = add(self._token(closure, ip), left, right)
+
+            elif instruction == SUBTRACT:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left - right
+
+            elif instruction == LESS:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left < right
+
+            elif instruction == POP_JUMP_IF_FALSE:
+                value = stack.pop()
+                if value is None or value is False:
+                    ip = code[ip]
+                else:
+                    ip += 1
+
+            elif instruction == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+
+            elif instruction == POP:
+                stack.pop()
+
+            elif instruction == CALL:
+                argc = code[ip]
+                ip += 1
+                callee = stack[-1 - argc]
+                if type(callee) is VMClosure:
+                    arity = callee.function.arity
+                    if argc != arity:
+                        raise self._error(
+                            closure, ip, f"Expected {arity} arguments but got {argc}."
+                        )
+                    if len(frames) >= self.max_call_depth:
+                        raise self._error(closure, ip, "Stack overflow.")
+                    frames.append((closure, ip, base))
+                    closure = callee
+                    code = closure.function.chunk.code
+                    constants = closure.function.chunk.constants
+                    upvalues = closure.upvalues
+                    base = len(stack) - argc - 1
+                    ip = 0
+                elif type(callee) is NativeFunction and argc == callee.arity_:
+                    # called straight on the arguments on the stack
+                    try:
+                        if argc == 1:
+                            value = callee.fn(stack.pop())
+                        else:
+                            value = callee.fn(*stack[len(stack) - argc:])
+                            del stack[len(stack) - argc:]
+                    except NativeError as error:
+                        raise self._error(closure, ip, str(error)) from None
+                    stack[-1] = value
+                elif isinstance(callee, LoxCallable):
+                    arity = callee.arity()
+                    if argc != arity:
+                        raise self._error(
+                            closure, ip, f"Expected {arity} arguments but got {argc}."
+                        )
+                    arguments = stack[len(stack) - argc:]
+                    del stack[len(stack) - argc - 1:]
+                    try:
+                        stack.append(callee(self, arguments))
+                    except NativeError as error:
+                        raise self._error(closure, ip, str(error)) from None
+                else:
+                    raise self._error(closure, ip, "Can only call functions and classes.")
+
+            elif instruction == RETURN:
+                result = stack.pop()
+                if self.open_upvalues:
+                    self._close_upvalues(base)
+                del stack[base:]
+                if len(frames) == floor:
+                    return result
+                closure, ip, base = frames.pop()
+                code = closure.function.chunk.code
+                constants = closure.function.chunk.constants
+                upvalues = closure.upvalues
+                stack.append(result)
+
+            elif instruction == LOOP:
+                ip = code[ip]
+
+            elif instruction == JUMP:
+                ip = code[ip]
+
+            elif instruction == GET_UPVALUE:
+                upvalue = upvalues[code[ip]]
+                ip += 1
+                value = upvalue.value if upvalue.is_closed else stack[upvalue.index]
+                if value is None:
+                    raise self._not_initialized(closure, ip)
+                stack.append(value)
+
+            elif instruction == SET_UPVALUE:
+                upvalue = upvalues[code[ip]]
+                ip += 1
+                if upvalue.is_closed:
+                    upvalue.value = stack[-1]
+                else:
+                    stack[upvalue.index] = stack[-1]
+
+            elif instruction == MULTIPLY:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left * right
+
+            elif instruction == DIVIDE:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left / right
+
+            elif instruction == GREATER:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left > right
+
+            elif instruction == GREATER_EQUAL:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left >= right
+
+            elif instruction == LESS_EQUAL:
+                right = stack.pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise self._error(closure, ip, "Operands must be numbers.")
+                stack[-1] = left <= right
+
+            elif instruction == EQUAL:
+                right = stack.pop()
+                stack[-1] = is_equal(stack[-1], right)
+
+            elif instruction == NOT_EQUAL:
+                right = stack.pop()
+                stack[-1] = not is_equal(stack[-1], right)
+
+            elif instruction == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+
+            elif instruction == NEGATE:
+                value = stack[-1]
+                if type(value) is not float:
+                    raise self._error(closure, ip, "Operand must be a number.")
+                stack[-1] = -value
+
+            elif instruction == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = code[ip]
+                else:
+                    ip += 1
+
+            elif instruction == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += 1
+                else:
+                    ip = code[ip]
+
+            elif instruction == NIL:
+                stack.append(None)
+
+            elif instruction == TRUE:
+                stack.append(True)
+
+            elif instruction == FALSE:
+                stack.append(False)
+
+            elif instruction == PRINT:
+                print(stringify(stack.pop()))
+
+            elif instruction == DEFINE_GLOBAL:
+                globals_[constants[code[ip]]] = stack.pop()
+                ip += 1
+
+            elif instruction == SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals_:
+                    raise self._error(closure, ip, "Undefined variable '" + name + "'.")
+                globals_[name] = stack[-1]
+
+            elif instruction == CLOSURE:
+                function = constants[code[ip]]
+                ip += 1
+                captured = []
+                for _ in range(function.upvalue_count):
+                    is_local = code[ip]
+                    index = code[ip + 1]
+                    ip += 2
+                    if is_local:
+                        captured.append(self._capture_upvalue(base + index))
+                    else:
+                        captured.append(upvalues[index])
+                stack.append(VMClosure(function, captured))
+
+            elif instruction == CLOSE_UPVALUE:
+                self._close_upvalues(len(stack) - 1)
+                stack.pop()
+
+            else:
+                raise RuntimeError(f"Unknown opcode {instruction}.")
+
+    def _capture_upvalue(self, index: int) -> Upvalue:
+        # closures capturing the same variable must share one upvalue
+        upvalue = self.open_upvalues.get(index)
+        if upvalue is None:
+            upvalue = Upvalue(index)
+            self.open_upvalues[index] = upvalue
+        return upvalue
+
+    def _close_upvalues(self, last: int) -> None:
+        stack = self.stack
+        for index in [index for index in self.open_upvalues if index >= last]:
+            upvalue = self.open_upvalues.pop(index)
+            upvalue.value = stack[index]
+            upvalue.is_closed = True
+
+    def _token(self, closure: VMClosure, ip: int):
+        # every byte of an instruction carries its token, so the last
+        # byte read is as good as the opcode itself
+        return closure.function.chunk.tokens[ip - 1]
+
+    def _error(self, closure: VMClosure, ip: int, message: str) -> LoxRuntimeError:
+        return LoxRuntimeError(self._token(closure, ip), message)
+
+    def _not_initialized(self, closure: VMClosure, ip: int) -> LoxRuntimeError:
+        name = self._token(closure, ip)
+        return LoxRuntimeError(name, f"{name.lexeme} is not initialized.")
+
+    def _undefined_global(self, closure: VMClosure, ip: int) -> LoxRuntimeError:
+        name = self._token(closure, ip)
+        if name.lexeme in self.globals:
+            return LoxRuntimeError(name, f"{name.lexeme} is not initialized.")
+        return LoxRuntimeError(name, "Undefined variable '" + name.lexeme + "'.")
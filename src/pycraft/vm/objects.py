@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from ..lox_callable import LoxCallable
+from .chunk import Chunk
+
+
+class VMFunction:
+    """The compile-time half of a function: its code and shape."""
+
+    __slots__ = "name", "arity", "chunk", "upvalue_count"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.arity = 0
+        self.chunk = Chunk()
+        self.upvalue_count = 0
+
+
+class Upvalue:
+    """A variable captured by a closure.
+
+    While the variable is still alive on the VM stack the upvalue is
+    open and only remembers the stack index. Once the variable goes out
+    of scope the value is moved into the upvalue itself.
+    """
+
+    __slots__ = "index", "value", "is_closed"
+
+    def __init__(self, index: int):
+        self.index = index
+        self.value = None
+        self.is_closed = False
+
+
+class VMClosure(LoxCallable):
+    """The runtime half of a function, bound to its captured variables."""
+
+    __slots__ = "function", "upvalues"
+
+    def __init__(self, function: VMFunction, upvalues: list[Upvalue]):
+        self.function = function
+        self.upvalues = upvalues
+
+    def arity(self) -> int:
+        return self.function.arity
+
+    def __call__(self, interpreter, arguments: list):
+        # only taken when a native calls back into Lox code,
+        # the VM itself calls closures without leaving its loop
+        return interpreter.call_closure(self, arguments)
+
+    def to_string(self) -> str:
+        return "<fn " + self.function.name + ">"
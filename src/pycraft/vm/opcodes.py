@@ -0,0 +1,65 @@
+"""Instruction set of the bytecode VM.
+
+Opcodes are plain ints so the dispatch loop compares small integers
+instead of going through enum members. Operands follow their opcode
+inline in the code array.
+"""
+
+CONSTANT = 0  # index
+NIL = 1
+TRUE = 2
+FALSE = 3
+POP = 4
+GET_LOCAL = 5  # slot
+SET_LOCAL = 6  # slot
+GET_GLOBAL = 7  # name index
+DEFINE_GLOBAL = 8  # name index
+SET_GLOBAL = 9  # name index
+GET_UPVALUE = 10  # index
+SET_UPVALUE = 11  # index
+EQUAL = 12
+NOT_EQUAL = 13
+GREATER = 14
+GREATER_EQUAL = 15
+LESS = 16
+LESS_EQUAL = 17
+ADD = 18
+SUBTRACT = 19
+MULTIPLY = 20
+DIVIDE = 21
+NOT = 22
+NEGATE = 23
+PRINT = 24
+JUMP = 25  # target
+JUMP_IF_FALSE = 26  # target, keeps the condition on the stack
+JUMP_IF_TRUE = 27  # target, keeps the condition on the stack
+POP_JUMP_IF_FALSE = 28  # target
+LOOP = 29  # target
+CALL = 30  # argument count
+CLOSURE = 31  # function index, then (is_local, index) per upvalue
+CLOSE_UPVALUE = 32
+RETURN = 33
+
+NAMES = {
+    value: name
+    for name, value in list(globals().items())
+    if name.isupper() and isinstance(value, int)
+}
+
+# number of inline operands, CLOSURE is variable-length
+OPERAND_COUNT = {
+    CONSTANT: 1,
+    GET_LOCAL: 1,
+    SET_LOCAL: 1,
+    GET_GLOBAL: 1,
+    DEFINE_GLOBAL: 1,
+    SET_GLOBAL: 1,
+    GET_UPVALUE: 1,
+    SET_UPVALUE: 1,
+    JUMP: 1,
+    JUMP_IF_FALSE: 1,
+    JUMP_IF_TRUE: 1,
+    POP_JUMP_IF_FALSE: 1,
+    LOOP: 1,
+    CALL: 1,
+}
@@ -0,0 +1,78 @@
+import io
+import pathlib
+
+import pytest
+
+from pycraft import batch
+
+from ..engines.test_vm import LOX_FILES
+
+SCRIPTS = {
+    "ok.lox": "print 1 + 2;",
+    "runtime_error.lox": 'print "x" - 1;',
+    "syntax_error.lox": "print (;",
+    "resolve_error.lox": "{ var a = a; }",
+}
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    for name, source in SCRIPTS.items():
+        (tmp_path / name).write_text(source, encoding="utf-8")
+    return tmp_path
+
+
+def codes(results):
+    return {pathlib.Path(result.path).name: result.exit_code for result in results}
+
+
+def test_expand_globs_in_order_without_duplicates(scripts):
+    paths = batch.expand([str(scripts / "syntax_error.lox"), str(scripts / "*.lox")])
+    assert [pathlib.Path(path).name for path in paths] == [
+        "syntax_error.lox", "ok.lox", "resolve_error.lox", "runtime_error.lox",
+    ]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_exit_codes_and_captured_output(scripts, jobs, capsys):
+    paths = batch.expand([str(scripts / "*.lox")])
+    results = list(batch.run_batch(paths, jobs=jobs))
+    assert codes(results) == {
+        "ok.lox": 0, "resolve_error.lox": 65, "runtime_error.lox": 70, "syntax_error.lox": 65,
+    }
+    assert results[0].output == "3\n"
+    assert results[2].output == "[line 1] Error at '-': Operands must be numbers.\n"
+    # nothing leaks to the real stdout
+    assert capsys.readouterr().out == ""
+
+
+def test_check_does_not_run(scripts):
+    paths = batch.expand([str(scripts / "*.lox")])
+    results = list(batch.run_batch(paths, jobs=1, check=True))
+    assert codes(results) == {
+        "ok.lox": 0, "resolve_error.lox": 65, "runtime_error.lox": 0, "syntax_error.lox": 65,
+    }
+    assert results[0].output == ""
+
+
+def test_unreadable_script(tmp_path):
+    [result] = batch.run_batch([str(tmp_path / "missing.lox")])
+    assert result.exit_code == batch.NO_INPUT
+
+
+def test_options_reach_each_interpreter():
+    paths = [str(path) for path in LOX_FILES[:8]]
+    tree = [result.output for result in batch.run_batch(paths, jobs=2)]
+    vm = [result.output for result in batch.run_batch(paths, jobs=2, engine="vm")]
+    assert tree == vm
+
+
+def test_report(scripts):
+    paths = batch.expand([str(scripts / "*.lox")])
+    out, summary = io.StringIO(), io.StringIO()
+    assert batch.report(batch.run_batch(paths, jobs=1), out, summary) == 1
+    assert out.getvalue().startswith(f"== {paths[0]}: ok (")
+    assert "3\n== " in out.getvalue()
+    lines = summary.getvalue().splitlines()
+    assert lines[:3] == ["4 scripts, 1 ok, 3 failed", "  exit 65: 2", "  exit 70: 1"]
+    assert "s in scripts" in lines[3]
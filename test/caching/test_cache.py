@@ -0,0 +1,103 @@
+import shutil
+
+import pytest
+
+from pycraft import cache
+from pycraft.lox import ENGINES, Lox
+
+from ..engines.test_vm import LOX_FILES
+
+PROGRAM = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+var total = 0;
+for (var i = 0; i < 10; i = i + 1) {
+  total = total + fib(i);
+}
+print total;
+"""
+
+
+def run(lox, path, capsys, **options):
+    try:
+        lox.run_file(path, **options)
+    except SystemExit as exc:
+        code = exc.code
+    except RuntimeError:
+        code = "parse error"
+    else:
+        code = 0
+    return code, capsys.readouterr().out
+
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / "script.lox"
+    path.write_text(PROGRAM, encoding="utf-8")
+    return path
+
+
+def no_parsing(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed a cached script")
+    monkeypatch.setattr("pycraft.lox.BufferScanner.scan_buffer", fail)
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_cached_program_runs_without_parsing(engine, script, capsys, monkeypatch):
+    assert run(Lox(engine=engine), script, capsys, cached=True) == (0, "88\n")
+    assert cache.cache_path(script).exists()
+
+    no_parsing(monkeypatch)
+    assert run(Lox(engine=engine), script, capsys, cached=True) == (0, "88\n")
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_cached_runs_match_uncached(filename, tmp_path, capsys):
+    if filename.endswith("deep_recursion.lox"):
+        pytest.skip("too deep for the tree-walking interpreter")
+    path = tmp_path / "script.lox"
+    shutil.copy(filename, path)
+
+    expected = run(Lox(optimization_level=2), path, capsys)
+    assert run(Lox(optimization_level=2), path, capsys, cached=True) == expected
+    assert run(Lox(optimization_level=2), path, capsys, cached=True) == expected
+
+
+def test_edited_script_misses_the_cache(script, capsys):
+    run(Lox(), script, capsys, cached=True)
+    script.write_text('print "edited";', encoding="utf-8")
+
+    assert run(Lox(), script, capsys, cached=True) == (0, "edited\n")
+
+
+def test_optimization_levels_are_cached_apart(script, capsys, monkeypatch):
+    run(Lox(optimization_level=0), script, capsys, cached=True)
+    key = cache.cache_key(script.read_bytes(), 2)
+
+    assert cache.load(script, key) is None
+    run(Lox(optimization_level=2), script, capsys, cached=True)
+    assert cache.load(script, key) is not None
+
+
+def test_corrupt_cache_file_is_replaced(script, capsys):
+    path = cache.cache_path(script)
+    path.parent.mkdir()
+    key = cache.cache_key(script.read_bytes(), 0)
+    path.write_bytes(cache.MAGIC + key + b"not a pickle")
+
+    assert run(Lox(), script, capsys, cached=True) == (0, "88\n")
+    assert cache.load(script, key) is not None
+
+
+def test_only_programs_that_resolve_are_cached(tmp_path, capsys):
+    path = tmp_path / "broken.lox"
+    path.write_text("print -nil;", encoding="utf-8")
+    assert run(Lox(), path, capsys, cached=True)[0] == 70
+    assert cache.load(path, cache.cache_key(path.read_bytes(), 0)) is not None
+
+    path.write_text("{ var a = a; }", encoding="utf-8")
+    assert run(Lox(), path, capsys, cached=True)[0] == 65
+    assert cache.load(path, cache.cache_key(path.read_bytes(), 0)) is None
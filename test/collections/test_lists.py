@@ -0,0 +1,73 @@
+from array import array
+
+import pytest
+
+from pycraft import natives, runtime
+from pycraft.lox import ENGINES, Lox
+from pycraft.lox_list import LoxList
+
+from ..engines.test_vm import run
+
+EXPECTED = [
+    "[0, 1, 2, 3, 4]",
+    "[0, 1, 1.4142135623730951, 1.7320508075688772, 2]",
+    "[0, 1, 2, 3, 4, a]",
+    "a",
+    "[1, 2, 3]",
+    "20",
+    "[9, 1, 4]",
+    "True",
+    "True",
+    "[0, 1, 2]",
+    "[3, 1, 2, [...]]",
+    "4",
+    "[0, 1, 2]",
+]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_lists(engine, capsys):
+    assert run(engine, "./test/collections/lists.lox", capsys) == (0, "\n".join(EXPECTED) + "\n")
+
+
+def test_numbers_stay_unboxed_until_something_else_is_stored():
+    items = LoxList.of([1.0, 2.0])
+    assert type(items.items) is array
+    items.append(3.0)
+    items[0] = 0.0
+    assert items.is_numeric()
+    items[1] = "two"
+    assert not items.is_numeric()
+    assert items.items == [0.0, "two", 3.0]
+
+
+def test_equality_ignores_the_representation():
+    numbers = LoxList.of([1.0, 2.0])
+    boxed = LoxList([1.0, 2.0])
+    assert runtime.is_equal(numbers, boxed)
+    assert not runtime.is_equal(numbers, LoxList.of([1.0]))
+    assert runtime.is_equal(LoxList([None, "a"]), LoxList([None, "a"]))
+    assert not runtime.is_equal(numbers, None)
+
+
+def test_map_with_a_native_runs_elementwise(monkeypatch):
+    def fail(x):
+        raise AssertionError("called the native per item")
+    monkeypatch.setattr(natives.MATH.functions["sqrt"], "fn", fail)
+    result = natives._map(None, LoxList.of([4.0, 9.0]), natives.MATH.functions["sqrt"])
+    assert result.items == array("d", [2.0, 3.0])
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('source, message', [
+    ('print get(range(0, 2), 2);', "Index out of range."),
+    ('print sum(map(range(0, 2), str));', "List must hold only numbers."),
+    ('print map(range(-1, 2), sqrt);', "Argument out of range."),
+    ('print map(range(0, 2), pow);', "Expect a function of one argument."),
+    ('print dot(range(0, 2), range(0, 3));', "Lists must have the same length."),
+    ('print pop(list());', "Pop from empty list."),
+])
+def test_list_errors(engine, source, message, capsys):
+    lox = Lox(engine=engine)
+    lox.run(source)
+    assert capsys.readouterr().out == f"[line 1] Error at ')': {message}\n"
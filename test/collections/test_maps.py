@@ -0,0 +1,69 @@
+import pytest
+
+from pycraft import natives, runtime
+from pycraft.lox import ENGINES, Lox
+from pycraft.lox_map import LoxMap
+
+from ..engines.test_vm import run
+
+EXPECTED = [
+    "{a: 3, b: 1, c: 1}",
+    "3",
+    "nil",
+    "1",
+    "nil",
+    "[a, c]",
+    "[3, 1]",
+    "onenilxy",
+    "{1: one, nil: nil, xy: xy, False: {a: 3, c: 1}}",
+    "True",
+    "{1: one, nil: nil, xy: xy, False: {a: 3, c: 1}, self: {...}}",
+    "True",
+]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_maps(engine, capsys):
+    assert run(engine, "./test/collections/maps.lox", capsys) == (0, "\n".join(EXPECTED) + "\n")
+
+
+@pytest.mark.parametrize('a, b', [
+    ("key", "key"),
+    (1.0, 1.0),
+    (0.0, -0.0),
+    (None, None),
+    (True, True),
+    ("x" * runtime.ROPE_THRESHOLD, runtime.concat("x" * (runtime.ROPE_THRESHOLD - 1), "x")),
+    ("a", "b"),
+    (1.0, "1"),
+    (None, False),
+])
+def test_keys_are_the_same_when_is_equal(a, b):
+    entries = LoxMap()
+    natives._set(entries, a, "first")
+    natives._set(entries, b, "second")
+    assert (len(entries) == 1) == runtime.is_equal(a, b)
+
+
+def test_rope_keys_are_stored_joined():
+    key = runtime.concat("x" * runtime.ROPE_THRESHOLD, "y")
+    entries = LoxMap()
+    natives._set(entries, key, 1.0)
+    assert [type(stored) for stored in entries.entries] == [str]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('source, message', [
+    ('set(hashMap(), list(), 1);', "Map key must be a string, number, boolean or nil."),
+    ('has(list(), 1);', "Argument must be a map."),
+    ('keys(nil);', "Argument must be a map."),
+])
+def test_map_errors(engine, source, message, capsys):
+    lox = Lox(engine=engine)
+    lox.run(source)
+    assert capsys.readouterr().out.endswith(f"Error at ')': {message}\n")
+
+
+def test_nan_keys_are_rejected():
+    with pytest.raises(natives.NativeError, match="NaN"):
+        natives.has(LoxMap(), float("nan"))
@@ -0,0 +1,35 @@
+import pytest
+
+from pycraft.closure_compiler import ClosureInterpreter
+from pycraft.error_handler import ErrorHandler
+from pycraft.parser import Parser
+from pycraft.resolver import Resolver
+from pycraft.scanner import Scanner
+
+from .test_vm import LOX_FILES, run
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_closure_engine_matches_tree_walker(capsys, filename):
+    if filename.endswith("deep_recursion.lox"):
+        pytest.skip("too deep for the tree-walking engines")
+    expected = run("tree", filename, capsys)
+    assert run("closure", filename, capsys) == expected
+
+
+def test_closure_engine_keeps_globals_between_runs(capsys):
+    error_handler = ErrorHandler()
+    interpreter = ClosureInterpreter(error_handler=error_handler)
+    for source in ('var a = 1;', 'fun inc() { a = a + 1; }', 'inc(); print a;'):
+        tokens = Scanner(source, error_handler=error_handler).scan_tokens()
+        statements = Parser(tokens, error_handler=error_handler).parse()
+        Resolver(interpreter, error_handler=error_handler).resolve(statements)
+        interpreter.interpret(statements)
+
+    assert capsys.readouterr().out == "2\n"
+
+
+def test_closure_engine_reports_bad_operands(capsys):
+    code, out = run("closure", "./test/engines/bad_operands.lox", capsys)
+    assert code == 70
+    assert out == "[line 1] Error at '+': Operands must be two numbers or two strings.\n"
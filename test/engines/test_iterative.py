@@ -0,0 +1,90 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.iterative import IterativeInterpreter
+from pycraft.lox import Lox
+from pycraft.parser import Parser
+from pycraft.scanner import Scanner
+
+from .test_vm import LOX_FILES, run
+
+DEPTH = '''
+fun depth(n) {
+  if (n == 0) return 0;
+  return 1 + depth(n - 1);
+}
+print depth(30000);
+'''
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_stack_engine_matches_tree_walker(capsys, filename):
+    if filename.endswith("deep_recursion.lox"):
+        pytest.skip("too deep for the tree-walking interpreter")
+    expected = run("tree", filename, capsys)
+    assert run("stack", filename, capsys) == expected
+
+
+def test_stack_engine_recursion_does_not_use_python_stack(capsys):
+    lox = Lox(engine="stack")
+    lox.run(DEPTH)
+
+    assert not lox.had_runtime_error()
+    assert capsys.readouterr().out == "30000\n"
+
+
+@pytest.mark.parametrize('options', [
+    {}, {"optimization_level": 2}, {"memo_size": 8},
+])
+def test_stack_engine_runs_deeply_nested_expressions(options, capsys):
+    lox = Lox(engine="stack", **options)
+    lox.run("print " + " + ".join(["1"] * 5000) + ";")
+
+    assert capsys.readouterr().out == "5000\n"
+
+
+def test_stack_engine_reports_stack_overflow(capsys):
+    lox = Lox(engine="stack", max_call_depth=1000)
+    lox.run(DEPTH)
+    lox.run('print "still usable";')
+
+    assert lox.had_runtime_error()
+    assert capsys.readouterr().out == (
+        "[line 4] Error at ')': Stack overflow.\n"
+        "still usable\n"
+    )
+
+
+def test_stack_engine_break_and_return_unwind_blocks(capsys):
+    lox = Lox(engine="stack")
+    lox.run('''
+    var a = "global";
+    fun f() {
+      var a = "local";
+      while (true) { { var b = 1; break; } }
+      { var c = 2; return a; }
+    }
+    print f();
+    print a;
+    ''')
+
+    assert capsys.readouterr().out == "local\nglobal\n"
+
+
+def test_stack_engine_break_never_leaves_its_call(capsys):
+    # the resolver rejects a break outside a loop, run it unresolved
+    error_handler = ErrorHandler()
+    source = 'fun f() { break; } print f(); print "after";'
+    tokens = Scanner(source, error_handler=error_handler).scan_tokens()
+    interpreter = IterativeInterpreter(error_handler=error_handler)
+    interpreter.interpret(Parser(tokens, error_handler=error_handler).parse())
+
+    assert capsys.readouterr().out == "nil\nafter\n"
+    assert interpreter._depth == 0
+    assert interpreter._environment is interpreter._globals
+
+
+@pytest.mark.parametrize('engine', ["tree", "closure", "python"])
+def test_call_depth_limit_needs_an_engine_with_its_own_stack(engine):
+    with pytest.raises(ValueError, match="max_call_depth needs the stack or vm engine"):
+        Lox(engine=engine, max_call_depth=10)
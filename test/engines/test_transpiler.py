@@ -0,0 +1,69 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.parser import Parser
+from pycraft.resolver import Resolver
+from pycraft.scanner import Scanner
+from pycraft.transpiler import PythonInterpreter
+
+from .test_vm import LOX_FILES, run
+
+
+def interpret(interpreter, source):
+    error_handler = interpreter.error_handler
+    tokens = Scanner(source, error_handler=error_handler).scan_tokens()
+    statements = Parser(tokens, error_handler=error_handler).parse()
+    Resolver(interpreter, error_handler=error_handler).resolve(statements)
+    interpreter.interpret(statements)
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_python_engine_matches_tree_walker(capsys, filename):
+    if filename.endswith(("deep_recursion.lox", "tail_calls.lox")):
+        pytest.skip("too deep for engines recursing in Python")
+    expected = run("tree", filename, capsys)
+    assert run("python", filename, capsys) == expected
+
+
+def test_python_engine_keeps_globals_between_runs(capsys):
+    interpreter = PythonInterpreter(error_handler=ErrorHandler())
+    for source in ('var a = 1;', 'fun inc() { a = a + 1; }', 'inc(); print a;'):
+        interpret(interpreter, source)
+
+    assert capsys.readouterr().out == "2\n"
+
+
+def test_python_engine_compiles_functions_to_defs():
+    interpreter = PythonInterpreter(error_handler=ErrorHandler())
+    interpret(interpreter, 'fun add(a, b) { return a + b; }')
+
+    assert "def " in interpreter.source
+    assert "g_add = _PythonFunction('add', 2, " in interpreter.source
+
+
+def test_python_engine_reports_runtime_error_line(capsys):
+    code, out = run("python", "./test/engines/bad_operands.lox", capsys)
+    assert code == 70
+    assert out == "[line 1] Error at '+': Operands must be two numbers or two strings.\n"
+
+
+def test_python_engine_tells_apart_parameters_on_one_line(capsys):
+    interpreter = PythonInterpreter(error_handler=ErrorHandler())
+    interpret(
+        interpreter,
+        'fun even(n) { if (n == 0) return true; return odd(n - 1); } '
+        'fun odd(n) { if (n == 0) return false; return even(n - 1); } print even(3);',
+    )
+
+    assert capsys.readouterr().out == "False\n"
+
+
+def test_python_engine_reports_a_stray_break_it_is_handed(capsys):
+    # the resolver rejects a break outside a loop, transpile it unresolved
+    interpreter = PythonInterpreter(error_handler=ErrorHandler())
+    error_handler = interpreter.error_handler
+    tokens = Scanner("while (false) {}\nbreak;\nprint 1;", error_handler=error_handler).scan_tokens()
+    interpreter.interpret(Parser(tokens, error_handler=error_handler).parse())
+
+    assert error_handler.had_runtime_error
+    assert capsys.readouterr().out == "[line 2] Error at 'break': Can't break outside a loop.\n"
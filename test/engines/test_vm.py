@@ -0,0 +1,60 @@
+import pathlib
+
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.lox import Lox
+from pycraft.parser import Parser
+from pycraft.scanner import Scanner
+from pycraft.vm import VM
+
+LOX_FILES = sorted(str(path) for path in pathlib.Path("./test").rglob("*.lox"))
+
+
+def run(engine, filename, capsys):
+    lox = Lox(engine=engine)
+    try:
+        lox.run_file(filename)
+    except SystemExit as exc:
+        code = exc.code
+    except RuntimeError:
+        # syntax errors escape Parser.parse as exceptions
+        code = "parse error"
+    else:
+        code = 0
+    return code, capsys.readouterr().out
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_vm_matches_tree_walker(capsys, filename):
+    if filename.endswith("deep_recursion.lox"):
+        pytest.skip("too deep for the tree-walking interpreter")
+    expected = run("tree", filename, capsys)
+    assert run("vm", filename, capsys) == expected
+
+
+def test_vm_recursion_does_not_use_python_stack(capsys):
+    code, out = run("vm", "./test/engines/deep_recursion.lox", capsys)
+    assert code == 0
+    assert out == "5000\n"
+
+
+def test_vm_closures_capture_each_iteration(capsys):
+    code, out = run("vm", "./test/engines/closures_in_loop.lox", capsys)
+    assert out == "0\n1\n"
+
+
+def test_vm_runtime_error_reports_line(capsys):
+    code, out = run("vm", "./test/functions/functions_with_runtime_error.lox", capsys)
+    assert code == 70
+    assert "Can only call functions and classes." in out
+
+
+def test_vm_reports_a_stray_break_it_is_handed(capsys):
+    # the resolver rejects a break outside a loop, compile it unresolved
+    error_handler = ErrorHandler()
+    tokens = Scanner("break;", error_handler=error_handler).scan_tokens()
+    VM(error_handler=error_handler).interpret(Parser(tokens, error_handler=error_handler).parse())
+
+    assert error_handler.had_runtime_error
+    assert capsys.readouterr().out == "[line 1] Error at 'break': Can't break outside a loop.\n"
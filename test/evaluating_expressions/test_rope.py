@@ -0,0 +1,67 @@
+import pickle
+
+import pytest
+
+from pycraft import runtime
+from pycraft.lox import ENGINES
+from pycraft.runtime import Rope
+
+from ..engines.test_vm import run
+
+LONG = "x" * runtime.ROPE_THRESHOLD
+
+
+def build(*pieces):
+    value = ""
+    for piece in pieces:
+        value = runtime.concat(value, piece)
+    return value
+
+
+def test_short_concatenations_stay_str():
+    assert type(runtime.concat("ab", "cd")) is str
+
+
+def test_long_concatenations_make_ropes():
+    rope = build(LONG, "a", "b")
+    assert type(rope) is Rope
+    assert str(rope) == LONG + "ab"
+    assert len(rope) == len(LONG) + 2
+
+
+def test_growing_an_older_rope_branches_off():
+    base = build(LONG, "a")
+    left = base.concat("b")
+    right = base.concat("c")
+    assert (str(base), str(left), str(right)) == (LONG + "a", LONG + "ab", LONG + "ac")
+
+
+def test_rope_is_equal_to_its_str():
+    rope = build(LONG, "a")
+    assert runtime.is_equal(rope, LONG + "a")
+    assert runtime.is_equal(LONG + "a", rope)
+    assert runtime.is_equal(rope, build(LONG[:-1], "xa"))
+    assert not runtime.is_equal(rope, LONG + "b")
+    assert not runtime.is_equal(rope, None)
+    assert not runtime.is_equal(rope, 1.0)
+    assert hash(rope) == hash(LONG + "a")
+
+
+def test_rope_stringifies_and_adds_like_a_str():
+    rope = build(LONG, "a")
+    assert runtime.stringify(rope) == LONG + "a"
+    assert runtime.add(None, rope, 1.0) == LONG + "a1"
+    assert runtime.add(None, True, rope) == "True" + LONG + "a"
+    assert runtime.is_truthy(rope)
+
+
+def test_rope_pickles_as_str():
+    assert type(pickle.loads(pickle.dumps(build(LONG, "a")))) is str
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_string_building(engine, capsys):
+    code, out = run(engine, "./test/evaluating_expressions/string_building.lox", capsys)
+    text = "".join(f"{i}," for i in range(300))
+    assert code == 0
+    assert out.splitlines() == ["True", "False", "False", text + "a", "[3]nilTrue"]
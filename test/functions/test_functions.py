@@ -47,3 +47,27 @@ def test_print_function_object(lox, capsys):
     lox.run_file('./test/functions/print_function_object.lox')
     captured = capsys.readouterr()
     assert captured.out == "<fn add>\n"
+
+
+def test_return_unwinds_nested_loops(lox, capsys):
+    lox.run_file('./test/functions/return_from_loops.lox')
+    captured = capsys.readouterr()
+    assert captured.out == '3\nnone\n'
+
+
+def test_tail_calls_run_in_constant_stack(lox, capsys):
+    lox.run_file('./test/functions/tail_calls.lox')
+    captured = capsys.readouterr()
+    assert captured.out == '5000\nFalse\n'
+
+
+def test_call_site_caches_follow_global_changes(lox, capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        lox.run_file('./test/functions/call_site_caches.lox')
+
+    assert excinfo.value.code == 70
+    captured = capsys.readouterr()
+    assert captured.out == (
+        '1\n1\n2\n2\n2\n3\nredefined\n'
+        "[line 18] Error at ')': Expected 2 arguments but got 1.\n"
+    )
@@ -0,0 +1,97 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.lox import ENGINES, Lox
+from pycraft.parser import BufferParser
+from pycraft.scanner import BufferScanner
+
+from ..engines.test_vm import LOX_FILES
+
+
+def run(filename, capsys, **options):
+    lox = Lox(**options)
+    try:
+        lox.run_file(filename)
+    except SystemExit as exc:
+        code = exc.code
+    except RuntimeError:
+        code = "parse error"
+    else:
+        code = 0
+    return code, capsys.readouterr().out
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('level', [0, 2])
+def test_lazy_functions(engine, level, capsys):
+    assert run(
+        './test/functions/lazy_functions.lox',
+        capsys,
+        engine=engine,
+        optimization_level=level,
+        lazy_functions=True,
+    ) == (0, "outer\n1\n2\ndone\n")
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_lazy_functions_run_programs_the_same(filename, capsys):
+    if filename.endswith(
+        ("deep_recursion.lox", "duplicate_local.lox", "break_in_function_in_loop.lox")
+    ):
+        pytest.skip("errors in uncalled functions are only found when eager")
+    expected = run(filename, capsys, optimization_level=2)
+    assert run(filename, capsys, optimization_level=2, lazy_functions=True) == expected
+
+
+@pytest.mark.parametrize('engine', ["tree", "stack"])
+def test_uncalled_bodies_are_never_parsed(engine, capsys):
+    lox = Lox(engine=engine, lazy_functions=True)
+    lox.run('fun unused() { { this is not { valid } lox } }\nprint "done";')
+    assert capsys.readouterr().out == "done\n"
+
+
+@pytest.mark.parametrize('engine', ["closure", "python", "vm"])
+def test_compiling_engines_parse_bodies_before_running(engine, capsys):
+    lox = Lox(engine=engine, lazy_functions=True)
+    lox.run('print "start";\nfun unused() { print 1 +; }')
+    assert capsys.readouterr().out == "[line 2] Error at ';': Expect expression.\n"
+
+
+def test_bodies_are_parsed_on_first_call(capsys):
+    error_handler = ErrorHandler()
+    tokens = BufferScanner(
+        "fun f() { fun g() { print 1; } g(); }", error_handler=error_handler
+    ).scan_buffer()
+    f, = BufferParser(tokens, error_handler, lazy_functions=True).parse()
+
+    assert f.lazy_body() is not None
+    g, call = f.body
+    assert f.lazy_body() is None
+    assert g.lazy_body() is not None
+
+
+def test_propagation_sees_assignments_in_lazy_bodies(capsys):
+    lox = Lox(optimization_level=2, lazy_functions=True)
+    lox.run("{ var a = 1; fun f() { a = 2; } f(); print a; }")
+    assert capsys.readouterr().out == "2\n"
+
+
+@pytest.mark.parametrize(
+    'body, error',
+    [
+        ("print 1 +;", "[line 3] Error at ';': Expect expression."),
+        ("var a; var a;", "[line 3] Error at 'a': Already a variable with this name in this scope."),
+    ]
+)
+def test_errors_are_reported_on_first_call(body, error, tmp_path, capsys):
+    path = tmp_path / "script.lox"
+    path.write_text(f'print "before";\nfun f() {{\n{body}\n}}\nf();\nprint "after";\n')
+
+    assert run(path, capsys, lazy_functions=True) == (65, f"before\n{error}\n")
+
+
+def test_unterminated_body_is_reported_when_skipped(capsys):
+    lox = Lox(lazy_functions=True)
+    with pytest.raises(RuntimeError):
+        lox.run("fun f() { { print 1; }")
+    assert capsys.readouterr().out == "[line 1] Error at end: Expect '}' after block.\n"
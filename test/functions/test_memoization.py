@@ -0,0 +1,107 @@
+import pytest
+
+from pycraft.lox import Lox
+
+from ..engines.test_vm import run
+
+EXPECTED = ["610", "10", "#1#-0#0", "2", "2", "2", "11", "loud", "loud", "2"]
+
+
+def memoized(lox):
+    return sorted(cache.name for cache in lox.memo_stats() if cache.enabled)
+
+
+@pytest.mark.parametrize('engine', ["tree", "stack"])
+def test_memoized_functions_print_the_same(engine, capsys):
+    lox = Lox(engine=engine, memo_size=16)
+    lox.run_file("./test/functions/memoization.lox")
+    assert capsys.readouterr().out == "\n".join(EXPECTED) + "\n"
+    assert run(engine, "./test/functions/memoization.lox", capsys) == (0, "\n".join(EXPECTED) + "\n")
+    stats = {cache.name: (cache.hits, cache.misses) for cache in lox.memo_stats()}
+    assert stats == {"fib": (13, 16), "hypot": (1, 1), "label": (0, 3)}
+
+
+@pytest.mark.parametrize('engine', ["tree", "stack"])
+def test_memoized_tail_calls_reuse_the_frame(engine, capsys):
+    lox = Lox(engine=engine, memo_size=16)
+    lox.run_file("./test/functions/tail_calls.lox")
+    assert capsys.readouterr().out == "5000\nFalse\n"
+    stats = {cache.name: (cache.hits, cache.misses) for cache in lox.memo_stats()}
+    assert stats == {"count": (0, 5001), "isEven": (0, 1501), "isOdd": (0, 1501)}
+    # the outermost calls of a chain are the ones kept
+    lox.run("print count(5000, 0); print count(4999, 1);")
+    assert capsys.readouterr().out == "5000\n5000\n"
+    assert lox.memo_stats()[0].hits == 2
+
+
+def test_memoized_calls_run_on_the_explicit_stack(capsys):
+    lox = Lox(engine="stack", memo_size=16)
+    lox.run_file("./test/engines/deep_recursion.lox")
+    lox.run("fun sum(n) { if (n == 0) return 0; return n + sum(n - 1); } print sum(50000);")
+    assert capsys.readouterr().out == "5000\n1250025000\n"
+    assert [cache.misses for cache in lox.memo_stats()] == [5001, 50001]
+
+
+@pytest.mark.parametrize('source, pure', [
+    ('fun f(n) { var m = n; m = m + 1; return m; }', ["f"]),
+    ('fun f(n) { return sqrt(n) + len(str(n)); }', ["f"]),
+    ('fun f(n) { return g(n); } fun g(n) { return f(n); }', ["f", "g"]),
+    ('fun f(n) { print n; }', []),
+    ('fun f(n) { return clock(); }', []),
+    ('fun f(n) { return n(); }', []),
+    ('fun f(n) { fun g() { return n; } return g; }', []),
+    ('var x = 1; fun f(n) { return n + x; }', []),
+    ('var x = 1; fun f(n) { x = n; }', []),
+    ('fun f(n) { return g(n); } fun g(n) { print n; }', []),
+    ('fun f(n) { return n; } f = nil;', []),
+    ('fun f(n) { return n; } fun f(n) { return -n; }', []),
+    ('var sqrt = nil; fun f(n) { return sqrt(n); }', []),
+    ('{ fun f(n) { return n; } }', []),
+])
+def test_only_pure_functions_are_memoized(source, pure):
+    lox = Lox(memo_size=4)
+    lox.run(source)
+    assert memoized(lox) == pure
+
+
+def test_later_programs_take_back_purity():
+    lox = Lox(memo_size=4)
+    lox.run("fun f(n) { return g(n); } fun g(n) { return n; } fun h(n) { return n; }")
+    lox.run("print f(1); print h(1);")
+    lox.run("fun k() { g = nil; }")
+    assert memoized(lox) == ["h"]
+    assert all(not cache.results for cache in lox.memo_stats() if not cache.enabled)
+
+
+def test_lazy_function_bodies_memoize_nothing():
+    lox = Lox(memo_size=4, lazy_functions=True)
+    lox.run("fun f(n) { return n; }")
+    assert memoized(lox) == []
+
+
+def test_caches_drop_the_least_recently_used_result():
+    lox = Lox(memo_size=2)
+    lox.run("fun f(n) { return n; } for (var i = 0; i < 10; i = i + 1) f(i); f(9); f(0);")
+    [cache] = lox.memo_stats()
+    assert len(cache.results) == 2
+    assert (cache.hits, cache.misses) == (1, 11)
+
+
+def test_lists_and_maps_are_passed_uncached(capsys):
+    lox = Lox(memo_size=4)
+    lox.run("fun size(l) { return len(l); } var l = list(); print size(l); push(l, 1); print size(l);")
+    assert capsys.readouterr().out == "0\n1\n"
+    [cache] = lox.memo_stats()
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_equal_arguments_of_other_types_are_other_keys(capsys):
+    lox = Lox(memo_size=4)
+    lox.run('fun show(x) { return str(x); } print show(1) + show(true) + show(1);')
+    assert capsys.readouterr().out == "1True1\n"
+
+
+@pytest.mark.parametrize('engine', ["closure", "python", "vm"])
+def test_memoization_needs_an_engine_calling_lox_functions(engine):
+    with pytest.raises(ValueError, match="memo_size needs the tree or stack engine"):
+        Lox(engine=engine, memo_size=8)
@@ -0,0 +1,65 @@
+import pytest
+
+from pycraft.lox import ENGINES, Lox
+from pycraft.natives import NativeError, NativeModule
+
+from ..engines.test_vm import run
+
+EXPECTED = [
+    "4", "1024", "5", "3", "16", "Hello, World", "HELLO, WORLDabc", "World",
+    "8", "a+b+c", "1.5nilTrue<native fn>", "43", "nil", "3", "True",
+]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_standard_library(engine, capsys):
+    assert run(engine, "./test/functions/natives.lox", capsys) == (0, "\n".join(EXPECTED) + "\n")
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('source, line, message', [
+    ('print sqrt("x");', 1, "Argument must be a number."),
+    ('print sqrt(-1);', 1, "Argument out of range."),
+    ('print substring("abc", 1, 5);', 1, "Substring out of range."),
+    ('var f = upper;\nf(1);', 2, "Argument must be a string."),
+    ('fun g() {\n  return len(nil);\n}\ng();', 2, "Argument must be a string, a list or a map."),
+    ('print len("a", "b");', 1, "Expected 1 arguments but got 2."),
+])
+def test_native_errors_are_runtime_errors(engine, source, line, message, capsys):
+    lox = Lox(engine=engine)
+    lox.run(source)
+    assert lox.had_runtime_error()
+    out = capsys.readouterr().out
+    assert out == f"[line {line}] Error at ')': {message}\n"
+
+
+HOST = NativeModule("host")
+calls = []
+
+
+@HOST.native()
+def record(value):
+    calls.append(value)
+
+
+@HOST.native("twice", arity=1, interpreter=True)
+def call_twice(interpreter, function):
+    if function.arity() != 0:
+        raise NativeError("Expect a function without parameters.")
+    return [function(interpreter, []), function(interpreter, [])][-1]
+
+
+def test_registry_declares_arity():
+    assert HOST.functions["record"].arity() == 1
+    assert HOST.functions["twice"].arity() == 1
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_host_natives(engine, capsys):
+    calls.clear()
+    lox = Lox(engine=engine)
+    lox.install(HOST)
+    lox.run('var n = 0; fun bump() { n = n + 1; record(n); return n; } print twice(bump);')
+    assert not lox.had_runtime_error()
+    assert capsys.readouterr().out == "2\n"
+    assert calls == [1.0, 2.0]
@@ -0,0 +1,89 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.expr import Literal, VariableExpr
+from pycraft.lox import Lox
+from pycraft.optimizer import Optimizer
+from pycraft.parser import Parser
+from pycraft.scanner import Scanner
+from pycraft.stmt import Block, Print
+
+from ..engines.test_vm import LOX_FILES
+
+
+def optimize(source, level=2):
+    error_handler = ErrorHandler()
+    tokens = Scanner(source, error_handler=error_handler).scan_tokens()
+    statements = Parser(tokens, error_handler=error_handler).parse()
+    optimizer = Optimizer(level=level)
+    return optimizer.optimize(statements), optimizer
+
+
+def run(filename, level, capsys):
+    lox = Lox(optimization_level=level)
+    try:
+        lox.run_file(filename)
+    except SystemExit as exc:
+        code = exc.code
+    except RuntimeError:
+        code = "parse error"
+    else:
+        code = 0
+    return code, capsys.readouterr().out
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_optimized_programs_behave_the_same(capsys, filename):
+    if filename.endswith("deep_recursion.lox"):
+        pytest.skip("too deep for the tree-walking interpreter")
+    expected = run(filename, 0, capsys)
+    assert run(filename, 2, capsys) == expected
+
+
+def test_folds_constant_expressions():
+    statements, _ = optimize('print (1 + 2) * 3 == 9 and !nil;')
+    assert isinstance(statements[0].expression, Literal)
+    assert statements[0].expression.value is True
+
+
+def test_keeps_operations_that_fail_at_runtime():
+    statements, _ = optimize('print 1 - "a"; print 1 / 0;')
+    assert not isinstance(statements[0].expression, Literal)
+    assert not isinstance(statements[1].expression, Literal)
+
+
+def test_removes_dead_branches_and_loops():
+    statements, _ = optimize('if (1 > 2) print "a"; else print "b"; while (nil) print "c";')
+    assert len(statements) == 1
+    assert isinstance(statements[0], Print)
+    assert statements[0].expression.value == "b"
+
+
+def test_propagates_locals_never_reassigned():
+    statements, _ = optimize('{ var a = 2; var b = 3; b = 4; print a * 10; print b; }')
+    block = statements[0]
+    assert isinstance(block, Block)
+    assert block.statements[3].expression.value == 20.0
+    assert isinstance(block.statements[4].expression, VariableExpr)
+
+
+def test_does_not_propagate_globals():
+    statements, _ = optimize('var a = 1; print a;')
+    assert isinstance(statements[1].expression, VariableExpr)
+
+
+def test_reports_node_count_after_each_pass():
+    _, optimizer = optimize('{ var a = 2; print (a + 1); }')
+    assert optimizer.node_counts == [
+        ("input", 8),
+        ("fold", 7),
+        ("propagate", 7),
+        ("fold", 5),
+        ("dead_code", 5),
+    ]
+
+
+def test_level_zero_leaves_the_tree_alone():
+    statements, optimizer = optimize('print 1 + 2;', level=0)
+    assert not isinstance(statements[0].expression, Literal)
+    assert optimizer.node_counts == [("input", 4)]
@@ -1,7 +1,11 @@
 import pytest
 
+from pycraft.ast_printer import ASTPrinter
 from pycraft.error_handler import ErrorHandler
+from pycraft.exception import LoxRuntimeError
+from pycraft.expr import Binary, Call, Literal, Logical, Unary
 from pycraft.parser import Parser
+from pycraft.scanner import RegexScanner
 from pycraft.tokenclass import Token, TokenType
 
 
@@ -16,3 +20,79 @@ def test_parser_throw_runtime_error():
     )
     with pytest.raises(RuntimeError):
         parser.parse()
+
+
+def test_nodes_share_equal_tokens():
+    error_handler = ErrorHandler()
+    tokens = RegexScanner("a + a + a;\na + a;", error_handler=error_handler).scan_tokens()
+    first, second = Parser(tokens=tokens, error_handler=error_handler).parse()
+
+    outer = first.expression
+    assert outer.operator is outer.left.operator
+    # names stay apart, tokens of parameters are told apart by identity
+    assert outer.right.name is not outer.left.left.name
+    assert outer.right.name.lexeme is outer.left.left.name.lexeme
+    assert second.expression.operator is not outer.operator
+    assert second.expression.operator.line == 2
+    assert not hasattr(outer, "__dict__")
+    assert not hasattr(first, "__dict__")
+
+
+def test_nesting_too_deep_is_a_syntax_error(capsys):
+    error_handler = ErrorHandler()
+    source = "print " + "(" * 5000 + "1" + ")" * 5000 + ";"
+    tokens = RegexScanner(source, error_handler=error_handler).scan_tokens()
+    with pytest.raises(LoxRuntimeError, match="Expression nests too deeply."):
+        Parser(tokens=tokens, error_handler=error_handler).parse()
+    assert capsys.readouterr().out.endswith(": Expression nests too deeply.\n")
+
+
+def parse_expression(source):
+    error_handler = ErrorHandler()
+    tokens = RegexScanner(source + ";", error_handler=error_handler).scan_tokens()
+    statement, = Parser(tokens=tokens, error_handler=error_handler).parse()
+    return statement.expression
+
+
+@pytest.mark.parametrize(
+    'source, expected',
+    [
+        ("1 + 2 * 3", "(+ 1.0 (* 2.0 3.0))"),
+        ("1 - 2 - 3", "(- (- 1.0 2.0) 3.0)"),
+        ("1 < 2 == 3 >= 4", "(== (< 1.0 2.0) (>= 3.0 4.0))"),
+        ("-1 * -2", "(* (- 1.0) (- 2.0))"),
+        ("!!true != false", "(!= (! (! True)) False)"),
+        ("a = b = 1 + 2", "(= a (= b (+ 1.0 2.0)))"),
+        ("(1 + 2) / 3", "(/ (group (+ 1.0 2.0)) 3.0)"),
+    ]
+)
+def test_operator_precedence(source, expected):
+    assert ASTPrinter().print(parse_expression(source)) == expected
+
+
+def test_logical_and_call_precedence():
+    expr = parse_expression("a or b and -f(1)(2) == c")
+
+    assert isinstance(expr, Logical) and expr.operator.type == TokenType.OR
+    right = expr.right
+    assert isinstance(right, Logical) and right.operator.type == TokenType.AND
+    equality = right.right
+    assert isinstance(equality, Binary) and isinstance(equality.left, Unary)
+    call = equality.left.right
+    assert isinstance(call, Call) and isinstance(call.callee, Call)
+
+
+def test_invalid_assignment_target(capsys):
+    expr = parse_expression("a + b = c")
+
+    assert isinstance(expr, Binary)
+    assert capsys.readouterr().out == "[line 1] Error at '=': Invalid assignment target.\n"
+
+
+def test_nesting_does_not_recurse_per_precedence_level():
+    depth = 150
+    expr = parse_expression("(" * depth + "1" + ")" * depth)
+
+    for _ in range(depth):
+        expr = expr.expression
+    assert isinstance(expr, Literal)
@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    'filename, expected_out',
+    [
+        ('./test/resolving_and_binding/closures.lox', '1\n2\n'),
+        ('./test/resolving_and_binding/static_scope.lox', 'global\nglobal\nblock\n'),
+        ('./test/resolving_and_binding/nested_blocks.lox', '6\n'),
+    ]
+)
+def test_resolved_locals(lox, capsys, filename, expected_out):
+    lox.run_file(filename)
+    captured = capsys.readouterr()
+    assert captured.out == expected_out
+
+
+@pytest.mark.parametrize(
+    'filename, expected_error',
+    [
+        (
+            './test/resolving_and_binding/read_local_in_own_initializer.lox',
+            "[line 3] Error at 'a': Can't read local variable in its own initializer.",
+        ),
+        (
+            './test/resolving_and_binding/duplicate_local.lox',
+            "[line 3] Error at 'a': Already a variable with this name in this scope.",
+        ),
+        (
+            './test/resolving_and_binding/top_level_return.lox',
+            "[line 1] Error at 'return': Can't return from top-level code.",
+        ),
+        (
+            './test/resolving_and_binding/top_level_break.lox',
+            "[line 1] Error at 'break': Can't break outside a loop.",
+        ),
+        (
+            './test/resolving_and_binding/break_in_function.lox',
+            "[line 2] Error at 'break': Can't break outside a loop.",
+        ),
+        (
+            './test/resolving_and_binding/break_in_function_in_loop.lox',
+            "[line 3] Error at 'break': Can't break outside a loop.",
+        ),
+    ]
+)
+def test_resolver_errors(lox, capsys, filename, expected_error):
+    with pytest.raises(SystemExit) as excinfo:
+        lox.run_file(filename)
+
+    assert excinfo.value.code == 65
+    captured = capsys.readouterr()
+    assert expected_error in captured.out
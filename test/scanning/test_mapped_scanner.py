@@ -0,0 +1,61 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.lox import Lox
+from pycraft.scanner import MappedScanner, RegexScanner
+
+from ..engines.test_vm import LOX_FILES
+
+
+def scan(scanner_class, source):
+    error_handler = ErrorHandler()
+    tokens = scanner_class(source, error_handler=error_handler).scan_tokens()
+    return [
+        (token.type, token.lexeme, token.literal, token.line) for token in tokens
+    ], error_handler.errors
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_mapped_scanner_matches_regex_scanner_on_programs(filename, capsys):
+    with open(filename, encoding="utf-8") as f:
+        source = f.read()
+    assert scan(MappedScanner, memoryview(source.encode())) == scan(RegexScanner, source)
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        '',
+        'var a = 1.5; // comment\nprint a >= 2 != !true;',
+        '"multi\nline" 1.',
+        'a @ b _c #',
+        '"unterminated\nstring',
+        '"é" // ü\nprint "ö\n";',
+        'café été\nx² 2.٣ ٣',
+    ]
+)
+def test_mapped_scanner_matches_regex_scanner(source, capsys):
+    assert scan(MappedScanner, source.encode()) == scan(RegexScanner, source)
+
+
+def test_run_mapped(tmp_path, capsys):
+    path = tmp_path / "script.lox"
+    path.write_text('var a = "é\n";\nprint a + "x";\nprint -a;\n', encoding="utf-8")
+
+    lox = Lox()
+    lox.run_mapped(path)
+
+    out, _ = capsys.readouterr()
+    assert out == "é\nx\n[line 4] Error at '-': Operand must be a number.\n"
+    assert lox.had_runtime_error()
+
+
+def test_run_mapped_empty_file(tmp_path, capsys):
+    path = tmp_path / "empty.lox"
+    path.write_bytes(b"")
+
+    lox = Lox()
+    lox.run_mapped(path)
+
+    assert capsys.readouterr().out == ""
+    assert not lox.had_error()
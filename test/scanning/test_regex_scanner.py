@@ -0,0 +1,46 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.scanner import RegexScanner, Scanner
+
+from ..engines.test_vm import LOX_FILES
+
+
+def scan(scanner_class, source):
+    error_handler = ErrorHandler()
+    tokens = scanner_class(source, error_handler=error_handler).scan_tokens()
+    return [
+        (token.type, token.lexeme, token.literal, token.line) for token in tokens
+    ], error_handler.errors
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_regex_scanner_matches_scanner_on_programs(filename, capsys):
+    with open(filename, encoding="utf-8") as f:
+        source = f.read()
+    assert scan(RegexScanner, source) == scan(Scanner, source)
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        '',
+        'var a = 1.5; // comment\nprint a >= 2 != !true;',
+        '"multi\nline" 1.',
+        '1.2.3 .5 a1b2',
+        'a @ b _c #',
+        '"unterminated\nstring',
+        'café été x² 2.٣ ٣',
+        'a/b//c\n/',
+    ]
+)
+def test_regex_scanner_matches_scanner(source, capsys):
+    assert scan(RegexScanner, source) == scan(Scanner, source)
+
+
+def test_regex_scanner_reports_errors_with_line(capsys):
+    _, errors = scan(RegexScanner, 'print 1;\n@\n"open')
+    assert errors == [
+        "[line 2] Error: Unexpected character.",
+        "[line 3] Error: Unterminated string.",
+    ]
@@ -0,0 +1,114 @@
+import io
+
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.exception import LoxRuntimeError
+from pycraft.lox import Lox
+from pycraft.scanner import RegexScanner, StreamingScanner
+
+from ..engines.test_vm import LOX_FILES
+
+
+class SmallBlocks(StreamingScanner):
+    BLOCK_SIZE = 7
+
+
+def scan(tokens):
+    return [(token.type, token.lexeme, token.literal, token.line) for token in tokens]
+
+
+def scan_streaming(scanner_class, source):
+    error_handler = ErrorHandler()
+    tokens = scanner_class(io.StringIO(source), error_handler=error_handler)
+    return scan(tokens), error_handler.errors
+
+
+def scan_whole(source):
+    error_handler = ErrorHandler()
+    tokens = RegexScanner(source, error_handler=error_handler).scan_tokens()
+    return scan(tokens), error_handler.errors
+
+
+@pytest.mark.parametrize('scanner_class', [StreamingScanner, SmallBlocks])
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_streaming_scanner_matches_regex_scanner_on_programs(scanner_class, filename, capsys):
+    with open(filename, encoding="utf-8") as f:
+        source = f.read()
+    assert scan_streaming(scanner_class, source) == scan_whole(source)
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        '',
+        'print 1;',
+        'var a = "a string\nspanning\nseveral\nblocks";\nprint a;\n',
+        '"unterminated\nstring\nacross blocks',
+        'averylongidentifierwithoutanynewline',
+        '// comment\n// another\nprint 1.5;',
+    ]
+)
+def test_streaming_scanner_matches_regex_scanner(source, capsys):
+    assert scan_streaming(SmallBlocks, source) == scan_whole(source)
+
+
+class RecordingReader(io.StringIO):
+    """Reader logging each read, so tests can see when source is read."""
+
+    def __init__(self, source, log):
+        super().__init__(source)
+        self.log = log
+
+    def read(self, size=-1):
+        block = super().read(size)
+        self.log.append("read")
+        return block
+
+
+def test_statements_run_before_the_source_is_read(monkeypatch, capsys):
+    monkeypatch.setattr(StreamingScanner, "BLOCK_SIZE", 16)
+    log = []
+    monkeypatch.setattr("builtins.print", lambda value: log.append(value))
+    source = "print 1;\n" + "var a = 2;\n" * 20 + "print a;\n"
+
+    Lox().run_stream(RecordingReader(source, log))
+
+    assert log[:2] == ["read", "1"]
+    assert log[-2:] == ["2", "read"]
+
+
+def test_statements_before_a_syntax_error_run(capsys):
+    lox = Lox()
+    try:
+        lox.run_stream(io.StringIO('print "before";\nprint ;\nprint "after";\n'))
+    except LoxRuntimeError:
+        # how the parser gives up after reporting is not what's tested
+        pass
+
+    out, _ = capsys.readouterr()
+    assert out == "before\n[line 2] Error at ';': Expect expression.\n"
+
+
+def test_runtime_error_stops_the_stream(capsys):
+    lox = Lox()
+    lox.run_stream(io.StringIO('print 1;\nprint -"a";\nprint 2;\n'))
+
+    out, _ = capsys.readouterr()
+    assert out == "1\n[line 2] Error at '-': Operand must be a number.\n"
+    assert lox.had_runtime_error()
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_streamed_program_prints_the_same(filename, capsys):
+    if filename.endswith(("clock_calling.lox", "deep_recursion.lox")):
+        pytest.skip("fails before printing anything")
+    lox = Lox()
+    with open(filename, encoding="utf-8") as f:
+        lox.run(source=f.read())
+    expected = capsys.readouterr()
+
+    lox = Lox()
+    with open(filename, encoding="utf-8") as f:
+        lox.run_stream(f)
+    assert capsys.readouterr() == expected
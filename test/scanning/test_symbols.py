@@ -0,0 +1,45 @@
+import pickle
+
+from pycraft import symbols
+from pycraft.error_handler import ErrorHandler
+from pycraft.scanner import BufferScanner, RegexScanner
+from pycraft.tokenclass import Token, TokenType
+
+
+def identifiers(tokens):
+    return [token for token in tokens if token.type == TokenType.IDENTIFIER]
+
+
+def test_same_name_same_symbol():
+    assert symbols.intern("apple") == symbols.intern("apple")
+    assert symbols.intern("apple") != symbols.intern("banana")
+    assert symbols.name(symbols.intern("apple")) == "apple"
+
+
+def test_scanned_identifiers_share_their_name():
+    source = "var total = 1; total = total + other;"
+    tokens = RegexScanner(source, error_handler=ErrorHandler()).scan_tokens()
+    names = identifiers(tokens)
+    assert [token.lexeme for token in names] == ["total", "total", "total", "other"]
+    assert len({token.symbol for token in names[:3]}) == 1
+    assert names[0].lexeme is names[1].lexeme is names[2].lexeme
+    assert names[3].symbol == symbols.intern("other")
+
+
+def test_buffered_tokens_are_interned():
+    buffer = BufferScanner("fun fib(n) { fib(n); }", error_handler=ErrorHandler()).scan_buffer()
+    names = identifiers(buffer)
+    assert names[0].symbol == names[2].symbol == symbols.intern("fib")
+    assert names[0].lexeme is names[2].lexeme
+
+
+def test_only_identifiers_get_symbols():
+    tokens = RegexScanner('while "x" 1 and', error_handler=ErrorHandler()).scan_tokens()
+    assert all(token.symbol is None for token in tokens)
+
+
+def test_unpickled_tokens_are_interned_again():
+    token = Token(TokenType.IDENTIFIER, "pickled", None, 3)
+    copy = pickle.loads(pickle.dumps(token))
+    assert copy.symbol == token.symbol
+    assert copy.lexeme is token.lexeme
@@ -0,0 +1,100 @@
+import pytest
+
+from pycraft.error_handler import ErrorHandler
+from pycraft.exception import LoxRuntimeError
+from pycraft.expr import Expr
+from pycraft.parser import BufferParser, Parser
+from pycraft.scanner import BufferScanner, RegexScanner
+from pycraft.stmt import Stmt
+from pycraft.tokenclass import Token, TokenBuffer, TokenType
+
+from ..engines.test_vm import LOX_FILES
+
+SOURCES = [
+    '',
+    'var a = 1.5; // comment\nprint a >= 2 != !true;',
+    '"multi\nline" "" 1.',
+    'a @ b _c #',
+    '"unterminated\nstring',
+    'café été x² 2.٣ ٣',
+]
+
+
+def as_tuples(tokens):
+    return [(token.type, token.lexeme, token.literal, token.line) for token in tokens]
+
+
+def scan(source):
+    error_handler = ErrorHandler()
+    tokens = RegexScanner(source, error_handler=error_handler).scan_tokens()
+    return as_tuples(tokens), error_handler.errors
+
+
+def scan_buffer(source):
+    error_handler = ErrorHandler()
+    buffer = BufferScanner(source, error_handler=error_handler).scan_buffer()
+    return as_tuples(buffer), error_handler.errors
+
+
+def dump(node):
+    """Nested tuples of a tree's node types, fields and tokens."""
+    if isinstance(node, Token):
+        return (node.type, node.lexeme, node.literal, node.line)
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if isinstance(node, (Expr, Stmt)):
+        return (type(node).__name__, {
+            slot: dump(getattr(node, slot)) for slot in type(node).__slots__
+        })
+    return node
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_buffer_matches_token_list_on_programs(filename, capsys):
+    with open(filename, encoding="utf-8") as f:
+        source = f.read()
+    assert scan_buffer(source) == scan(source)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_buffer_matches_token_list(source, capsys):
+    assert scan_buffer(source) == scan(source)
+
+
+def test_buffer_columns():
+    buffer = TokenBuffer("var x = 12;")
+    buffer.append(TokenType.VAR, 0, 3, 1)
+    buffer.append(TokenType.NUMBER, 8, 2, 2, 12.0)
+
+    assert len(buffer) == 2
+    assert list(buffer.types) == [TokenType.VAR.value, TokenType.NUMBER.value]
+    assert buffer.literals == {1: 12.0}
+    token = buffer[-1]
+    assert (token.type, token.lexeme, token.literal, token.line) == (
+        TokenType.NUMBER, "12", 12.0, 2,
+    )
+
+
+@pytest.mark.parametrize('filename', LOX_FILES)
+def test_buffer_parser_matches_parser(filename, capsys):
+    with open(filename, encoding="utf-8") as f:
+        source = f.read()
+    error_handler = ErrorHandler()
+    tokens = RegexScanner(source, error_handler=error_handler).scan_tokens()
+    buffer = BufferScanner(source, error_handler=error_handler).scan_buffer()
+    try:
+        expected = dump(Parser(tokens, error_handler=error_handler).parse())
+    except LoxRuntimeError as error:
+        with pytest.raises(LoxRuntimeError, match=str(error)):
+            BufferParser(buffer, error_handler=error_handler).parse()
+    else:
+        assert dump(BufferParser(buffer, error_handler=error_handler).parse()) == expected
+
+
+def test_buffer_parser_error_at_end(capsys):
+    error_handler = ErrorHandler()
+    buffer = BufferScanner("print 1", error_handler=error_handler).scan_buffer()
+
+    with pytest.raises(LoxRuntimeError, match="Expect ';' after value."):
+        BufferParser(buffer, error_handler=error_handler).parse()
+    assert capsys.readouterr().out == "[line 1] Error at end: Expect ';' after value.\n"